@@ -1,29 +1,51 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession
 import os
 
+from scraper.conexion import crear_engine, crear_engine_async
+
 # Database URL - puede ser SQLite o PostgreSQL
 # La base de datos está en el directorio raíz del proyecto
-import os
 _base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 _db_path = os.path.join(_base_dir, 'propiedades.db')
 DATABASE_URL = os.getenv('DATABASE_URL', f'sqlite:///{_db_path}')
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
-)
+# Pool de conexiones async (ajustable por entorno)
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '10'))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', '20'))
+DB_POOL_TIMEOUT = int(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+# WAL, synchronous=NORMAL, mmap y busy_timeout en SQLite (scraper/conexion.py); 0 para desactivarlos
+SQLITE_PRAGMAS = os.getenv('SQLITE_PRAGMAS', '1') != '0'
+
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def url_async(url):
+    """Misma base con driver async: aiosqlite para SQLite, asyncpg para PostgreSQL"""
+    if url.startswith('sqlite:'):
+        return url.replace('sqlite:', 'sqlite+aiosqlite:', 1)
+    for prefijo in ('postgresql+psycopg2:', 'postgresql:', 'postgres:'):
+        if url.startswith(prefijo):
+            return url.replace(prefijo, 'postgresql+asyncpg:', 1)
+    return url
+
+
+# Engine sincrónico: solo para crear el esquema al iniciar
+engine = crear_engine(DATABASE_URL, pragmas=SQLITE_PRAGMAS)
+
+# Engine async: lo usan todos los endpoints, sin bloquear el event loop
+async_engine = crear_engine_async(
+    url_async(DATABASE_URL),
+    pragmas=SQLITE_PRAGMAS,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+)
 
-Base = declarative_base()
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, class_=AsyncSession)
 
 
-def get_db():
-    """Dependency para obtener sesión de DB"""
-    db = SessionLocal()
-    try:
+async def get_db():
+    """Dependency para obtener sesión async de DB"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,147 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from api.database import AsyncSessionLocal
+from api.models import Propiedad
+
+
+# Columnas públicas: los campos de PropiedadDetalle más grupo_id. Quedan
+# afuera las internas del scraper (huella, validadores HTTP)
+COLUMNAS = [
+    'id', 'fuente', 'url', 'titulo', 'descripcion', 'tipo', 'operacion',
+    'ciudad', 'barrio', 'direccion', 'latitud', 'longitud',
+    'precio', 'moneda', 'expensas',
+    'ambientes', 'dormitorios', 'banos', 'cocheras',
+    'superficie_total', 'superficie_cubierta',
+    'mascotas', 'amoblado', 'patio',
+    'imagen_principal', 'fecha_scraping', 'grupo_id',
+]
+
+# Filas por fetch del cursor y por row group de Parquet
+TAMANO_LOTE = 1000
+
+FORMATOS = {
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+async def _lotes(condiciones):
+    """
+    Recorre las propiedades con un cursor del lado del servidor, de a TAMANO_LOTE.
+
+    Abre su propia sesión: el generador sigue corriendo después de que el
+    endpoint retorna, cuando la sesión de get_db ya puede estar cerrada.
+    """
+    stmt = (
+        select(*(Propiedad.__table__.c[nombre] for nombre in COLUMNAS))
+        .where(*condiciones)
+        .order_by(Propiedad.id)
+        .execution_options(yield_per=TAMANO_LOTE)
+    )
+    async with AsyncSessionLocal() as db:
+        resultado = await db.stream(stmt)
+        async for lote in resultado.partitions(TAMANO_LOTE):
+            yield lote
+
+
+def _serializar(valor):
+    if isinstance(valor, datetime):
+        return valor.isoformat()
+    return valor
+
+
+async def exportar_ndjson(condiciones):
+    async for lote in _lotes(condiciones):
+        yield ''.join(
+            json.dumps(dict(zip(COLUMNAS, map(_serializar, fila))), ensure_ascii=False) + '\n'
+            for fila in lote
+        ).encode('utf-8')
+
+
+async def exportar_csv(condiciones):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow(COLUMNAS)
+    async for lote in _lotes(condiciones):
+        escritor.writerows(lote)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode('utf-8')
+
+
+class _SumideroStreaming:
+    """
+    Destino de escritura para ParquetWriter que entrega los bytes a medida que
+    se escriben. tell() informa el total escrito: Parquet guarda offsets
+    absolutos en el footer, así que no puede reiniciarse al vaciar.
+    """
+    closed = False
+
+    def __init__(self):
+        self.pendiente = []
+        self.total = 0
+
+    def write(self, datos):
+        self.pendiente.append(bytes(datos))
+        self.total += len(datos)
+        return len(datos)
+
+    def tell(self):
+        return self.total
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def vaciar(self):
+        datos = b''.join(self.pendiente)
+        self.pendiente = []
+        return datos
+
+
+def _esquema_parquet(pa):
+    tipos = {
+        'Integer': pa.int64(),
+        'Float': pa.float64(),
+        'Boolean': pa.bool_(),
+        'DateTime': pa.timestamp('us'),
+    }
+    return pa.schema([
+        (nombre, tipos.get(type(Propiedad.__table__.c[nombre].type).__name__, pa.string()))
+        for nombre in COLUMNAS
+    ])
+
+
+async def exportar_parquet(condiciones):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    esquema = _esquema_parquet(pa)
+    sumidero = _SumideroStreaming()
+    writer = pq.ParquetWriter(pa.PythonFile(sumidero, mode='w'), esquema, compression='zstd')
+    async for lote in _lotes(condiciones):
+        columnas = list(zip(*lote))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(columnas, esquema)],
+            schema=esquema,
+        ))
+        yield sumidero.vaciar()
+    writer.close()
+    yield sumidero.vaciar()
+
+
+EXPORTADORES = {
+    'ndjson': exportar_ndjson,
+    'csv': exportar_csv,
+    'parquet': exportar_parquet,
+}
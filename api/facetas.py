@@ -0,0 +1,73 @@
+from sqlalchemy import select, union_all, literal, cast, case, func, String
+
+from api.models import Propiedad
+from api.filtros import condiciones_filtros
+
+
+# Rangos de precio por moneda (límites superiores de cada tramo)
+RANGOS_PRECIO = {
+    'ARS': [200000, 400000, 600000, 800000, 1000000, 1500000],
+    'USD': [300, 500, 800, 1200, 2000],
+}
+
+
+def _tramo_precio():
+    """Expresión CASE que etiqueta cada propiedad con su tramo, ej. 'ARS 200000-400000'"""
+    ramas = []
+    for moneda, limites in RANGOS_PRECIO.items():
+        desde = 0
+        for hasta in limites:
+            ramas.append((
+                (Propiedad.moneda == moneda) & (Propiedad.precio < hasta),
+                f"{moneda} {desde}-{hasta}",
+            ))
+            desde = hasta
+        ramas.append((Propiedad.moneda == moneda, f"{moneda} {desde}+"))
+    return case(*ramas, else_=None)
+
+
+# faceta -> (expresión agrupada, filtros que no se aplican al contarla)
+FACETAS = {
+    'barrio': (Propiedad.barrio, ('barrio',)),
+    'fuente': (Propiedad.fuente, ('fuente',)),
+    'tipo': (Propiedad.tipo, ('tipo',)),
+    'ambientes': (Propiedad.ambientes, ('ambientes',)),
+    'precio': (_tramo_precio(), ('precio_min', 'precio_max')),
+}
+
+
+async def contar_facetas(db, filtros):
+    """
+    Conteos por barrio, fuente, tipo, ambientes y tramo de precio.
+    
+    Cada faceta se cuenta con todos los filtros salvo el propio (así el
+    selector de barrio sigue mostrando los otros barrios), y todas salen en un
+    único UNION ALL de GROUP BYs: una sola ida a la base.
+    """
+    consultas = []
+    for nombre, (expresion, excluir) in FACETAS.items():
+        consultas.append(
+            select(
+                literal(nombre).label('faceta'),
+                cast(expresion, String).label('valor'),
+                func.count().label('cantidad'),
+            )
+            .where(expresion.isnot(None), *condiciones_filtros(filtros, excluir=excluir))
+            .group_by(expresion)
+        )
+    
+    facetas = {nombre: [] for nombre in FACETAS}
+    for faceta, valor, cantidad in await db.execute(union_all(*consultas)):
+        if valor:
+            facetas[faceta].append({"valor": valor, "cantidad": cantidad})
+    
+    for nombre in ('barrio', 'fuente', 'tipo'):
+        facetas[nombre].sort(key=lambda v: -v["cantidad"])
+    facetas['ambientes'].sort(key=lambda v: int(v["valor"]))
+    facetas['precio'].sort(key=_orden_tramo)
+    return facetas
+
+
+def _orden_tramo(valor):
+    moneda, rango = valor["valor"].split(' ', 1)
+    return moneda, float(rango.split('-')[0].rstrip('+'))
@@ -0,0 +1,133 @@
+from typing import Optional
+
+from fastapi import Query, HTTPException
+from sqlalchemy import select, func
+
+from api.models import Propiedad, FiltrosPropiedades
+from scraper.geo import condicion_bbox, condicion_radio
+
+
+# Motor con índice espacial disponible (None: filtrar solo por columnas).
+# Lo define main.py después de crear el esquema.
+_indice_geo = {"dialecto": None}
+
+
+def activar_indice_geo(dialecto):
+    _indice_geo["dialecto"] = dialecto
+
+
+def _coordenadas(valor, cantidad, nombre):
+    """Parsea 'a,b,...' a una tupla de `cantidad` floats"""
+    try:
+        numeros = tuple(float(x) for x in valor.split(','))
+    except ValueError:
+        numeros = ()
+    if len(numeros) != cantidad:
+        raise HTTPException(status_code=400, detail=f"{nombre} debe tener {cantidad} números separados por coma")
+    return numeros
+
+
+def obtener_filtros(
+    precio_min: Optional[float] = Query(None, description="Precio mínimo"),
+    precio_max: Optional[float] = Query(None, description="Precio máximo"),
+    barrio: Optional[str] = Query(None, description="Filtrar por barrio"),
+    ambientes: Optional[int] = Query(None, ge=1, le=10, description="Cantidad de ambientes"),
+    dormitorios_min: Optional[int] = Query(None, ge=0, description="Mínimo de dormitorios"),
+    superficie_min: Optional[float] = Query(None, ge=0, description="Superficie mínima en m²"),
+    mascotas: Optional[bool] = Query(None, description="Permite mascotas"),
+    patio: Optional[bool] = Query(None, description="Tiene patio"),
+    fuente: Optional[str] = Query(None, description="Filtrar por fuente"),
+    tipo: Optional[str] = Query(None, description="Tipo de propiedad"),
+    moneda: Optional[str] = Query(None, description="Filtrar por moneda: ARS o USD"),
+    bbox: Optional[str] = Query(None, description="Viewport: min_lng,min_lat,max_lng,max_lat (Leaflet toBBoxString)"),
+    near: Optional[str] = Query(None, description="Centro de búsqueda por radio: lat,lng"),
+    radio_m: float = Query(1000, gt=0, le=50000, description="Radio en metros para near"),
+    agrupar: bool = Query(False, description="Una sola publicación por propiedad repetida entre fuentes"),
+) -> FiltrosPropiedades:
+    """Dependency con los filtros estándar de búsqueda de propiedades"""
+    return FiltrosPropiedades(
+        precio_min=precio_min,
+        precio_max=precio_max,
+        barrio=barrio,
+        ambientes=ambientes,
+        dormitorios_min=dormitorios_min,
+        superficie_min=superficie_min,
+        mascotas=mascotas,
+        patio=patio,
+        fuente=fuente,
+        tipo=tipo,
+        moneda=moneda,
+        bbox=_coordenadas(bbox, 4, 'bbox') if bbox else None,
+        near=_coordenadas(near, 2, 'near') if near else None,
+        radio_m=radio_m if near else None,
+        agrupar=agrupar or None,
+    )
+
+
+def condiciones_filtros(filtros: FiltrosPropiedades, excluir=()):
+    """
+    Condiciones SQL para los filtros (siempre solo propiedades activas).
+    
+    `excluir` omite filtros por nombre; las facetas lo usan para contar cada
+    dimensión sin aplicar su propio filtro.
+    """
+    condiciones = [Propiedad.activa == True]
+    
+    def activo(nombre):
+        return getattr(filtros, nombre) is not None and nombre not in excluir
+    
+    if activo('precio_min'):
+        condiciones.append(Propiedad.precio >= filtros.precio_min)
+    
+    if activo('precio_max'):
+        condiciones.append(Propiedad.precio <= filtros.precio_max)
+    
+    if activo('barrio') and filtros.barrio:
+        condiciones.append(Propiedad.barrio.ilike(f"%{filtros.barrio}%"))
+    
+    if activo('ambientes'):
+        condiciones.append(Propiedad.ambientes == filtros.ambientes)
+    
+    if activo('dormitorios_min'):
+        condiciones.append(Propiedad.dormitorios >= filtros.dormitorios_min)
+    
+    if activo('superficie_min'):
+        condiciones.append(Propiedad.superficie_total >= filtros.superficie_min)
+    
+    if activo('mascotas'):
+        condiciones.append(Propiedad.mascotas == filtros.mascotas)
+    
+    if activo('patio'):
+        condiciones.append(Propiedad.patio == filtros.patio)
+    
+    if activo('fuente') and filtros.fuente:
+        condiciones.append(Propiedad.fuente.ilike(f"%{filtros.fuente}%"))
+    
+    if activo('tipo') and filtros.tipo:
+        condiciones.append(Propiedad.tipo.ilike(f"%{filtros.tipo}%"))
+    
+    if activo('moneda') and filtros.moneda:
+        condiciones.append(Propiedad.moneda == filtros.moneda)
+    
+    if activo('bbox'):
+        condiciones.append(condicion_bbox(
+            Propiedad.latitud, Propiedad.longitud, Propiedad.id, filtros.bbox, _indice_geo["dialecto"]
+        ))
+    
+    if activo('near'):
+        lat, lng = filtros.near
+        condiciones.append(condicion_radio(
+            Propiedad.latitud, Propiedad.longitud, Propiedad.id, lat, lng, filtros.radio_m, _indice_geo["dialecto"]
+        ))
+    
+    if activo('agrupar'):
+        # De cada grupo de duplicados, la de menor id entre las que cumplen los demás filtros
+        representantes = (
+            select(func.min(Propiedad.id))
+            .where(*condiciones)
+            .group_by(func.coalesce(Propiedad.grupo_id, Propiedad.id))
+            .correlate(None)
+        )
+        condiciones.append(Propiedad.id.in_(representantes))
+    
+    return condiciones
@@ -0,0 +1,82 @@
+"""
+Propiedades con las mismas fotos (/propiedades/{id}/mismas-fotos).
+
+`IndiceImagenes` guarda en memoria un IndiceHashes con los hashes distintos de
+`imagen_hash` (scraper/imagenes.py). Cuando cambia la generación de los datos
+agrega solo las filas nuevas: el id de imagen_hash es creciente.
+
+El índice da los hashes cercanos y las propiedades salen de la tabla (índice
+por hash), así un hash que ya no está en la tabla no devuelve nada.
+"""
+import asyncio
+
+from sqlalchemy import select
+
+from api.models import Propiedad
+from scraper.generacion import leer_generacion
+from scraper.imagenes import IndiceHashes, imagen_hash, a_columna, desde_columna
+
+
+class IndiceImagenes:
+
+    def __init__(self):
+        self.hashes = IndiceHashes()
+        self.ultimo_id = 0
+        self.generacion = None
+        self._lock = asyncio.Lock()
+
+    async def actualizar(self, db):
+        """Agrega al índice los hashes nuevos si cambió la generación"""
+        conn = await db.connection()
+        generacion = await conn.run_sync(leer_generacion)
+        if generacion == self.generacion:
+            return
+        async with self._lock:
+            if generacion == self.generacion:
+                return
+            filas = await db.execute(
+                select(imagen_hash.c.id, imagen_hash.c.hash)
+                .where(imagen_hash.c.id > self.ultimo_id)
+                .order_by(imagen_hash.c.id)
+            )
+            for id_, h in filas:
+                self.hashes.agregar(desde_columna(h))
+                self.ultimo_id = id_
+            self.generacion = generacion
+
+    async def similares(self, db, propiedad_id, radio, limit):
+        """
+        [(propiedad, fotos_en_comun, distancia)] de otras propiedades activas
+        con alguna foto a distancia <= radio de las de `propiedad_id`.
+        """
+        await self.actualizar(db)
+        propios = [desde_columna(h) for h in await db.scalars(
+            select(imagen_hash.c.hash).where(imagen_hash.c.propiedad_id == propiedad_id)
+        )]
+        # Hash cercano -> (foto propia más parecida, distancia)
+        cercanos = {}
+        for indice, h in enumerate(propios):
+            for d, otro in self.hashes.buscar(h, radio):
+                if otro not in cercanos or d < cercanos[otro][1]:
+                    cercanos[otro] = (indice, d)
+        if not cercanos:
+            return []
+
+        por_propiedad = {}
+        filas = await db.execute(
+            select(imagen_hash.c.propiedad_id, imagen_hash.c.hash)
+            .where(imagen_hash.c.hash.in_([a_columna(h) for h in cercanos]),
+                   imagen_hash.c.propiedad_id != propiedad_id)
+        )
+        for otra, h in filas:
+            indice, d = cercanos[desde_columna(h)]
+            fotos, minima = por_propiedad.setdefault(otra, [set(), d])
+            fotos.add(indice)
+            por_propiedad[otra][1] = min(minima, d)
+
+        propiedades = {p.id: p for p in await db.scalars(
+            select(Propiedad).where(Propiedad.id.in_(list(por_propiedad)), Propiedad.activa == True)
+        )}
+        resultado = [(propiedades[id_], len(fotos), d) for id_, (fotos, d) in por_propiedad.items() if id_ in propiedades]
+        resultado.sort(key=lambda r: (-r[1], r[2], r[0].id))
+        return resultado[:limit]
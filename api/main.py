@@ -1,8 +1,11 @@
-from fastapi import FastAPI, Depends, Query, HTTPException
+from fastapi import FastAPI, Depends, Query, Path, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
-from sqlalchemy import func, or_, and_
+from fastapi.responses import StreamingResponse, JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, func, or_, and_
+from sqlalchemy.orm import selectinload
 from typing import List, Optional
+from datetime import datetime
 import sys
 import os
 
@@ -14,12 +17,54 @@ from api.models import (
     Propiedad, 
     PropiedadResponse, 
     PropiedadDetalle,
+    PropiedadBusqueda,
+    PropiedadSimilar,
+    PropiedadesConFacetas,
     FiltrosPropiedades,
-    Base
 )
+from api.paginacion import paginar_keyset, ordenar_query, CursorInvalido
+from api.filtros import obtener_filtros, condiciones_filtros, activar_indice_geo
+from api.facetas import contar_facetas
+from api.exportacion import EXPORTADORES, FORMATOS
+from api.teselas import GrillaMapa, ZOOM_DETALLE, propiedades_tesela
+from api.imagenes import IndiceImagenes
+from scraper.busqueda import crear_indice_busqueda, buscar_ids
+from scraper.duplicados import crear_indice_duplicados
+from scraper.generacion import crear_tabla_generacion, leer_generacion
+from scraper.geo import crear_indice_geo
+from scraper.historial import crear_historial, serie_propiedad, tendencias_precio, CAMPOS_HISTORIAL, MONEDAS, PERIODOS
+from scraper.migraciones import migrar
 
-# Crear tablas
-Base.metadata.create_all(bind=engine)
+# Tablas, columnas e índices del modelo compartido con el scraper (migraciones versionadas)
+migrar(engine)
+
+# Índice de texto completo (FTS5 en SQLite, tsvector en PostgreSQL)
+BUSQUEDA_INDEXADA = crear_indice_busqueda(engine)
+
+# Índice espacial para bbox/near (R*Tree en SQLite, PostGIS en PostgreSQL)
+INDICE_GEO = engine.dialect.name if crear_indice_geo(engine) else None
+activar_indice_geo(INDICE_GEO)
+
+# Generación de los datos: el scraper la incrementa en cada escritura
+crear_tabla_generacion(engine)
+
+# Grupos de duplicados entre fuentes (grupo_id), para ?agrupar=true
+crear_indice_duplicados(engine)
+
+# Historial append-only de precios y otros campos (triggers sobre propiedades)
+HISTORIAL_ACTIVO = crear_historial(engine)
+
+# Caché en proceso de /stats, válida mientras no cambie la generación
+_cache_stats = {"generacion": None, "datos": None}
+
+# Ídem para /tendencias/precios, una entrada por combinación de parámetros
+_cache_tendencias = {"generacion": None, "datos": {}}
+
+# Conteos por celda para las teselas del mapa, actualizados por generación
+_grilla_mapa = GrillaMapa()
+
+# Índice de los hashes de las fotos, para /propiedades/{id}/mismas-fotos
+_indice_imagenes = IndiceImagenes()
 
 app = FastAPI(
     title="API Propiedades Rosario",
@@ -34,6 +79,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -45,31 +91,29 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "propiedades": "/propiedades",
+            "facetas": "/propiedades/facetas",
             "detalle": "/propiedades/{id}",
+            "historial": "/propiedades/{id}/historial",
+            "mismas_fotos": "/propiedades/{id}/mismas-fotos",
+            "tendencias": "/tendencias/precios?periodo=mes|semana",
             "stats": "/stats",
             "barrios": "/barrios",
-            "fuentes": "/fuentes"
+            "fuentes": "/fuentes",
+            "export": "/export?formato=ndjson|csv|parquet",
+            "tiles": "/tiles/{z}/{x}/{y}"
         }
     }
 
 
 @app.get("/propiedades", response_model=List[PropiedadResponse])
 async def listar_propiedades(
+    response: Response,
     skip: int = Query(0, ge=0, description="Registros a saltar"),
     limit: int = Query(50, ge=1, le=200, description="Máximo de registros"),
-    precio_min: Optional[float] = Query(None, description="Precio mínimo"),
-    precio_max: Optional[float] = Query(None, description="Precio máximo"),
-    barrio: Optional[str] = Query(None, description="Filtrar por barrio"),
-    ambientes: Optional[int] = Query(None, ge=1, le=10, description="Cantidad de ambientes"),
-    dormitorios_min: Optional[int] = Query(None, ge=0, description="Mínimo de dormitorios"),
-    superficie_min: Optional[float] = Query(None, ge=0, description="Superficie mínima en m²"),
-    mascotas: Optional[bool] = Query(None, description="Permite mascotas"),
-    patio: Optional[bool] = Query(None, description="Tiene patio"),
-    fuente: Optional[str] = Query(None, description="Filtrar por fuente"),
-    tipo: Optional[str] = Query(None, description="Tipo de propiedad"),
-    moneda: Optional[str] = Query(None, description="Filtrar por moneda: ARS o USD"),
+    filtros: FiltrosPropiedades = Depends(obtener_filtros),
     ordenar: Optional[str] = Query(None, description="Ordenar por: precio_asc, precio_desc, superficie_desc, reciente"),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = Query(None, description="Cursor opaco devuelto en el header X-Next-Cursor"),
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Lista propiedades con filtros opcionales
@@ -84,151 +128,344 @@ async def listar_propiedades(
     - **fuente**: zonaprop, argenprop, remax, etc.
     - **tipo**: Departamento, Casa, etc.
     - **ordenar**: precio_asc, precio_desc, superficie_desc, reciente
+    - **agrupar**: true para una sola publicación por propiedad repetida entre fuentes
+    - **cursor**: página siguiente; el header `X-Next-Cursor` trae el de la próxima
     """
     
-    query = db.query(Propiedad).filter(Propiedad.activa == True)
-    
-    # Aplicar filtros
-    if precio_min is not None:
-        query = query.filter(Propiedad.precio >= precio_min)
-    
-    if precio_max is not None:
-        query = query.filter(Propiedad.precio <= precio_max)
+    stmt = select(Propiedad).where(*condiciones_filtros(filtros))
     
-    if barrio:
-        query = query.filter(Propiedad.barrio.ilike(f"%{barrio}%"))
+    # Paginación: keyset (cursor) salvo que se pida un skip explícito
+    if skip and not cursor:
+        return (await db.scalars(ordenar_query(stmt, ordenar).offset(skip).limit(limit))).all()
     
-    if ambientes is not None:
-        query = query.filter(Propiedad.ambientes == ambientes)
+    try:
+        propiedades, siguiente = await paginar_keyset(db, stmt, ordenar, cursor, limit)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if dormitorios_min is not None:
-        query = query.filter(Propiedad.dormitorios >= dormitorios_min)
+    if siguiente:
+        response.headers["X-Next-Cursor"] = siguiente
     
-    if superficie_min is not None:
-        query = query.filter(Propiedad.superficie_total >= superficie_min)
+    return propiedades
+
+
+@app.get("/propiedades/facetas", response_model=PropiedadesConFacetas)
+async def listar_propiedades_con_facetas(
+    limit: int = Query(50, ge=1, le=200, description="Máximo de registros"),
+    filtros: FiltrosPropiedades = Depends(obtener_filtros),
+    ordenar: Optional[str] = Query(None, description="Ordenar por: precio_asc, precio_desc, superficie_desc, reciente"),
+    cursor: Optional[str] = Query(None, description="Cursor de la página siguiente"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Misma búsqueda que /propiedades, más conteos por barrio, fuente, tipo,
+    ambientes y tramo de precio en la misma respuesta.
     
-    if mascotas is not None:
-        query = query.filter(Propiedad.mascotas == mascotas)
+    Cada faceta se cuenta con todos los filtros menos el suyo, así sirve para
+    poblar los selectores de la búsqueda sin pedir /barrios ni /fuentes.
+    """
+    stmt = select(Propiedad).where(*condiciones_filtros(filtros))
     
-    if patio is not None:
-        query = query.filter(Propiedad.patio == patio)
+    try:
+        propiedades, siguiente = await paginar_keyset(db, stmt, ordenar, cursor, limit)
+    except CursorInvalido as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if fuente:
-        query = query.filter(Propiedad.fuente.ilike(f"%{fuente}%"))
+    return {
+        "propiedades": propiedades,
+        "siguiente_cursor": siguiente,
+        "facetas": await contar_facetas(db, filtros),
+    }
+
+
+@app.get("/propiedades/{propiedad_id}", response_model=PropiedadDetalle)
+async def detalle_propiedad(
+    propiedad_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """Obtiene el detalle completo de una propiedad, con todas sus fotos en orden"""
+    propiedad = await db.get(Propiedad, propiedad_id, options=[selectinload(Propiedad.imagenes)])
     
-    if tipo:
-        query = query.filter(Propiedad.tipo.ilike(f"%{tipo}%"))
+    if not propiedad:
+        raise HTTPException(status_code=404, detail="Propiedad no encontrada")
     
-    if moneda:
-        query = query.filter(Propiedad.moneda == moneda)
+    return propiedad
+
+
+@app.get("/propiedades/{propiedad_id}/historial")
+async def historial_propiedad(
+    propiedad_id: int,
+    campos: Optional[str] = Query(None, description=f"Separados por coma: {', '.join(CAMPOS_HISTORIAL)}"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Serie de tiempo de una propiedad: el valor inicial de cada campo y cada
+    cambio posterior (fecha ISO en UTC). `activa` muestra cuándo dejó de
+    publicarse y cuándo volvió.
+    """
+    if not HISTORIAL_ACTIVO:
+        raise HTTPException(status_code=501, detail="Historial no disponible en este motor")
     
-    # Aplicar ordenamiento
-    if ordenar == 'precio_asc':
-        query = query.order_by(Propiedad.precio.asc().nulls_last())
-    elif ordenar == 'precio_desc':
-        query = query.order_by(Propiedad.precio.desc().nulls_last())
-    elif ordenar == 'superficie_desc':
-        query = query.order_by(Propiedad.superficie_total.desc().nulls_last())
-    elif ordenar == 'reciente':
-        query = query.order_by(Propiedad.fecha_scraping.desc())
-    else:
-        # Por defecto: más recientes primero
-        query = query.order_by(Propiedad.fecha_scraping.desc())
+    lista = [c.strip() for c in campos.split(',') if c.strip()] if campos else None
+    invalidos = [c for c in lista or [] if c not in CAMPOS_HISTORIAL]
+    if invalidos:
+        raise HTTPException(status_code=400, detail=f"Campos sin historial: {', '.join(invalidos)}")
     
-    # Paginación
-    propiedades = query.offset(skip).limit(limit).all()
+    if not await db.get(Propiedad, propiedad_id):
+        raise HTTPException(status_code=404, detail="Propiedad no encontrada")
     
-    return propiedades
+    conn = await db.connection()
+    return {
+        "propiedad_id": propiedad_id,
+        "series": await conn.run_sync(serie_propiedad, propiedad_id, lista),
+    }
 
 
-@app.get("/propiedades/{propiedad_id}", response_model=PropiedadDetalle)
-async def detalle_propiedad(
+@app.get("/propiedades/{propiedad_id}/mismas-fotos", response_model=List[PropiedadSimilar])
+async def propiedades_mismas_fotos(
     propiedad_id: int,
-    db: Session = Depends(get_db)
+    distancia: int = Query(6, ge=0, le=16, description="Bits distintos tolerados entre los hashes de dos fotos"),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_db)
 ):
-    """Obtiene el detalle completo de una propiedad"""
-    propiedad = db.query(Propiedad).filter(Propiedad.id == propiedad_id).first()
+    """
+    Otras propiedades activas con alguna foto igual o casi igual (recortada,
+    recomprimida, con otro tamaño), ordenadas por fotos en común.
     
-    if not propiedad:
+    Usa los hashes perceptuales que calcula el scraper con IMAGENES_ENABLED;
+    si la propiedad no tiene hashes la lista sale vacía.
+    """
+    if not await db.get(Propiedad, propiedad_id):
         raise HTTPException(status_code=404, detail="Propiedad no encontrada")
     
-    return propiedad
+    respuesta = []
+    for propiedad, fotos, minima in await _indice_imagenes.similares(db, propiedad_id, distancia, limit):
+        item = PropiedadSimilar.model_validate(propiedad)
+        item.fotos_en_comun = fotos
+        item.distancia = minima
+        respuesta.append(item)
+    return respuesta
+
+
+@app.get("/tendencias/precios")
+async def tendencias_precios(
+    request: Request,
+    response: Response,
+    periodo: str = Query("mes", pattern=f"^({'|'.join(PERIODOS)})$", description="mes o semana"),
+    barrio: Optional[str] = Query(None, description="Filtrar por barrio"),
+    moneda: Optional[str] = Query(None, pattern=f"^({'|'.join(MONEDAS)})$",
+                                  description="ARS o USD (moneda de la propiedad al observar el precio)"),
+    desde: Optional[datetime] = Query(None, description="Solo observaciones desde esta fecha"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Evolución del precio por barrio: por cada período y moneda, cantidad de
+    observaciones de precio (altas y cambios), propiedades distintas,
+    promedio, mínimo y máximo.
+    
+    Cacheado por generación igual que /stats (ETag + 304).
+    """
+    if not HISTORIAL_ACTIVO:
+        raise HTTPException(status_code=501, detail="Historial no disponible en este motor")
+    
+    conn = await db.connection()
+    generacion = await conn.run_sync(leer_generacion)
+    etag = f'"tendencias-{generacion}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    if _cache_tendencias["generacion"] != generacion:
+        _cache_tendencias["datos"] = {}
+        _cache_tendencias["generacion"] = generacion
+    
+    clave = (periodo, barrio, moneda, desde)
+    if clave not in _cache_tendencias["datos"]:
+        _cache_tendencias["datos"][clave] = await conn.run_sync(tendencias_precio, periodo, barrio, moneda, desde)
+    
+    response.headers.update(headers)
+    return _cache_tendencias["datos"][clave]
 
 
 @app.get("/stats")
-async def estadisticas(db: Session = Depends(get_db)):
-    """Estadísticas generales"""
-    total = db.query(func.count(Propiedad.id)).filter(Propiedad.activa == True).scalar()
+async def estadisticas(request: Request, response: Response, db: AsyncSession = Depends(get_db)):
+    """
+    Estadísticas generales
     
-    por_fuente = db.query(
-        Propiedad.fuente,
-        func.count(Propiedad.id).label('cantidad')
-    ).filter(Propiedad.activa == True).group_by(Propiedad.fuente).all()
+    Se calculan en una sola consulta agrupada y se cachean hasta que el
+    scraper escriba una nueva generación. El ETag es la generación, así que
+    un If-None-Match con el valor vigente responde 304 sin cuerpo.
+    """
+    conn = await db.connection()
+    generacion = await conn.run_sync(leer_generacion)
+    etag = f'"stats-{generacion}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
     
-    precio_promedio = db.query(func.avg(Propiedad.precio)).filter(
-        and_(Propiedad.activa == True, Propiedad.precio.isnot(None))
-    ).scalar()
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
     
-    precio_min = db.query(func.min(Propiedad.precio)).filter(
-        and_(Propiedad.activa == True, Propiedad.precio.isnot(None))
-    ).scalar()
+    if _cache_stats["generacion"] != generacion:
+        _cache_stats["datos"] = await _calcular_estadisticas(db)
+        _cache_stats["generacion"] = generacion
     
-    precio_max = db.query(func.max(Propiedad.precio)).filter(
-        and_(Propiedad.activa == True, Propiedad.precio.isnot(None))
-    ).scalar()
+    response.headers.update(headers)
+    return _cache_stats["datos"]
+
+
+async def _calcular_estadisticas(db):
+    """Todos los agregados de /stats en un único GROUP BY fuente"""
+    por_fuente = (await db.execute(select(
+        Propiedad.fuente,
+        func.count(Propiedad.id),
+        func.count(Propiedad.precio),
+        func.sum(Propiedad.precio),
+        func.min(Propiedad.precio),
+        func.max(Propiedad.precio)
+    ).where(Propiedad.activa == True).group_by(Propiedad.fuente))).all()
+    
+    total = sum(fila[1] for fila in por_fuente)
+    con_precio = sum(fila[2] for fila in por_fuente)
+    suma_precios = sum(fila[3] or 0 for fila in por_fuente)
+    minimos = [fila[4] for fila in por_fuente if fila[4] is not None]
+    maximos = [fila[5] for fila in por_fuente if fila[5] is not None]
+    precio_promedio = suma_precios / con_precio if con_precio else None
     
     return {
         "total_propiedades": total,
-        "por_fuente": [{"fuente": f, "cantidad": c} for f, c in por_fuente],
+        "por_fuente": [{"fuente": fila[0], "cantidad": fila[1]} for fila in por_fuente],
         "precio_promedio": round(precio_promedio, 2) if precio_promedio else None,
-        "precio_min": precio_min,
-        "precio_max": precio_max
+        "precio_min": min(minimos) if minimos else None,
+        "precio_max": max(maximos) if maximos else None
     }
 
 
 @app.get("/barrios")
-async def listar_barrios(db: Session = Depends(get_db)):
+async def listar_barrios(db: AsyncSession = Depends(get_db)):
     """Lista todos los barrios disponibles con cantidad de propiedades"""
-    barrios = db.query(
+    barrios = (await db.execute(select(
         Propiedad.barrio,
         func.count(Propiedad.id).label('cantidad')
-    ).filter(
+    ).where(
         and_(Propiedad.activa == True, Propiedad.barrio.isnot(None))
-    ).group_by(Propiedad.barrio).order_by(func.count(Propiedad.id).desc()).all()
+    ).group_by(Propiedad.barrio).order_by(func.count(Propiedad.id).desc()))).all()
     
     return [{"barrio": b, "cantidad": c} for b, c in barrios if b]
 
 
 @app.get("/fuentes")
-async def listar_fuentes(db: Session = Depends(get_db)):
+async def listar_fuentes(db: AsyncSession = Depends(get_db)):
     """Lista todas las fuentes disponibles"""
-    fuentes = db.query(
+    fuentes = (await db.execute(select(
         Propiedad.fuente,
         func.count(Propiedad.id).label('cantidad')
-    ).filter(Propiedad.activa == True).group_by(Propiedad.fuente).all()
+    ).where(Propiedad.activa == True).group_by(Propiedad.fuente))).all()
     
     return [{"fuente": f, "cantidad": c} for f, c in fuentes]
 
 
-@app.get("/buscar")
+@app.get("/buscar", response_model=List[PropiedadBusqueda])
 async def buscar_propiedades(
     q: str = Query(..., min_length=3, description="Término de búsqueda"),
     limit: int = Query(20, ge=1, le=100),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Búsqueda de texto libre en título y descripción"""
-    propiedades = db.query(Propiedad).filter(
-        and_(
-            Propiedad.activa == True,
-            or_(
-                Propiedad.titulo.ilike(f"%{q}%"),
-                Propiedad.descripcion.ilike(f"%{q}%"),
-                Propiedad.barrio.ilike(f"%{q}%")
+    """
+    Búsqueda de texto libre en título, descripción y barrio
+    
+    Ignora acentos, ordena por relevancia (BM25) y devuelve en `fragmento`
+    el texto que coincidió, marcado con <mark>.
+    """
+    if not BUSQUEDA_INDEXADA:
+        # Sin índice de texto completo: escaneo con LIKE
+        return (await db.scalars(select(Propiedad).where(
+            and_(
+                Propiedad.activa == True,
+                or_(
+                    Propiedad.titulo.ilike(f"%{q}%"),
+                    Propiedad.descripcion.ilike(f"%{q}%"),
+                    Propiedad.barrio.ilike(f"%{q}%")
+                )
             )
-        )
-    ).limit(limit).all()
+        ).limit(limit))).all()
     
-    return propiedades
+    conn = await db.connection()
+    resultados = await conn.run_sync(buscar_ids, q, limit)
+    if not resultados:
+        return []
+    
+    ids = [id_ for id_, _ in resultados]
+    por_id = {p.id: p for p in await db.scalars(select(Propiedad).where(Propiedad.id.in_(ids)))}
+    
+    respuesta = []
+    for id_, fragmento in resultados:
+        if id_ in por_id:
+            item = PropiedadBusqueda.model_validate(por_id[id_])
+            item.fragmento = fragmento
+            respuesta.append(item)
+    return respuesta
+
+
+@app.get("/export")
+async def exportar_propiedades(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$", description="ndjson, csv o parquet"),
+    filtros: FiltrosPropiedades = Depends(obtener_filtros),
+):
+    """
+    Exporta todas las propiedades activas que cumplen los filtros, sin paginar
+    
+    La respuesta se genera en streaming desde un cursor del servidor, de a
+    lotes, así la memoria no crece con el tamaño de la tabla.
+    """
+    if formato == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Exportar a Parquet requiere pyarrow instalado")
+    
+    media_type, extension = FORMATOS[formato]
+    return StreamingResponse(
+        EXPORTADORES[formato](condiciones_filtros(filtros)),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="propiedades.{extension}"'}
+    )
+
+
+@app.get("/tiles/{z}/{x}/{y}")
+async def tesela_mapa(
+    request: Request,
+    z: int = Path(..., ge=0, le=22),
+    x: int = Path(..., ge=0),
+    y: int = Path(..., ge=0),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Tesela del mapa en GeoJSON (esquema XYZ, el mismo de Leaflet/OSM)
+    
+    Con zoom menor a 16 devuelve grupos: un punto por celda con `cantidad`.
+    Desde zoom 16 devuelve las propiedades individuales con `id`, `titulo`
+    y `precio`. El ETag es la generación de los datos, como en /stats.
+    """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=400, detail="Tesela fuera de rango para ese zoom")
+    
+    generacion = await _grilla_mapa.actualizar(db)
+    etag = f'"tiles-{generacion}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    if z < ZOOM_DETALLE:
+        features = _grilla_mapa.agrupados(z, x, y)
+    else:
+        features = await propiedades_tesela(db, z, x, y, INDICE_GEO)
+    
+    return JSONResponse(
+        {"type": "FeatureCollection", "features": features},
+        media_type="application/geo+json",
+        headers=headers
+    )
 
 
 if __name__ == "__main__":
@@ -1,64 +1,9 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from datetime import datetime
 
-Base = declarative_base()
-
-
-class Propiedad(Base):
-    """Modelo de base de datos"""
-    __tablename__ = 'propiedades'
-    
-    id = Column(Integer, primary_key=True)
-    
-    # Identificación
-    fuente = Column(String(50), nullable=False, index=True)
-    url = Column(String(500), unique=True, nullable=False)
-    id_externo = Column(String(100))
-    
-    # Básicos
-    titulo = Column(String(500))
-    descripcion = Column(Text)
-    tipo = Column(String(50))
-    operacion = Column(String(50))
-    
-    # Ubicación
-    provincia = Column(String(100))
-    ciudad = Column(String(100), index=True)
-    barrio = Column(String(100), index=True)
-    direccion = Column(String(500))
-    latitud = Column(Float)
-    longitud = Column(Float)
-    mapa_url = Column(String(1000))
-    
-    # Características
-    precio = Column(Float, index=True)
-    moneda = Column(String(10))
-    expensas = Column(Float)
-    
-    ambientes = Column(Integer, index=True)
-    dormitorios = Column(Integer)
-    banos = Column(Integer)
-    cocheras = Column(Integer)
-    
-    superficie_total = Column(Float, index=True)
-    superficie_cubierta = Column(Float)
-    
-    # Extras
-    mascotas = Column(Boolean, default=False, index=True)
-    amoblado = Column(Boolean, default=False)
-    patio = Column(Boolean, default=False, index=True)
-    
-    # Imagenes
-    imagenes = Column(Text)
-    imagen_principal = Column(String(500))
-    
-    # Metadata
-    fecha_scraping = Column(DateTime, default=datetime.utcnow)
-    fecha_publicacion = Column(DateTime)
-    activa = Column(Boolean, default=True)
+# Modelo de la base compartido con el scraper (scraper/modelos.py)
+from scraper.modelos import Base, Propiedad, PropiedadImagen  # noqa: F401
 
 
 # Pydantic models para API
@@ -91,6 +36,17 @@ class PropiedadResponse(BaseModel):
     patio: Optional[bool]
     imagen_principal: Optional[str]
     fecha_scraping: Optional[datetime]
+    grupo_id: Optional[int] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ImagenResponse(BaseModel):
+    """Una foto del detalle; el tamaño solo si el scraper lo conoce"""
+    url: str
+    ancho: Optional[int] = None
+    alto: Optional[int] = None
     
     class Config:
         from_attributes = True
@@ -103,12 +59,36 @@ class PropiedadDetalle(PropiedadResponse):
     superficie_cubierta: Optional[float]
     cocheras: Optional[int]
     amoblado: Optional[bool]
-    imagenes: Optional[str]
+    imagenes: List[ImagenResponse] = []
     
     class Config:
         from_attributes = True
 
 
+class PropiedadBusqueda(PropiedadResponse):
+    """Resultado de /buscar con el fragmento que coincidió resaltado"""
+    fragmento: Optional[str] = None
+
+
+class PropiedadSimilar(PropiedadResponse):
+    """Resultado de /propiedades/{id}/mismas-fotos"""
+    fotos_en_comun: int = 0
+    distancia: Optional[int] = None  # bits distintos entre las fotos más parecidas
+
+
+class ValorFaceta(BaseModel):
+    """Un valor de faceta con su cantidad de propiedades"""
+    valor: str
+    cantidad: int
+
+
+class PropiedadesConFacetas(BaseModel):
+    """Página de resultados más los conteos por faceta bajo los mismos filtros"""
+    propiedades: List[PropiedadResponse]
+    siguiente_cursor: Optional[str] = None
+    facetas: Dict[str, List[ValorFaceta]]
+
+
 class FiltrosPropiedades(BaseModel):
     """Filtros para búsqueda"""
     precio_min: Optional[float] = None
@@ -121,3 +101,8 @@ class FiltrosPropiedades(BaseModel):
     patio: Optional[bool] = None
     fuente: Optional[str] = None
     tipo: Optional[str] = None
+    moneda: Optional[str] = None
+    bbox: Optional[Tuple[float, float, float, float]] = None  # min_lng, min_lat, max_lng, max_lat
+    near: Optional[Tuple[float, float]] = None  # lat, lng
+    radio_m: Optional[float] = None
+    agrupar: Optional[bool] = None  # una sola propiedad por grupo de duplicados
@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from api.models import Propiedad
+
+
+# Cada opción de `ordenar` se pagina por (columna, id) en la misma dirección,
+# así el par es único y coincide con los índices compuestos de Propiedad.
+ORDENAMIENTOS = {
+    'precio_asc': (Propiedad.precio, 'asc'),
+    'precio_desc': (Propiedad.precio, 'desc'),
+    'superficie_desc': (Propiedad.superficie_total, 'desc'),
+    'reciente': (Propiedad.fecha_scraping, 'desc'),
+}
+ORDEN_DEFAULT = 'reciente'
+
+
+class CursorInvalido(ValueError):
+    """El cursor no se puede decodificar o no corresponde al ordenamiento pedido"""
+
+
+def codificar_cursor(ordenar, valor, ultimo_id):
+    """Arma un cursor opaco a partir de la última fila devuelta"""
+    if isinstance(valor, datetime):
+        valor = valor.isoformat()
+    payload = json.dumps({'o': ordenar, 'v': valor, 'id': ultimo_id}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, ordenar):
+    """Devuelve (valor, id) del cursor, validando que sea del mismo ordenamiento"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        valor, ultimo_id = data['v'], int(data['id'])
+        orden_cursor = data['o']
+    except (ValueError, KeyError, TypeError) as e:
+        raise CursorInvalido(f"Cursor inválido: {e}")
+
+    if orden_cursor != ordenar:
+        raise CursorInvalido("El cursor corresponde a otro ordenamiento")
+
+    columna, _ = ORDENAMIENTOS[ordenar]
+    if valor is not None and columna is Propiedad.fecha_scraping:
+        try:
+            valor = datetime.fromisoformat(valor)
+        except (ValueError, TypeError) as e:
+            raise CursorInvalido(f"Cursor inválido: {e}")
+
+    return valor, ultimo_id
+
+
+def _ordenar_por(stmt, columna, direccion):
+    if direccion == 'asc':
+        return stmt.order_by(columna.asc(), Propiedad.id.asc())
+    return stmt.order_by(columna.desc(), Propiedad.id.desc())
+
+
+def _despues_de(columna, direccion, valor, ultimo_id):
+    if direccion == 'asc':
+        return tuple_(columna, Propiedad.id) > tuple_(valor, ultimo_id)
+    return tuple_(columna, Propiedad.id) < tuple_(valor, ultimo_id)
+
+
+def _id_despues_de(direccion, ultimo_id):
+    if direccion == 'asc':
+        return Propiedad.id > ultimo_id
+    return Propiedad.id < ultimo_id
+
+
+def ordenar_query(stmt, ordenar):
+    """Aplica el ordenamiento de `ordenar` (nulos al final, desempate por id)"""
+    ordenar = ordenar if ordenar in ORDENAMIENTOS else ORDEN_DEFAULT
+    columna, direccion = ORDENAMIENTOS[ordenar]
+    if direccion == 'asc':
+        return stmt.order_by(columna.asc().nulls_last(), Propiedad.id.asc())
+    return stmt.order_by(columna.desc().nulls_last(), Propiedad.id.desc())
+
+
+async def paginar_keyset(db, stmt, ordenar, cursor, limit):
+    """
+    Pagina el select `stmt` (de Propiedad) por keyset en vez de OFFSET.
+
+    Las filas con la columna de orden en NULL van al final. Se piden en dos
+    tramos (valores no nulos y luego nulos) para que cada uno recorra su índice
+    compuesto sin filesort, sin importar la profundidad de la página.
+
+    Retorna (filas, siguiente_cursor); siguiente_cursor es None en la última página.
+    """
+    ordenar = ordenar if ordenar in ORDENAMIENTOS else ORDEN_DEFAULT
+    columna, direccion = ORDENAMIENTOS[ordenar]
+
+    en_tramo_nulo = False
+    if cursor:
+        valor, ultimo_id = decodificar_cursor(cursor, ordenar)
+        en_tramo_nulo = valor is None
+
+    filas = []
+    if not en_tramo_nulo:
+        tramo = stmt.where(columna.isnot(None))
+        if cursor:
+            tramo = tramo.where(_despues_de(columna, direccion, valor, ultimo_id))
+        tramo = _ordenar_por(tramo, columna, direccion).limit(limit + 1)
+        filas = list((await db.scalars(tramo)).all())
+
+    if len(filas) <= limit:
+        tramo = stmt.where(columna.is_(None))
+        if en_tramo_nulo:
+            tramo = tramo.where(_id_despues_de(direccion, ultimo_id))
+        tramo = _ordenar_por(tramo, columna, direccion).limit(limit + 1 - len(filas))
+        filas += (await db.scalars(tramo)).all()
+
+    siguiente = None
+    if len(filas) > limit:
+        filas = filas[:limit]
+        ultima = filas[-1]
+        siguiente = codificar_cursor(ordenar, getattr(ultima, columna.key), ultima.id)
+
+    return filas, siguiente
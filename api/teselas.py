@@ -0,0 +1,183 @@
+"""
+Teselas del mapa con agrupamiento del lado del servidor (/tiles/{z}/{x}/{y}).
+
+Con zoom bajo cada tesela se divide en CELDAS_POR_LADO x CELDAS_POR_LADO celdas
+y se devuelve un punto por celda con la cantidad de propiedades y su
+centroide. Desde ZOOM_DETALLE en adelante se devuelven las propiedades
+individuales, consultadas con el índice espacial.
+
+Los conteos por celda viven en memoria (`GrillaMapa`), una pirámide de
+diccionarios por nivel de zoom. Cuando cambia la generación de los datos se
+actualiza solo con lo que cambió: las filas escritas en una generación
+posterior (propiedades.generacion, con índice), activas o desactivadas.
+"""
+import asyncio
+import math
+
+from sqlalchemy import select
+
+from api.models import Propiedad
+from scraper.generacion import leer_generacion
+from scraper.geo import condicion_bbox
+
+
+# Desde este zoom se devuelven propiedades sueltas en vez de grupos
+ZOOM_DETALLE = 16
+
+# Celdas por lado de cada tesela (potencia de 2: 8 -> celdas de 32px)
+CELDAS_POR_LADO = 8
+_BITS_CELDA = CELDAS_POR_LADO.bit_length() - 1
+
+# Propiedades sueltas por tesela como máximo
+MAX_PROPIEDADES_TESELA = 500
+
+MAX_LAT = 85.05112878
+
+
+def _mercator(lat, lng):
+    """(x, y) normalizados a [0, 1) en Web Mercator, origen arriba a la izquierda"""
+    lat = max(-MAX_LAT, min(MAX_LAT, lat))
+    seno = math.sin(math.radians(lat))
+    x = (lng + 180.0) / 360.0
+    y = 0.5 - math.log((1 + seno) / (1 - seno)) / (4 * math.pi)
+    return min(max(x, 0.0), 1.0 - 1e-12), min(max(y, 0.0), 1.0 - 1e-12)
+
+
+def limites_tesela(z, x, y):
+    """(min_lng, min_lat, max_lng, max_lat) de la tesela XYZ"""
+    n = 2 ** z
+
+    def lat(fila):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * fila / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def _punto(lat, lng, propiedades):
+    return {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [round(lng, 6), round(lat, 6)]},
+        "properties": propiedades,
+    }
+
+
+class GrillaMapa:
+    """
+    Conteos por celda para cada zoom < ZOOM_DETALLE.
+
+    `niveles[z]` mapea (cx, cy) -> [cantidad, suma_lat, suma_lng]. Cada punto
+    guarda su celda en el nivel más fino; la de un nivel más grueso sale
+    corriendo bits, así agregar o quitar un punto cuesta ZOOM_DETALLE pasos.
+    """
+
+    def __init__(self):
+        self.niveles = [{} for _ in range(ZOOM_DETALLE)]
+        self.puntos = {}
+        self.generacion = None
+        self._lock = asyncio.Lock()
+
+    def _agregar(self, id_, lat, lng):
+        x, y = _mercator(lat, lng)
+        escala = 1 << (ZOOM_DETALLE - 1 + _BITS_CELDA)
+        cx, cy = int(x * escala), int(y * escala)
+        self.puntos[id_] = (lat, lng, cx, cy)
+        for z, nivel in enumerate(self.niveles):
+            corrimiento = ZOOM_DETALLE - 1 - z
+            clave = (cx >> corrimiento, cy >> corrimiento)
+            celda = nivel.get(clave)
+            if celda is None:
+                nivel[clave] = [1, lat, lng]
+            else:
+                celda[0] += 1
+                celda[1] += lat
+                celda[2] += lng
+
+    def _quitar(self, id_):
+        punto = self.puntos.pop(id_, None)
+        if punto is None:
+            return
+        lat, lng, cx, cy = punto
+        for z, nivel in enumerate(self.niveles):
+            corrimiento = ZOOM_DETALLE - 1 - z
+            clave = (cx >> corrimiento, cy >> corrimiento)
+            celda = nivel[clave]
+            if celda[0] == 1:
+                del nivel[clave]
+            else:
+                celda[0] -= 1
+                celda[1] -= lat
+                celda[2] -= lng
+
+    def _aplicar(self, filas):
+        for id_, lat, lng, activa in filas:
+            if not activa or lat is None or lng is None:
+                self._quitar(id_)
+                continue
+            actual = self.puntos.get(id_)
+            if actual is None or actual[:2] != (lat, lng):
+                self._quitar(id_)
+                self._agregar(id_, lat, lng)
+
+    async def actualizar(self, db):
+        """Sincroniza la grilla con la base si cambió la generación. Retorna la generación."""
+        conn = await db.connection()
+        generacion = await conn.run_sync(leer_generacion)
+        if generacion == self.generacion:
+            return generacion
+
+        async with self._lock:
+            if generacion == self.generacion:
+                return generacion
+
+            columnas = select(Propiedad.id, Propiedad.latitud, Propiedad.longitud, Propiedad.activa)
+            if self.generacion is None:
+                # Primera carga: todas las activas con coordenadas
+                self._aplicar(await db.execute(columnas.where(
+                    Propiedad.activa == True,
+                    Propiedad.latitud.isnot(None),
+                    Propiedad.longitud.isnot(None),
+                )))
+            else:
+                # Incremental: lo escrito (o desactivado) después de la última
+                # generación leída; leer de más es idempotente
+                self._aplicar(await db.execute(columnas.where(Propiedad.generacion > self.generacion)))
+
+            self.generacion = generacion
+        return generacion
+
+    def agrupados(self, z, x, y):
+        """Features GeoJSON de las celdas con propiedades dentro de la tesela"""
+        nivel = self.niveles[z]
+        x0, y0 = x << _BITS_CELDA, y << _BITS_CELDA
+        features = []
+        for cx in range(x0, x0 + CELDAS_POR_LADO):
+            for cy in range(y0, y0 + CELDAS_POR_LADO):
+                celda = nivel.get((cx, cy))
+                if celda:
+                    cantidad, suma_lat, suma_lng = celda
+                    features.append(_punto(suma_lat / cantidad, suma_lng / cantidad, {"cantidad": cantidad}))
+        return features
+
+
+async def propiedades_tesela(db, z, x, y, dialecto):
+    """Features GeoJSON de las propiedades sueltas dentro de la tesela"""
+    filas = await db.execute(
+        select(
+            Propiedad.id, Propiedad.latitud, Propiedad.longitud, Propiedad.titulo,
+            Propiedad.precio, Propiedad.moneda, Propiedad.barrio, Propiedad.tipo,
+        )
+        .where(
+            Propiedad.activa == True,
+            condicion_bbox(Propiedad.latitud, Propiedad.longitud, Propiedad.id,
+                           limites_tesela(z, x, y), dialecto),
+        )
+        .order_by(Propiedad.id)
+        .limit(MAX_PROPIEDADES_TESELA)
+    )
+    return [
+        _punto(lat, lng, {
+            "id": id_, "cantidad": 1, "titulo": titulo, "precio": precio,
+            "moneda": moneda, "barrio": barrio, "tipo": tipo,
+        })
+        for id_, lat, lng, titulo, precio, moneda, barrio, tipo in filas
+    ]
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Load test: ¿la API atiende requests concurrentes en paralelo?
+
+Levanta uvicorn sobre una base SQLite temporal con N propiedades y dispara
+la misma consulta pesada (filtro ILIKE sin índice + conteo de facetas) primero
+en serie y después con C requests simultáneas, mientras otro cliente pide
+`/stats` (liviano, cacheado) en loop.
+
+- Si las consultas bloquean el event loop, el tiempo concurrente es la suma
+  de las individuales y las requests livianas esperan detrás de las pesadas.
+- Con el acceso async las pesadas se solapan (en tantos núcleos como haya) y
+  las livianas responden enseguida aunque haya pesadas en curso.
+
+Uso:
+    python benchmarks/bench_concurrencia_api.py [--filas 100000] [--concurrencia 8]
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from sqlalchemy import create_engine
+
+from api.models import Base
+from bench_paginacion import poblar
+
+
+RUTA = '/propiedades/facetas?barrio=cher&limit=50'
+
+
+def puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def esperar_api(client):
+    for _ in range(100):
+        try:
+            await client.get('/')
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError("La API no arrancó")
+
+
+async def medir_livianas(client, detener):
+    """Latencias de /stats mientras corren las pesadas"""
+    latencias = []
+    while not detener.is_set():
+        t0 = time.perf_counter()
+        (await client.get('/stats')).raise_for_status()
+        latencias.append(time.perf_counter() - t0)
+        await asyncio.sleep(0.01)
+    return latencias
+
+
+async def correr(base_url, concurrencia):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        await esperar_api(client)
+        await client.get(RUTA)  # calentar caché de páginas
+        await client.get('/stats')
+
+        t0 = time.perf_counter()
+        for _ in range(concurrencia):
+            (await client.get(RUTA)).raise_for_status()
+        serie = time.perf_counter() - t0
+
+        detener = asyncio.Event()
+        livianas = asyncio.create_task(medir_livianas(client, detener))
+        t0 = time.perf_counter()
+        respuestas = await asyncio.gather(*[client.get(RUTA) for _ in range(concurrencia)])
+        paralelo = time.perf_counter() - t0
+        detener.set()
+        latencias = sorted(await livianas)
+        for r in respuestas:
+            r.raise_for_status()
+
+    print(f"núcleos disponibles: {os.cpu_count()}")
+    print(f"{concurrencia} requests pesadas en serie:    {serie * 1000:8.0f} ms")
+    print(f"{concurrencia} requests pesadas simultáneas: {paralelo * 1000:8.0f} ms")
+    print(f"solapamiento: {serie / paralelo:.1f}x (1.0x = serializado o un solo núcleo)")
+    if latencias:
+        p50 = latencias[len(latencias) // 2] * 1000
+        print(f"/stats durante la carga: {len(latencias)} requests, p50 {p50:.0f} ms, máx {latencias[-1] * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, default=100000)
+    parser.add_argument('--concurrencia', type=int, default=8)
+    args = parser.parse_args()
+
+    random.seed(42)
+    tmp = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    print(f"📦 Generando {args.filas} propiedades...")
+    poblar(engine, args.filas)
+    engine.dispose()
+
+    puerto = puerto_libre()
+    raiz = os.path.join(os.path.dirname(__file__), '..')
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(puerto), '--log-level', 'warning'],
+        cwd=raiz,
+        env={**os.environ, 'DATABASE_URL': url},
+    )
+    try:
+        asyncio.run(correr(f"http://127.0.0.1:{puerto}", args.concurrencia))
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+
+if __name__ == '__main__':
+    main()
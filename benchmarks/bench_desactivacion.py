@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: desactivación de propiedades no vistas en DatabasePipeline.close_spider
+
+Compara el esquema anterior (lista con repetidos + NOT IN literal) contra el
+actual (set de URLs + tabla temporal + anti-join) con crawls de N propiedades.
+
+Uso:
+    python benchmarks/bench_desactivacion.py [--filas 100000 300000]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from scraper.modelos import Base, Propiedad
+from scraper.pipelines import DatabasePipeline
+
+
+class SpiderFalso:
+    name = 'zonaprop_bench'
+    logger = logging.getLogger('bench')
+
+
+def poblar(engine, filas):
+    with engine.begin() as conn:
+        for i in range(0, filas, 10000):
+            conn.execute(insert(Propiedad), [
+                {'fuente': 'zonaprop', 'url': f'https://example.com/p/{j}', 'activa': True}
+                for j in range(i, min(i + 10000, filas))
+            ])
+
+
+def urls_crawleadas(filas):
+    """El crawl ve el 90% de las URLs, varias de ellas más de una vez (paginación solapada)"""
+    for j in range(filas):
+        if j % 10:
+            yield f'https://example.com/p/{j}'
+            if j % 3 == 0:
+                yield f'https://example.com/p/{j}'
+
+
+def medir_lista(engine, filas):
+    tracemalloc.start()
+    vistos = []
+    for url in urls_crawleadas(filas):
+        vistos.append(url)
+    memoria = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    session = sessionmaker(bind=engine)()
+    t0 = time.perf_counter()
+    try:
+        afectadas = session.query(Propiedad).filter(
+            Propiedad.fuente.ilike('%zonaprop%'),
+            Propiedad.activa == True,
+            ~Propiedad.url.in_(vistos)
+        ).update({"activa": False}, synchronize_session=False)
+        session.rollback()
+        resultado = f"{afectadas} filas"
+    except Exception as e:
+        session.rollback()
+        resultado = f"ERROR: {str(e).splitlines()[0][:60]}"
+    finally:
+        session.close()
+    return len(vistos), memoria, time.perf_counter() - t0, resultado
+
+
+def medir_set(engine, filas):
+    pipeline = DatabasePipeline(str(engine.url))
+    pipeline.engine = engine
+
+    tracemalloc.start()
+    pipeline.items_vistos = set()
+    for url in urls_crawleadas(filas):
+        pipeline.items_vistos.add(url)
+    memoria = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    conn = engine.connect()
+    trans = conn.begin()
+    afectadas = pipeline._desactivar_no_vistas(conn, 'zonaprop', 1)
+    trans.rollback()
+    conn.close()
+    return len(pipeline.items_vistos), memoria, time.perf_counter() - t0, f"{afectadas} filas"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=[10000, 100000, 300000])
+    args = parser.parse_args()
+
+    print(f"{'filas':>8} {'estrategia':>12} {'urls':>8} {'memoria':>10} {'tiempo':>9}  resultado")
+    for filas in args.filas:
+        tmp = tempfile.mkdtemp()
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        poblar(engine, filas)
+
+        for nombre, fn in [('lista+NOT IN', medir_lista), ('set+temp', medir_set)]:
+            urls, memoria, segundos, resultado = fn(engine, filas)
+            print(f"{filas:>8} {nombre:>12} {urls:>8} {memoria / 1e6:>8.1f}MB {segundos * 1000:>7.0f}ms  {resultado}")
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Benchmark: deduplicación entre fuentes (scraper/duplicados.py).
+
+Primero corre escenarios chicos con el DatabasePipeline real y verifica los
+grupos que quedan:
+- la misma propiedad en tres portales termina en un solo grupo;
+- un aviso que coincide con varias unidades vecinas de un mismo portal
+  (Pellegrini 1501-1504, precios a menos del 5%) se une solo a la más
+  parecida y las unidades siguen en grupos distintos, llegue antes o después.
+
+Después mide el costo por fila de `agrupar` con N propiedades a densidad
+constante (la mitad publicadas en una segunda fuente).
+
+Uso:
+    python benchmarks/bench_duplicados.py [--filas 5000 20000]
+"""
+import argparse
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, select
+
+from scraper.modelos import Propiedad
+from scraper.pipelines import DatabasePipeline
+
+
+def corrida(url, fuente, items):
+    class Spider:
+        name = fuente
+        logger = logging.getLogger('bench')
+
+    pipeline = DatabasePipeline(url)
+    spider = Spider()
+    pipeline.open_spider(spider)
+    for item in items:
+        pipeline.process_item(dict(item, fuente=fuente), spider)
+    # Sin close_spider: no desactivar lo que no aparece en la corrida
+    pipeline.flush()
+    pipeline.engine.dispose()
+
+
+def grupos(url):
+    engine = create_engine(url)
+    with engine.connect() as conn:
+        filas = conn.execute(select(Propiedad.url, Propiedad.grupo_id)).all()
+    engine.dispose()
+    por_grupo = {}
+    for url_, grupo_id in filas:
+        por_grupo.setdefault(grupo_id, set()).add(url_)
+    return sorted(por_grupo.values(), key=sorted)
+
+
+def unidad(numero, precio):
+    return {'url': f'z/{numero}', 'direccion': f'Pellegrini {numero}', 'precio': precio,
+            'superficie_total': 45, 'ambientes': 2}
+
+
+VECINAS = [unidad(1501, 200000), unidad(1502, 202000), unidad(1503, 204000), unidad(1504, 206000)]
+AVISO_ARGENPROP = {'url': 'a/1', 'direccion': 'Av. Pellegrini 1502', 'precio': 203000,
+                   'superficie_total': 45, 'ambientes': 2}
+
+
+def _sin_encadenar(resultado):
+    """Cada unidad de zonaprop en su propio grupo; el aviso de argenprop con la de su altura"""
+    return (len(resultado) == 4 and {'a/1', 'z/1502'} in resultado
+            and all(sum(u.startswith('z/') for u in g) == 1 for g in resultado))
+
+
+ESCENARIOS = [
+    (
+        "misma propiedad en tres portales",
+        [('zonaprop', [{'url': 'z/1', 'direccion': 'Av. Pellegrini 1540', 'precio': 300000, 'superficie_total': 50}]),
+         ('argenprop', [{'url': 'a/1', 'direccion': 'Avenida Pellegrini al 1550, Rosario', 'precio': 305000,
+                         'superficie_total': 52}]),
+         ('remax', [{'url': 'r/1', 'direccion': 'Pellegrini 1545', 'precio': 302000}])],
+        lambda resultado: len(resultado) == 1,
+    ),
+    (
+        "vecinas del mismo portal, un aviso que coincide con todas (después)",
+        [('zonaprop', VECINAS), ('argenprop', [AVISO_ARGENPROP])],
+        _sin_encadenar,
+    ),
+    (
+        "vecinas del mismo portal, un aviso que coincide con todas (antes)",
+        [('argenprop', [AVISO_ARGENPROP]), ('zonaprop', VECINAS)],
+        _sin_encadenar,
+    ),
+]
+
+
+def verificar_escenarios():
+    fallas = 0
+    for nombre, corridas, esperado in ESCENARIOS:
+        url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'dup.db')}"
+        for fuente, items in corridas:
+            corrida(url, fuente, items)
+        resultado = grupos(url)
+        ok = esperado(resultado)
+        fallas += not ok
+        print(f"  {'✅' if ok else '❌'} {nombre}: {[sorted(g) for g in resultado]}")
+    return fallas
+
+
+def medir(filas):
+    """Segundos de agrupar para `filas` propiedades en dos fuentes"""
+    random.seed(filas)
+    calles = [f'Calle {i}' for i in range(filas // 20)]
+    base = []
+    for i in range(filas // 2):
+        base.append({
+            'direccion': f'{random.choice(calles)} {random.randrange(100, 3000)}',
+            'precio': round(random.uniform(100000, 2000000), -3),
+            'superficie_total': random.randrange(30, 150),
+            'ambientes': random.randrange(1, 5),
+            'latitud': -32.9 - random.random() * 0.1,
+            'longitud': -60.6 - random.random() * 0.1,
+        })
+    url = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'dup.db')}"
+    t0 = time.perf_counter()
+    corrida(url, 'zonaprop', [dict(p, url=f'z/{i}') for i, p in enumerate(base)])
+    corrida(url, 'argenprop', [dict(p, url=f'a/{i}', precio=p['precio'] * 1.02) for i, p in enumerate(base)])
+    return time.perf_counter() - t0, grupos(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, nargs='+', default=[5000, 20000])
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print("Escenarios:")
+    fallas = verificar_escenarios()
+
+    print(f"\n  {'filas':>8} {'total s':>9} {'ms/fila':>8} {'grupos de 2':>12}")
+    for filas in args.filas:
+        segundos, resultado = medir(filas)
+        pares = sum(len(g) == 2 for g in resultado)
+        print(f"  {filas:>8} {segundos:>9.1f} {segundos / filas * 1000:>8.2f} {pares:>12}")
+    sys.exit(1 if fallas else 0)
+
+
+if __name__ == '__main__':
+    main()
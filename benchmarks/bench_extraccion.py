@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiempo de parseo por página, extracción anterior vs. scraper/extraccion.py.
+
+Corre sobre las páginas guardadas en benchmarks/fixtures/ (o las de --fixtures):
+- rentola_detalle.html: BeautifulSoup + 5 regex sobre el HTML crudo
+  vs. RentolaAsyncSpider.parsear_propiedad
+- roomix_detalle.html: selectores `*:contains(...)` + regex sobre el HTML crudo
+  vs. RoomixSpider.parse_property
+- listado_tarjetas.html: `::text` de cada tarjeta + regex literales
+  vs. Pagina + caracteristicas_tarjeta (lo que usan los spiders *_simple)
+
+Además de los tiempos muestra los campos extraídos por cada versión: los regex
+sobre el HTML crudo levantan valores del JS/JSON embebido.
+
+Uso:
+    python benchmarks/bench_extraccion.py [--repeticiones 50] [--fixtures DIR]
+"""
+import argparse
+import logging
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bs4 import BeautifulSoup
+from scrapy.http import HtmlResponse
+
+from scraper.spiders.rentola_async import RentolaAsyncSpider
+from scraper.spiders.roomix_spider import RoomixSpider
+from scraper.extraccion import Pagina, caracteristicas_tarjeta
+
+
+# --- Versiones anteriores (copias de la lógica de extracción, sin logging) ---
+
+def rentola_anterior(html, url):
+    soup = BeautifulSoup(html, 'html.parser')
+    h1 = soup.find('h1')
+    titulo = h1.get_text(strip=True) if h1 else None
+    precio = None
+    for pattern in [r'\$\s*([\d.,]+)', r'ARS\s*([\d.,]+)', r'(\d{6,})\s*ARS']:
+        match = re.search(pattern, html)
+        if match:
+            try:
+                precio = float(match.group(1).replace('.', '').replace(',', '.'))
+                break
+            except ValueError:
+                continue
+    superficie = re.search(r'(\d+(?:[.,]\d+)?)\s*m[²2]', html, re.IGNORECASE)
+    dormitorios = re.search(r'(\d+)\s*(?:dormitorio|habitación|habitacion)', html, re.IGNORECASE)
+    banos = re.search(r'(\d+)\s*baño', html, re.IGNORECASE)
+    meta = soup.find('meta', property='og:locality')
+    texto = f"{titulo} {html}".lower()
+    return {
+        'titulo': titulo,
+        'precio': precio,
+        'superficie_total': float(superficie.group(1).replace(',', '.')) if superficie else None,
+        'dormitorios': int(dormitorios.group(1)) if dormitorios else None,
+        'banos': int(banos.group(1)) if banos else None,
+        'direccion': meta.get('content') if meta else 'Rosario',
+        'patio': any(w in texto for w in ['patio', 'jardín', 'jardin', 'quincho', 'parrilla', 'terraza', 'balcón', 'balcon']),
+    }
+
+
+def roomix_anterior(response):
+    titulo = response.css('h1::text').get()
+    precio_text = response.css('span.price::text, div.price::text, strong.price::text').get()
+    if not precio_text:
+        match = re.search(r'\$\s*([\d.,]+)', response.text)
+        precio_text = match.group(1) if match else None
+    superficie = response.css('*:contains("m²")::text, *:contains("m2")::text').re_first(r'([\d.,]+)\s*m[²2]')
+    dormitorios = response.css('*:contains("dormitorio")::text, *:contains("habitación")::text').re_first(
+        r'(\d+)\s*(?:dormitorio|habitación|habitacion)')
+    banos = response.css('*:contains("baño")::text').re_first(r'(\d+)\s*baño')
+    ambientes = response.css('*:contains("ambiente")::text').re_first(r'(\d+)\s*ambiente')
+    texto = f"{titulo} {response.text}".lower()
+    return {
+        'titulo': titulo.strip() if titulo else None,
+        'precio': float(re.sub(r'[^\d]', '', precio_text)) if precio_text else None,
+        'superficie_total': float(superficie.replace(',', '.')) if superficie else None,
+        'dormitorios': int(dormitorios) if dormitorios else None,
+        'banos': int(banos) if banos else None,
+        'ambientes': int(ambientes) if ambientes else None,
+        'mascotas': any(w in texto for w in ['mascota', 'pet', 'perro', 'gato']),
+    }
+
+
+def tarjetas_anterior(response):
+    items = []
+    for prop in response.css('div[data-posting-type="PROPERTY"]'):
+        all_text = ' '.join(prop.css('::text').getall())
+        item = {}
+        for campo, patron in [('ambientes', r'(\d+)\s*amb'), ('superficie_total', r'(\d+)\s*m[²2]'),
+                              ('dormitorios', r'(\d+)\s*dorm'), ('banos', r'(\d+)\s*ba[ñn]o'),
+                              ('cocheras', r'(\d+)\s*coch')]:
+            match = re.search(patron, all_text, re.IGNORECASE)
+            if match:
+                item[campo] = match.group(1)
+        if re.search(r'\bpatio\b', all_text, re.IGNORECASE):
+            item['patio'] = True
+        ' '.join(prop.css('::text').getall()).lower()  # filtro de fecha
+        items.append(item)
+    return items
+
+
+# --- Versiones con el extractor compartido ---
+
+def respuesta(url, html):
+    return HtmlResponse(url, body=html.encode('utf-8'), encoding='utf-8')
+
+
+_RENTOLA = RentolaAsyncSpider()  # Una sola vez: el spider crea su cliente httpx
+
+
+def rentola_nueva(html, url):
+    return dict(_RENTOLA.parsear_propiedad(html, url))
+
+
+def roomix_nueva(response):
+    return dict(next(RoomixSpider().parse_property(response)))
+
+
+def tarjetas_nueva(response):
+    items = []
+    for prop in response.css('div[data-posting-type="PROPERTY"]'):
+        tarjeta = Pagina(prop)
+        items.append(caracteristicas_tarjeta(tarjeta))
+        tarjeta.minuscula  # filtro de fecha
+    return items
+
+
+def medir(funcion, repeticiones, *args):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        resultado = funcion(*args)
+        mejor = min(mejor, time.perf_counter() - t0)
+    return mejor * 1000, resultado
+
+
+CAMPOS = ('titulo', 'precio', 'superficie_total', 'dormitorios', 'banos', 'ambientes', 'patio', 'mascotas')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeticiones', type=int, default=50)
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(__file__), 'fixtures'))
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+
+    def leer(nombre):
+        with open(os.path.join(args.fixtures, nombre), encoding='utf-8') as f:
+            return f.read()
+
+    rentola = leer('rentola_detalle.html')
+    roomix = leer('roomix_detalle.html')
+    listado = leer('listado_tarjetas.html')
+    url_rentola = 'https://rentola.ar/listings/ejemplo'
+
+    # Cada HtmlResponse se crea dentro de la medición: parsel cachea el árbol
+    casos = [
+        ('rentola_detalle', len(rentola),
+         (rentola_anterior, rentola, url_rentola), (rentola_nueva, rentola, url_rentola)),
+        ('roomix_detalle', len(roomix),
+         (lambda: roomix_anterior(respuesta('https://roomix.ai/propiedad/1', roomix)),),
+         (lambda: roomix_nueva(respuesta('https://roomix.ai/propiedad/1', roomix)),)),
+        ('listado_tarjetas', len(listado),
+         (lambda: tarjetas_anterior(respuesta('https://www.zonaprop.com.ar/l.html', listado)),),
+         (lambda: tarjetas_nueva(respuesta('https://www.zonaprop.com.ar/l.html', listado)),)),
+    ]
+
+    print(f"{'página':<18} {'KB':>5} {'anterior':>10} {'extractor':>10} {'mejora':>7}")
+    resultados = []
+    for nombre, tamano, anterior, nueva in casos:
+        t_anterior, r_anterior = medir(anterior[0], args.repeticiones, *anterior[1:])
+        t_nueva, r_nueva = medir(nueva[0], args.repeticiones, *nueva[1:])
+        print(f"{nombre:<18} {tamano / 1024:>5.0f} {t_anterior:>8.2f}ms {t_nueva:>8.2f}ms {t_anterior / t_nueva:>6.1f}x")
+        resultados.append((nombre, r_anterior, r_nueva))
+
+    print()
+    for nombre, r_anterior, r_nueva in resultados:
+        if isinstance(r_anterior, list):
+            iguales = sum(
+                {k: v for k, v in a.items() if k != 'mascotas'} == {k: v for k, v in b.items() if k != 'mascotas'}
+                for a, b in zip(r_anterior, r_nueva)
+            )
+            print(f"{nombre}: {iguales}/{len(r_anterior)} tarjetas con los mismos campos")
+            continue
+        print(f"{nombre}:")
+        for campo in CAMPOS:
+            if campo in r_anterior or campo in r_nueva:
+                print(f"  {campo:<17} {str(r_anterior.get(campo)):<45} {r_nueva.get(campo)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hashes perceptuales de fotos y búsqueda con IndiceHashes vs. recorrido lineal.
+
+1. Hashea las fotos de benchmarks/fixtures/imagenes con ImagenesPipeline
+   (rutas locales, sin red), dos veces: la segunda sale de la caché en disco.
+   Muestra la distancia de cada variante (más chica, recomprimida, más clara)
+   a su original y la mínima entre fotos distintas.
+2. Arma un IndiceHashes (multi-index hashing) con --hashes hashes al azar
+   más copias con pocos bits cambiados y compara buscar(radio) contra
+   recorrer todos los hashes.
+
+Requiere Pillow.
+
+Uso:
+    python benchmarks/bench_imagenes.py [--hashes 200000] [--consultas 200] [--radio 6]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from scraper.imagenes import IndiceHashes, ImagenesPipeline, distancia
+
+
+VARIANTES = ('chica', 'recomprimida', 'clara')
+
+
+async def hashear(pipeline, rutas):
+    return [h for h, _ in await asyncio.gather(*(pipeline.analizar_imagen(ruta) for ruta in rutas))]
+
+
+def fotos(directorio):
+    nombres = sorted(n for n in os.listdir(directorio) if n.endswith('.jpg'))
+    rutas = [os.path.join(directorio, n) for n in nombres]
+
+    with tempfile.TemporaryDirectory() as cache:
+        pipeline = ImagenesPipeline(cache_dir=cache, dir_fixtures=directorio)
+        pipeline.open_spider(None)
+        t0 = time.perf_counter()
+        hashes = asyncio.run(hashear(pipeline, rutas))
+        sin_cache = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        desde_cache = asyncio.run(hashear(pipeline, rutas))
+        con_cache = time.perf_counter() - t0
+    assert hashes == desde_cache, "la caché devolvió otros hashes"
+
+    print(f"{len(rutas)} fotos: {sin_cache * 1000 / len(rutas):.1f} ms/foto decodificando, "
+          f"{con_cache * 1000 / len(rutas):.1f} ms/foto desde la caché\n")
+
+    por_nombre = {n[:-4]: h for n, h in zip(nombres, hashes)}
+    originales = [n for n in por_nombre if '_' not in n]
+    for original in originales:
+        distancias = [f"{v} {distancia(por_nombre[original], por_nombre[f'{original}_{v}'])}"
+                      for v in VARIANTES if f'{original}_{v}' in por_nombre]
+        if distancias:
+            print(f"  {original:<12} -> {', '.join(distancias)}")
+    distintas = min(distancia(por_nombre[a], por_nombre[b]) for a in originales for b in originales if a < b)
+    print(f"  mínima entre fotos distintas: {distintas} bits\n")
+
+
+def indice(cantidad, consultas, radio):
+    random.seed(42)
+    hashes = [random.getrandbits(64) for _ in range(cantidad)]
+    # Copias con pocos bits cambiados, como la misma foto publicada en otro portal
+    for h in random.sample(hashes, cantidad // 100):
+        for _ in range(3):
+            hashes.append(h ^ sum(1 << b for b in random.sample(range(64), random.randint(1, 4))))
+
+    t0 = time.perf_counter()
+    indice_hashes = IndiceHashes()
+    for h in hashes:
+        indice_hashes.agregar(h)
+    construccion = time.perf_counter() - t0
+
+    distintos = list(indice_hashes.hashes)
+    buscados = random.sample(hashes, consultas)
+    t0 = time.perf_counter()
+    lineal = [sorted((d, h) for h in distintos if (d := distancia(q, h)) <= radio) for q in buscados[:20]]
+    t_lineal = (time.perf_counter() - t0) / 20
+    t0 = time.perf_counter()
+    resultados = [indice_hashes.buscar(q, radio) for q in buscados]
+    t_indice = (time.perf_counter() - t0) / consultas
+    assert resultados[:20] == lineal, "el índice y el recorrido lineal difieren"
+
+    encontrados = sum(len(r) for r in resultados) / consultas
+    print(f"{len(indice_hashes):,} hashes distintos (índice en {construccion:.1f}s), radio {radio}, "
+          f"{encontrados:.1f} resultados por consulta")
+    print(f"  lineal        {t_lineal * 1000:>8.2f} ms/consulta")
+    print(f"  IndiceHashes  {t_indice * 1000:>8.2f} ms/consulta  ({t_lineal / t_indice:.0f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hashes', type=int, default=200000)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--radio', type=int, default=6)
+    parser.add_argument('--fixtures', default=os.path.join(os.path.dirname(__file__), 'fixtures', 'imagenes'))
+    args = parser.parse_args()
+
+    fotos(args.fixtures)
+    indice(args.hashes, args.consultas, args.radio)
+
+
+if __name__ == '__main__':
+    main()
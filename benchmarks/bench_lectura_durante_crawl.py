@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latencia de la API mientras el scraper escribe en la misma base SQLite.
+
+Levanta uvicorn sobre una base temporal con N propiedades y mide la latencia
+de consultas típicas (listado con filtro, detalle) primero sin escrituras y
+después con un proceso que hace de crawl: un DatabasePipeline real que
+escribe lotes de DATABASE_BATCH_SIZE items (altas y cambios de precio) sin
+parar, con sus triggers de búsqueda, historial y duplicados. --lotes-por-segundo
+limita el ritmo del crawl (0: sin límite, que en una máquina de un núcleo
+mide más la competencia por CPU que por la base).
+
+Lo hace dos veces:
+- sin pragmas: journal de rollback y synchronous=FULL (lo de SQLite por
+  defecto): cada commit del scraper bloquea a los lectores;
+- con pragmas (scraper/conexion.py): WAL, synchronous=NORMAL, mmap y una
+  sola conexión de escritura; los lectores no esperan al escritor.
+
+Uso:
+    python benchmarks/bench_lectura_durante_crawl.py [--filas 50000] [--segundos 10] [--lectores 4]
+        [--lotes-por-segundo 4]
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import httpx
+from sqlalchemy import create_engine
+
+from api.models import Base
+from bench_concurrencia_api import puerto_libre, esperar_api
+from bench_paginacion import poblar
+
+
+RUTAS = [
+    '/propiedades?barrio=Centro&limit=50',
+    '/propiedades?precio_max=800000&ordenar=precio_asc&limit=50',
+    '/propiedades/{id}',
+]
+
+
+def crawl(url, pragmas, filas, ritmo, detener, lotes):
+    """Proceso escritor: lotes de altas y cambios de precio hasta que se pida parar"""
+    from scraper.pipelines import DatabasePipeline
+
+    class Spider:
+        name = 'zonaprop'
+        logger = logging.getLogger('crawl')
+
+    logging.disable(logging.WARNING)
+    pipeline = DatabasePipeline(url, sqlite_pragmas=pragmas)
+    spider = Spider()
+    pipeline.open_spider(spider)
+    nueva = filas
+    siguiente = time.perf_counter()
+    while not detener.is_set():
+        for _ in range(pipeline.batch_size):
+            if random.random() < 0.3:
+                i, nueva = nueva, nueva + 1
+            else:
+                i = random.randrange(filas)
+            pipeline.process_item({
+                'fuente': 'zonaprop',
+                'url': f'https://example.com/p/{i}',
+                'titulo': f'Propiedad {i}',
+                'barrio': random.choice(['Centro', 'Pichincha', 'Echesortu']),
+                'precio': round(random.uniform(100000, 2000000), -3),
+            }, spider)
+        lotes.value += 1
+        if ritmo:
+            siguiente += 1 / ritmo
+            time.sleep(max(0.0, siguiente - time.perf_counter()))
+    # Sin close_spider: desactivaría todo lo que no se vio en la corrida
+    pipeline.flush()
+    pipeline.engine.dispose()
+
+
+async def leer(client, filas, hasta, latencias):
+    while time.perf_counter() < hasta:
+        ruta = random.choice(RUTAS).format(id=random.randint(1, filas))
+        t0 = time.perf_counter()
+        respuesta = await client.get(ruta)
+        if respuesta.status_code >= 500:
+            respuesta.raise_for_status()
+        latencias.append(time.perf_counter() - t0)
+
+
+async def medir(base_url, filas, segundos, lectores):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        latencias = []
+        hasta = time.perf_counter() + segundos
+        await asyncio.gather(*(leer(client, filas, hasta, latencias) for _ in range(lectores)))
+    return sorted(latencias)
+
+
+def percentil(valores, p):
+    return valores[min(len(valores) - 1, int(len(valores) * p))] * 1000
+
+
+def escenario(nombre, pragmas, plantilla, args):
+    ruta = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    with open(plantilla, 'rb') as origen, open(ruta, 'wb') as destino:
+        destino.write(origen.read())
+    url = f"sqlite:///{ruta}"
+
+    puerto = puerto_libre()
+    servidor = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'api.main:app', '--port', str(puerto), '--log-level', 'warning'],
+        cwd=os.path.join(os.path.dirname(__file__), '..'),
+        env={**os.environ, 'DATABASE_URL': url, 'SQLITE_PRAGMAS': '1' if pragmas else '0'},
+    )
+    base_url = f"http://127.0.0.1:{puerto}"
+    try:
+        async def preparar():
+            async with httpx.AsyncClient(base_url=base_url) as client:
+                await esperar_api(client)
+        asyncio.run(preparar())
+        # La API ya creó índices y tablas auxiliares; ahora se mide
+        asyncio.run(medir(base_url, args.filas, 1, args.lectores))
+        sola = asyncio.run(medir(base_url, args.filas, args.segundos, args.lectores))
+
+        detener = multiprocessing.Event()
+        lotes = multiprocessing.Value('i', 0)
+        escritor = multiprocessing.Process(target=crawl, args=(url, pragmas, args.filas, args.lotes_por_segundo, detener, lotes))
+        escritor.start()
+        inicio = time.perf_counter()
+        time.sleep(1)  # que abra la base y empiece a escribir
+        con_crawl = asyncio.run(medir(base_url, args.filas, args.segundos, args.lectores))
+        detener.set()
+        escritor.join()
+        duracion = time.perf_counter() - inicio
+    finally:
+        servidor.terminate()
+        servidor.wait()
+
+    print(f"\n{nombre}")
+    print(f"  {'':<12} {'requests':>9} {'p50 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    for etiqueta, latencias in (('sin crawl', sola), ('con crawl', con_crawl)):
+        print(f"  {etiqueta:<12} {len(latencias):>9} {percentil(latencias, 0.5):>8.1f} "
+              f"{percentil(latencias, 0.99):>8.1f} {latencias[-1] * 1000:>8.1f}")
+    print(f"  crawl: {lotes.value} lotes de 200 items en {duracion:.0f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, default=50000)
+    parser.add_argument('--segundos', type=int, default=10)
+    parser.add_argument('--lectores', type=int, default=4)
+    parser.add_argument('--lotes-por-segundo', type=float, default=4)
+    args = parser.parse_args()
+
+    random.seed(42)
+    plantilla = os.path.join(tempfile.mkdtemp(), 'plantilla.db')
+    engine = create_engine(f"sqlite:///{plantilla}")
+    Base.metadata.create_all(engine)
+    print(f"📦 Generando {args.filas} propiedades...")
+    poblar(engine, args.filas)
+    engine.dispose()
+
+    escenario("Sin pragmas (journal de rollback, synchronous=FULL)", False, plantilla, args)
+    escenario("Con pragmas (WAL, synchronous=NORMAL, un escritor)", True, plantilla, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: NormalizacionPipeline anterior vs. la compilada por tabla.
+
+Genera items sintéticos con la mezcla de formatos que traen los spiders
+(precios "$ 350.000", "U$S 1.200,50", números ya parseados, superficies
+"45 m²", textos con saltos de línea...), verifica que ambas versiones
+producen exactamente lo mismo y reporta items/seg de cada una.
+
+Uso:
+    python benchmarks/bench_normalizacion.py [--items 50000] [--repeticiones 3]
+"""
+import argparse
+import copy
+import gc
+import os
+import random
+import re
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from itemadapter import ItemAdapter
+
+from scraper.items import PropiedadItem
+from scraper.pipelines import NormalizacionPipeline
+
+
+class NormalizacionAnterior:
+    """Copia de la implementación previa, como línea de base"""
+
+    def process_item(self, item, spider):
+        adapter = ItemAdapter(item)
+        if adapter.get('precio'):
+            adapter['precio'] = self._normalizar_precio(adapter['precio'])
+        for campo in ['superficie_total', 'superficie_cubierta']:
+            if adapter.get(campo):
+                adapter[campo] = self._normalizar_superficie(adapter[campo])
+        for campo in ['ambientes', 'dormitorios', 'banos', 'cocheras']:
+            if adapter.get(campo):
+                adapter[campo] = self._normalizar_entero(adapter[campo])
+        for campo in ['mascotas', 'amoblado', 'patio']:
+            if campo in adapter:
+                adapter[campo] = self._normalizar_bool(adapter[campo])
+        for campo in ['titulo', 'descripcion', 'barrio', 'direccion']:
+            if adapter.get(campo):
+                adapter[campo] = self._limpiar_texto(adapter[campo])
+        adapter['fecha_scraping'] = datetime.now()
+        adapter.setdefault('provincia', 'Santa Fe')
+        adapter.setdefault('ciudad', 'Rosario')
+        adapter.setdefault('moneda', 'ARS')
+        adapter.setdefault('operacion', 'Alquiler')
+        adapter.setdefault('tipo', 'Departamento')
+        return item
+
+    def _normalizar_precio(self, precio):
+        if isinstance(precio, (int, float)):
+            return float(precio)
+        precio_str = str(precio).replace('$', '').replace('U$S', '').replace('USD', '')
+        precio_str = re.sub(r'[^\d,.]', '', precio_str)
+        precio_str = precio_str.replace('.', '').replace(',', '.')
+        try:
+            return float(precio_str)
+        except (ValueError, AttributeError):
+            return None
+
+    def _normalizar_superficie(self, superficie):
+        if isinstance(superficie, (int, float)):
+            return float(superficie)
+        match = re.search(r'(\d+(?:[.,]\d+)?)', str(superficie))
+        if match:
+            return float(match.group(1).replace(',', '.'))
+        return None
+
+    def _normalizar_entero(self, valor):
+        if isinstance(valor, int):
+            return valor
+        match = re.search(r'(\d+)', str(valor))
+        if match:
+            return int(match.group(1))
+        return None
+
+    def _normalizar_bool(self, valor):
+        if isinstance(valor, bool):
+            return valor
+        valor_str = str(valor).lower()
+        return valor_str in ['true', 'si', 'sí', '1', 'yes', 'permitido', 'acepta']
+
+    def _limpiar_texto(self, texto):
+        if not texto:
+            return None
+        texto = str(texto).strip()
+        texto = re.sub(r'\s+', ' ', texto)
+        return texto if texto else None
+
+
+PRECIOS = ['$ 350.000', 'U$S 1.200,50', 'USD 800', '$450000', 'Consultar', 280000, 310000.0, '']
+SUPERFICIES = ['45 m²', '62,5 m2', '120m²', 38, 54.0, 'sin dato', None]
+ENTEROS = ['2 ambientes', '3', 1, 4, 'Monoambiente', None]
+BOOLEANOS = [True, False, 'Sí', 'no', 'permitido', None, 'acepta']
+TEXTOS = ['  Depto   luminoso\n\n al frente ', 'Centro', ' Pichincha ', '\t', None,
+          'Alquiler de departamento de 2 ambientes con balcón, cerca del río.  \n  Expensas bajas.']
+
+
+def item_aleatorio(i):
+    item = PropiedadItem(fuente='bench', url=f'https://ejemplo.com/{i}')
+    item['precio'] = random.choice(PRECIOS)
+    for campo in ('superficie_total', 'superficie_cubierta'):
+        item[campo] = random.choice(SUPERFICIES)
+    for campo in ('ambientes', 'dormitorios', 'banos', 'cocheras'):
+        item[campo] = random.choice(ENTEROS)
+    for campo in ('mascotas', 'amoblado', 'patio'):
+        if random.random() < 0.7:
+            item[campo] = random.choice(BOOLEANOS)
+    for campo in ('titulo', 'descripcion', 'barrio', 'direccion'):
+        item[campo] = random.choice(TEXTOS)
+    if random.random() < 0.5:
+        item['moneda'] = 'USD'
+    return item
+
+
+def medir(nombre, funcion, items, repeticiones):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        copia = copy.deepcopy(items)
+        gc.collect()
+        gc.disable()
+        t0 = time.perf_counter()
+        funcion(copia)
+        mejor = min(mejor, time.perf_counter() - t0)
+        gc.enable()
+    print(f"{nombre:<32} {len(items) / mejor:>12,.0f} items/seg")
+    return mejor
+
+
+def sin_fecha(item):
+    return {k: v for k, v in item.items() if k != 'fecha_scraping'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--items', type=int, default=50000)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(42)
+    items = [item_aleatorio(i) for i in range(args.items)]
+
+    anterior = NormalizacionAnterior()
+    nueva = NormalizacionPipeline()
+
+    # Misma salida en ambas versiones
+    a = [anterior.process_item(it, None) for it in copy.deepcopy(items)]
+    b = [nueva.process_item(it, None) for it in copy.deepcopy(items)]
+    assert [sin_fecha(x) for x in a] == [sin_fecha(x) for x in b], "las versiones difieren"
+    print(f"✅ {args.items} items: misma salida en ambas versiones\n")
+
+    base = medir("anterior (process_item)", lambda lote: [anterior.process_item(it, None) for it in lote],
+                 items, args.repeticiones)
+    item = medir("compilada (process_item)", lambda lote: [nueva.process_item(it, None) for it in lote],
+                 items, args.repeticiones)
+    print(f"\nmejora: {base / item:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark: paginación OFFSET vs keyset (cursor) en GET /propiedades
+
+Genera una base SQLite temporal con N propiedades y mide cuánto tarda
+en traerse una página a distintas profundidades con cada estrategia.
+
+Uso:
+    python benchmarks/bench_paginacion.py [--filas 120000] [--limit 50]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+from api.database import url_async
+from api.models import Base, Propiedad
+from api.paginacion import paginar_keyset, ordenar_query
+
+
+def poblar(engine, filas):
+    """Inserta `filas` propiedades sintéticas en lotes"""
+    ahora = datetime.utcnow()
+    barrios = ['Centro', 'Pichincha', 'Echesortu', 'Abasto', 'Fisherton', 'Alberdi']
+    lote = []
+    with engine.begin() as conn:
+        for i in range(filas):
+            lote.append({
+                'fuente': random.choice(['zonaprop', 'argenprop', 'remax']),
+                'url': f'https://example.com/p/{i}',
+                'titulo': f'Propiedad {i}',
+                'barrio': random.choice(barrios),
+                'precio': random.choice([None, round(random.uniform(100000, 2000000), -3)]),
+                'superficie_total': random.choice([None, float(random.randint(25, 300))]),
+                'fecha_scraping': ahora - timedelta(seconds=random.randint(0, 90 * 86400)),
+                'activa': random.random() > 0.1,
+            })
+            if len(lote) == 10000:
+                conn.execute(insert(Propiedad), lote)
+                lote = []
+        if lote:
+            conn.execute(insert(Propiedad), lote)
+
+
+async def medir(fn, repeticiones=5):
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        await fn()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos) * 1000
+
+
+async def recorrer(Session, limit):
+    for ordenar in ['reciente', 'precio_asc', 'precio_desc', 'superficie_desc']:
+        print(f"\n🔎 ordenar={ordenar}")
+        print(f"{'página':>8} {'offset (ms)':>12} {'keyset (ms)':>12}")
+
+        async with Session() as db:
+            base = select(Propiedad).where(Propiedad.activa == True)
+
+            # Recorrer todas las páginas con cursor guardando algunos para medir
+            cursores = {1: None}
+            pagina, cursor = 1, None
+            while True:
+                _, cursor = await paginar_keyset(db, base, ordenar, cursor, limit)
+                if not cursor:
+                    break
+                pagina += 1
+                cursores[pagina] = cursor
+
+            paginas = sorted({1, 10, 100, pagina // 2, pagina} & cursores.keys())
+            for p in paginas:
+                skip = (p - 1) * limit
+
+                async def con_offset():
+                    (await db.scalars(ordenar_query(base, ordenar).offset(skip).limit(limit))).all()
+
+                async def con_keyset():
+                    await paginar_keyset(db, base, ordenar, cursores[p], limit)
+
+                t_offset = await medir(con_offset)
+                t_keyset = await medir(con_keyset)
+                print(f"{p:>8} {t_offset:>12.2f} {t_keyset:>12.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--filas', type=int, default=120000)
+    parser.add_argument('--limit', type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(42)
+    tmp = tempfile.mkdtemp()
+    url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    print(f"📦 Generando {args.filas} propiedades...")
+    poblar(engine, args.filas)
+    engine.dispose()
+
+    async_engine = create_async_engine(url_async(url))
+    asyncio.run(recorrer(async_sessionmaker(async_engine), args.limit))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: páginas/minuto de SeleniumMiddleware según SELENIUM_POOL_SIZE.
+
+Levanta un servidor HTTP local que sirve páginas cuyo contenido aparece por
+JavaScript después de --demora-js ms (como los listados de zonaprop/remax) y
+crawlea --paginas de ellas con Selenium para cada tamaño de pool. Requiere
+Chrome/Chromium y chromedriver instalados.
+
+Uso:
+    python benchmarks/bench_selenium_pool.py [--paginas 24] [--pools 1,2,4] [--demora-js 800]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import scrapy
+from scrapy.crawler import CrawlerProcess
+
+
+PAGINA = """<html><body><div id="listado"></div><script>
+setTimeout(function () {
+  document.getElementById('listado').innerHTML = '<h1 class="tarjeta">Propiedad %(n)s</h1>';
+}, %(demora)d);
+</script></body></html>"""
+
+
+def servidor(demora_js):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            cuerpo = (PAGINA % {'n': self.path.strip('/'), 'demora': demora_js}).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+class PoolSpider(scrapy.Spider):
+    name = 'bench_selenium_pool'
+
+    def __init__(self, base=None, paginas=24, **kwargs):
+        super().__init__(**kwargs)
+        self.base = base
+        self.paginas = int(paginas)
+        self.renderizadas = 0
+
+    async def start(self):
+        for n in range(self.paginas):
+            yield scrapy.Request(
+                f'{self.base}/{n}',
+                meta={'selenium': True, 'wait_for': '.tarjeta', 'wait_time': 0},
+            )
+
+    def parse(self, response):
+        if response.css('.tarjeta::text').get():
+            self.renderizadas += 1
+
+
+def correr(base, paginas, pool):
+    """Un crawl por proceso: el reactor de Twisted no se puede reiniciar"""
+    proceso = CrawlerProcess({
+        'TWISTED_REACTOR': 'twisted.internet.asyncioreactor.AsyncioSelectorReactor',
+        'DOWNLOADER_MIDDLEWARES': {'scraper.middlewares.SeleniumMiddleware': 800},
+        'SELENIUM_ENABLED': True,
+        'SELENIUM_POOL_SIZE': pool,
+        'CONCURRENT_REQUESTS': 16,
+        'CONCURRENT_REQUESTS_PER_DOMAIN': 16,
+        'DOWNLOAD_DELAY': 0,
+        'LOG_LEVEL': 'ERROR',
+    })
+    crawler = proceso.create_crawler(PoolSpider)
+    proceso.crawl(crawler, base=base, paginas=paginas)
+    t0 = time.perf_counter()
+    proceso.start()
+    duracion = time.perf_counter() - t0
+    print(f"{pool} {duracion:.3f} {crawler.spider.renderizadas}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--paginas', type=int, default=24)
+    parser.add_argument('--pools', default='1,2,4')
+    parser.add_argument('--demora-js', type=int, default=800)
+    parser.add_argument('--_correr', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._correr:
+        base, paginas, pool = args._correr
+        correr(base, int(paginas), int(pool))
+        return
+
+    httpd = servidor(args.demora_js)
+    base = f'http://127.0.0.1:{httpd.server_port}'
+
+    print(f"{'pool':>4} {'segundos':>9} {'págs/min':>9} {'renderizadas':>13}")
+    base_ppm = None
+    for pool in (int(p) for p in args.pools.split(',')):
+        salida = subprocess.run(
+            [sys.executable, __file__, '--_correr', base, str(args.paginas), str(pool)],
+            capture_output=True, text=True,
+        )
+        ultima = salida.stdout.strip().splitlines()[-1:] or ['']
+        try:
+            _, duracion, renderizadas = ultima[0].split()
+            if int(renderizadas) == 0:
+                raise ValueError
+        except ValueError:
+            print(f"{pool:>4} falló:\n{salida.stderr[-2000:]}")
+            continue
+        ppm = args.paginas / float(duracion) * 60
+        base_ppm = base_ppm or ppm
+        print(f"{pool:>4} {float(duracion):>9.1f} {ppm:>9.1f} {renderizadas:>6}/{args.paginas:<6} ({ppm / base_ppm:.1f}x)")
+    httpd.shutdown()
+
+
+if __name__ == '__main__':
+    main()
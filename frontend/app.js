@@ -8,8 +8,7 @@ let markers = [];
 document.addEventListener('DOMContentLoaded', () => {
     initMap();
     cargarEstadisticas();
-    cargarBarrios();
-    cargarFuentes();
+    // buscarPropiedades también llena los selectores de barrio y fuente (facetas)
     buscarPropiedades();
 });
 
@@ -44,40 +43,24 @@ async function cargarEstadisticas() {
     }
 }
 
-// Cargar barrios en el select
-async function cargarBarrios() {
-    try {
-        const response = await fetch(`${API_URL}/barrios`);
-        const barrios = await response.json();
-
-        const select = document.getElementById('barrio');
-        barrios.forEach(item => {
-            const option = document.createElement('option');
-            option.value = item.barrio;
-            option.textContent = `${item.barrio} (${item.cantidad})`;
-            select.appendChild(option);
-        });
-    } catch (error) {
-        console.error('Error cargando barrios:', error);
-    }
-}
+// Reemplazar las opciones de un select con los conteos de una faceta,
+// conservando la opción "Todos" y el valor elegido
+function actualizarOpciones(selectId, valores, etiqueta) {
+    const select = document.getElementById(selectId);
+    const seleccionado = select.value;
 
-// Cargar fuentes en el select
-async function cargarFuentes() {
-    try {
-        const response = await fetch(`${API_URL}/fuentes`);
-        const fuentes = await response.json();
-
-        const select = document.getElementById('fuente');
-        fuentes.forEach(item => {
-            const option = document.createElement('option');
-            option.value = item.fuente;
-            option.textContent = `${capitalize(item.fuente)} (${item.cantidad})`;
-            select.appendChild(option);
-        });
-    } catch (error) {
-        console.error('Error cargando fuentes:', error);
+    while (select.options.length > 1) {
+        select.remove(1);
     }
+
+    valores.forEach(item => {
+        const option = document.createElement('option');
+        option.value = item.valor;
+        option.textContent = `${etiqueta(item.valor)} (${item.cantidad})`;
+        select.appendChild(option);
+    });
+
+    select.value = seleccionado;
 }
 
 // Buscar propiedades
@@ -124,8 +107,13 @@ async function buscarPropiedades() {
     params.append('limit', '100');
 
     try {
-        const response = await fetch(`${API_URL}/propiedades?${params}`);
-        const propiedades = await response.json();
+        // Resultados y conteos por barrio/fuente en una sola request
+        const response = await fetch(`${API_URL}/propiedades/facetas?${params}`);
+        const data = await response.json();
+        const propiedades = data.propiedades;
+
+        actualizarOpciones('barrio', data.facetas.barrio, valor => valor);
+        actualizarOpciones('fuente', data.facetas.fuente, capitalize);
 
         loading.style.display = 'none';
 
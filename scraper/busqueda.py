@@ -0,0 +1,147 @@
+"""
+Índice de texto completo sobre titulo, descripcion y barrio.
+
+- SQLite: tabla virtual FTS5 con contenido externo (`propiedades_fts`), mantenida
+  por triggers sobre `propiedades`, así cualquier escritura del DatabasePipeline
+  (insert o upsert) la deja sincronizada. Ranking BM25 y snippet().
+- PostgreSQL: columna generada `busqueda` (tsvector) con índice GIN y una
+  configuración `es_unaccent` (spanish + unaccent). Ranking con ts_rank_cd.
+
+En ambos casos las búsquedas ignoran acentos ("jardin" encuentra "jardín").
+"""
+import re
+
+from sqlalchemy import text
+
+
+MARCA_INICIO = '<mark>'
+MARCA_FIN = '</mark>'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS propiedades_fts USING fts5(
+        titulo, descripcion, barrio,
+        content='propiedades', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS propiedades_fts_ai AFTER INSERT ON propiedades BEGIN
+        INSERT INTO propiedades_fts(rowid, titulo, descripcion, barrio)
+        VALUES (new.id, new.titulo, new.descripcion, new.barrio);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS propiedades_fts_ad AFTER DELETE ON propiedades BEGIN
+        INSERT INTO propiedades_fts(propiedades_fts, rowid, titulo, descripcion, barrio)
+        VALUES ('delete', old.id, old.titulo, old.descripcion, old.barrio);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS propiedades_fts_au AFTER UPDATE OF titulo, descripcion, barrio ON propiedades BEGIN
+        INSERT INTO propiedades_fts(propiedades_fts, rowid, titulo, descripcion, barrio)
+        VALUES ('delete', old.id, old.titulo, old.descripcion, old.barrio);
+        INSERT INTO propiedades_fts(rowid, titulo, descripcion, barrio)
+        VALUES (new.id, new.titulo, new.descripcion, new.barrio);
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'es_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION es_unaccent (COPY = spanish);
+            ALTER TEXT SEARCH CONFIGURATION es_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+        END IF;
+    END $$
+    """,
+    """
+    ALTER TABLE propiedades ADD COLUMN IF NOT EXISTS busqueda tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('es_unaccent', coalesce(titulo, '')), 'A') ||
+        setweight(to_tsvector('es_unaccent', coalesce(barrio, '')), 'B') ||
+        setweight(to_tsvector('es_unaccent', coalesce(descripcion, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_propiedades_busqueda ON propiedades USING GIN (busqueda)",
+]
+
+# Pesos BM25 por columna (titulo, descripcion, barrio): el título pesa más
+_SQLITE_BUSCAR = f"""
+    SELECT propiedades_fts.rowid AS id,
+           snippet(propiedades_fts, -1, '{MARCA_INICIO}', '{MARCA_FIN}', '…', 16) AS fragmento
+    FROM propiedades_fts
+    JOIN propiedades ON propiedades.id = propiedades_fts.rowid
+    WHERE propiedades_fts MATCH :consulta AND propiedades.activa = 1
+    ORDER BY bm25(propiedades_fts, 10.0, 1.0, 5.0)
+    LIMIT :limit
+"""
+
+_POSTGRES_BUSCAR = f"""
+    SELECT id,
+           ts_headline('es_unaccent', coalesce(descripcion, titulo, ''), consulta,
+                       'StartSel={MARCA_INICIO}, StopSel={MARCA_FIN}, MaxWords=25, MinWords=10') AS fragmento
+    FROM propiedades, to_tsquery('es_unaccent', :consulta) AS consulta
+    WHERE busqueda @@ consulta AND activa
+    ORDER BY ts_rank_cd(busqueda, consulta) DESC
+    LIMIT :limit
+"""
+
+
+def crear_indice_busqueda(engine):
+    """
+    Crea el índice de búsqueda si no existe (idempotente).
+
+    Retorna True si el índice está disponible; False si el motor no lo soporta
+    (por ejemplo, un SQLite compilado sin FTS5).
+    """
+    dialecto = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialecto == 'sqlite':
+                existia = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'propiedades_fts'"
+                )).first()
+                for ddl in _SQLITE_DDL:
+                    conn.exec_driver_sql(ddl)
+                if not existia:
+                    # Indexar las filas que ya estaban antes de crear los triggers
+                    conn.exec_driver_sql(
+                        "INSERT INTO propiedades_fts(propiedades_fts) VALUES ('rebuild')"
+                    )
+            elif dialecto == 'postgresql':
+                for ddl in _POSTGRES_DDL:
+                    conn.exec_driver_sql(ddl)
+            else:
+                return False
+    except Exception:
+        return False
+    return True
+
+
+def armar_consulta(q, dialecto):
+    """
+    Traduce texto libre a la sintaxis del motor: todos los términos (AND),
+    cada uno como prefijo. Descarta operadores y comillas del usuario.
+    """
+    terminos = _TOKEN.findall(q.lower())
+    if not terminos:
+        return None
+    if dialecto == 'postgresql':
+        return ' & '.join(f"{t}:*" for t in terminos)
+    return ' '.join(f'"{t}"*' for t in terminos)
+
+
+def buscar_ids(conn, q, limit):
+    """Retorna [(id, fragmento)] de propiedades activas ordenadas por relevancia"""
+    dialecto = conn.dialect.name
+    consulta = armar_consulta(q, dialecto)
+    if consulta is None:
+        return []
+    sql = _POSTGRES_BUSCAR if dialecto == 'postgresql' else _SQLITE_BUSCAR
+    return [tuple(fila) for fila in conn.execute(text(sql), {'consulta': consulta, 'limit': limit})]
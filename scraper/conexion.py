@@ -0,0 +1,88 @@
+"""
+Engines de SQLAlchemy para el scraper y la API.
+
+Los dos procesos abren la misma base. En SQLite cada conexión se configura
+al abrirse con PRAGMAS:
+- WAL: los lectores (la API) no se bloquean mientras el scraper escribe, y
+  el scraper no espera a que terminen las lecturas;
+- synchronous=NORMAL: con WAL no se pierde integridad, solo el último lote
+  si se corta la luz, y ahorra un fsync por transacción;
+- mmap y caché de páginas más grandes para las lecturas;
+- busy_timeout: si dos escritores coinciden (dos spiders a la vez, o la API
+  creando tablas al arrancar) esperan en vez de fallar con "database is locked".
+
+El scraper escribe por una única conexión (`escritor=True`): un pool de una
+conexión, así las escrituras del proceso nunca compiten entre sí, y con
+BEGIN IMMEDIATE, que toma el lock de escritura al empezar la transacción (con
+BEGIN a secas, una transacción que leyó y después escribe puede fallar sin
+esperar el busy_timeout).
+
+Con otros motores los engines se crean con los parámetros de siempre.
+"""
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64000,  # en KiB: 64 MB
+    'busy_timeout': 10000,  # ms
+    'temp_store': 'MEMORY',
+}
+
+
+def es_sqlite(url):
+    return str(url).startswith('sqlite')
+
+
+def _configurar_sqlite(engine, escritor):
+    @event.listens_for(engine, 'connect')
+    def _pragmas(conexion_dbapi, _registro):
+        if escritor:
+            # El driver no abre transacciones por su cuenta: las abre el evento 'begin'
+            conexion_dbapi.isolation_level = None
+        cursor = conexion_dbapi.cursor()
+        for nombre, valor in PRAGMAS.items():
+            cursor.execute(f"PRAGMA {nombre} = {valor}")
+        cursor.close()
+
+    if escritor:
+        @event.listens_for(engine, 'begin')
+        def _begin_immediate(conexion):
+            conexion.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def crear_engine(url, escritor=False, pragmas=True, **kwargs):
+    """
+    Engine sincrónico. `escritor=True` para el proceso que escribe: una sola
+    conexión y transacciones BEGIN IMMEDIATE. `pragmas=False` deja SQLite con
+    su configuración por defecto (para comparar en los benchmarks).
+    """
+    if not es_sqlite(url):
+        return create_engine(url, **kwargs)
+    kwargs.setdefault('connect_args', {}).setdefault('check_same_thread', False)
+    if escritor and make_url(url).database not in (None, '', ':memory:'):
+        kwargs.update(pool_size=1, max_overflow=0)
+    engine = create_engine(url, **kwargs)
+    if pragmas:
+        _configurar_sqlite(engine, escritor)
+    return engine
+
+
+def crear_engine_async(url, pragmas=True, **kwargs):
+    """
+    Engine async para la API (solo lectura): los mismos PRAGMAS en cada conexión del pool.
+
+    Con un archivo SQLite el pool se pide explícitamente: las versiones 2.0.x
+    anteriores a 2.0.38 usan NullPool por defecto con aiosqlite y rechazan
+    pool_size/max_overflow/pool_timeout.
+    """
+    if es_sqlite(url) and make_url(url).database not in (None, '', ':memory:'):
+        kwargs.setdefault('poolclass', AsyncAdaptedQueuePool)
+    engine = create_async_engine(url, **kwargs)
+    if es_sqlite(url) and pragmas:
+        _configurar_sqlite(engine.sync_engine, escritor=False)
+    return engine
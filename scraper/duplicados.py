@@ -0,0 +1,396 @@
+"""
+Detección de duplicados entre fuentes.
+
+La misma propiedad aparece en zonaprop, argenprop, remax, roomix... con URLs
+distintas. Cada propiedad tiene un `grupo_id` (el menor id de su grupo, o el
+suyo si no tiene duplicados) y `/propiedades?agrupar=true` devuelve una sola
+por grupo.
+
+Para no comparar todos contra todos, cada propiedad deja claves de bloqueo en
+`propiedades_bloques` y solo se comparan las que comparten alguna:
+- LSH: firma MinHash de los trigramas de la calle normalizada, en bandas,
+  junto con la cuadra ("Av. Pellegrini 1540" y "Avenida Pellegrini al 1500"
+  caen en el mismo balde);
+- celda de ~100 m de latitud/longitud (se buscan también las 8 vecinas);
+- imagen principal, por nombre de archivo y por hash perceptual
+  (scraper/imagenes.py): cada hash se parte en 4 trozos de 16 bits y cada
+  trozo es una clave, así dos fotos a distancia <= 3 comparten al menos uno.
+Una clave con más de MAX_BLOQUE propiedades (la coordenada del centro del
+barrio, una foto genérica) no genera candidatos: así los pares quedan cerca
+de lineales.
+
+Los candidatos se confirman con `coinciden`: precio, superficie y ambientes
+compatibles, más dirección, cercanía o imagen en común.
+
+`agrupar` corre en la transacción de cada lote del DatabasePipeline, sobre las
+filas que el lote acaba de escribir.
+"""
+import hashlib
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from sqlalchemy import MetaData, Table, Column, Integer, Float, String, Index, inspect, select, delete, update, bindparam, func
+
+from scraper.imagenes import imagen_hash, desde_columna, distancia, IndiceHashes, TROZOS
+
+
+MAX_BLOQUE = 50
+TOLERANCIA_PRECIO = 0.05      # diferencia relativa
+TOLERANCIA_SUPERFICIE = 0.10
+TOLERANCIA_ALTURA = 50        # numeración de la calle
+DISTANCIA_MAXIMA_M = 75
+SIMILITUD_CALLE = 0.6         # Jaccard de trigramas
+DISTANCIA_FOTO = TROZOS - 1   # bits distintos entre dos dHash de la misma foto
+CELDA_GRADOS = 0.001          # ~110 m en latitud
+
+BANDAS, FILAS_POR_BANDA = 8, 2
+_PRIMO = (1 << 61) - 1
+_COEFICIENTES = [
+    (int.from_bytes(hashlib.blake2b(f'a{i}'.encode(), digest_size=8).digest(), 'big') % _PRIMO or 1,
+     int.from_bytes(hashlib.blake2b(f'b{i}'.encode(), digest_size=8).digest(), 'big') % _PRIMO)
+    for i in range(BANDAS * FILAS_POR_BANDA)
+]
+
+propiedades_bloques = Table(
+    'propiedades_bloques', MetaData(),
+    Column('clave', String(40), primary_key=True),
+    Column('propiedad_id', Integer, primary_key=True),
+    Index('ix_propiedades_bloques_propiedad', 'propiedad_id'),
+    sqlite_with_rowid=False,
+)
+
+# Solo las columnas de propiedades que usa la comparación
+_propiedades = Table(
+    'propiedades', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('url', String(500)),
+    Column('fuente', String(50)),
+    Column('direccion', String(500)),
+    Column('precio', Float),
+    Column('moneda', String(10)),
+    Column('superficie_total', Float),
+    Column('ambientes', Integer),
+    Column('dormitorios', Integer),
+    Column('latitud', Float),
+    Column('longitud', Float),
+    Column('imagen_principal', String(500)),
+    Column('grupo_id', Integer),
+)
+
+_ABREVIATURAS = {
+    'avenida': 'av', 'avda': 'av', 'bulevar': 'bv', 'boulevard': 'bv', 'blvd': 'bv', 'bvard': 'bv',
+    'pje': 'pasaje', 'psje': 'pasaje', 'gral': 'general', 'pte': 'presidente', 'dr': 'doctor',
+    'sta': 'santa', 'cnel': 'coronel', 'tte': 'teniente',
+}
+_RUIDO = frozenset(['al', 'n', 'nro', 'no', 'numero', 'calle'])
+_CORTE = re.compile(r',|\b(?:piso|dto|depto|dpto|departamento|unidad|esq|esquina|entre)\b')
+_CALLE_ALTURA = re.compile(r'^(.*?[a-z].*?)\s+(\d{1,5})\b')
+_NO_ALFANUMERICO = re.compile(r'[^a-z0-9 ]+')
+_TAMANO_IMAGEN = re.compile(r'(?:[_-]?\d{2,4}x\d{2,4})|(?:\.\w{3,4}$)')
+
+
+def _sin_acentos(texto):
+    return unicodedata.normalize('NFKD', texto).encode('ascii', 'ignore').decode('ascii')
+
+
+@lru_cache(maxsize=65536)
+def normalizar_direccion(direccion):
+    """
+    (calle, altura) de una dirección con numeración, o None.
+
+    'Av. Pellegrini al 1540, Centro' -> ('av pellegrini', 1540)
+    """
+    if not direccion:
+        return None
+    texto = _CORTE.split(_sin_acentos(str(direccion)).lower(), 1)[0]
+    texto = _NO_ALFANUMERICO.sub(' ', texto)
+    match = _CALLE_ALTURA.search(texto.strip())
+    if not match:
+        return None
+    tokens = [_ABREVIATURAS.get(t, t) for t in match.group(1).split()]
+    calle = ' '.join(t for t in tokens if t not in _RUIDO)
+    return (calle, int(match.group(2))) if calle else None
+
+
+def _trigramas(texto):
+    texto = f' {texto} '
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def _hash64(texto):
+    return int.from_bytes(hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def firma_minhash(tokens):
+    """Un mínimo por cada función de hash (a*x + b mod p)"""
+    valores = [_hash64(t) for t in tokens]
+    return [min((a * v + b) % _PRIMO for v in valores) for a, b in _COEFICIENTES]
+
+
+def _clave(prefijo, texto):
+    return f"{prefijo}:{hashlib.blake2b(texto.encode('utf-8'), digest_size=12).hexdigest()}"
+
+
+@lru_cache(maxsize=65536)
+def _imagen(url):
+    """Nombre del archivo de la imagen sin sufijos de tamaño ni extensión"""
+    if not url:
+        return None
+    nombre = urlsplit(url).path.rstrip('/').rsplit('/', 1)[-1].lower()
+    nombre = _TAMANO_IMAGEN.sub('', nombre)
+    return nombre if len(nombre) >= 8 else None
+
+
+def _celda(lat, lng):
+    return math.floor(lat / CELDA_GRADOS), math.floor(lng / CELDA_GRADOS)
+
+
+def claves_bloqueo(fila):
+    """
+    (propias, a_buscar): claves que la propiedad deja en el índice y claves
+    con las que busca candidatos (incluye las celdas vecinas).
+    """
+    propias = set()
+    buscar = set()
+    direccion = normalizar_direccion(fila.get('direccion'))
+    if direccion:
+        calle, altura = direccion
+        firma = firma_minhash(_trigramas(calle))
+        for banda in range(BANDAS):
+            valores = firma[banda * FILAS_POR_BANDA:(banda + 1) * FILAS_POR_BANDA]
+            propias.add(_clave(f'm{banda}', f"{altura // 100}:{valores}"))
+    if fila.get('latitud') is not None and fila.get('longitud') is not None:
+        lat, lng = _celda(fila['latitud'], fila['longitud'])
+        propias.add(_clave('g', f"{lat}:{lng}"))
+        buscar.update(_clave('g', f"{lat + i}:{lng + j}") for i in (-1, 0, 1) for j in (-1, 0, 1))
+    imagen = _imagen(fila.get('imagen_principal'))
+    if imagen:
+        propias.add(_clave('i', imagen))
+    for h in fila.get('hashes', ()):
+        propias.update(_clave(f'h{i}', str(IndiceHashes._trozo(h, i))) for i in range(TROZOS))
+    return propias, propias | buscar
+
+
+def _relativa(a, b):
+    return abs(a - b) / max(abs(a), abs(b), 1e-9)
+
+
+def _metros(a, b):
+    d_lat = (a['latitud'] - b['latitud']) * 111320.0
+    d_lng = (a['longitud'] - b['longitud']) * 111320.0 * math.cos(math.radians(a['latitud']))
+    return math.hypot(d_lat, d_lng)
+
+
+def _misma_direccion(a, b):
+    da, db = normalizar_direccion(a.get('direccion')), normalizar_direccion(b.get('direccion'))
+    if not da or not db or abs(da[1] - db[1]) > TOLERANCIA_ALTURA:
+        return False
+    if da[0] == db[0]:
+        return True
+    ta, tb = _trigramas(da[0]), _trigramas(db[0])
+    return len(ta & tb) / len(ta | tb) >= SIMILITUD_CALLE
+
+
+def coinciden(a, b):
+    """Dos avisos de fuentes distintas que describen la misma propiedad"""
+    if a['fuente'] == b['fuente']:
+        return False
+    if a.get('precio') and b.get('precio'):
+        if (a.get('moneda') or 'ARS') != (b.get('moneda') or 'ARS'):
+            return False
+        if _relativa(a['precio'], b['precio']) > TOLERANCIA_PRECIO:
+            return False
+    if a.get('superficie_total') and b.get('superficie_total'):
+        if _relativa(a['superficie_total'], b['superficie_total']) > TOLERANCIA_SUPERFICIE:
+            return False
+    for campo in ('ambientes', 'dormitorios'):
+        if a.get(campo) is not None and b.get(campo) is not None and a[campo] != b[campo]:
+            return False
+    # Además de no contradecirse, tienen que compartir la ubicación o la foto
+    if _misma_direccion(a, b):
+        return True
+    if None not in (a.get('latitud'), a.get('longitud'), b.get('latitud'), b.get('longitud')):
+        if _metros(a, b) <= DISTANCIA_MAXIMA_M:
+            return True
+    imagen = _imagen(a.get('imagen_principal'))
+    if imagen is not None and imagen == _imagen(b.get('imagen_principal')):
+        return True
+    return any(distancia(ha, hb) <= DISTANCIA_FOTO for ha in a.get('hashes', ()) for hb in b.get('hashes', ()))
+
+
+def _distancia_aviso(a, b):
+    """Orden de preferencia entre coincidencias: altura más cercana, después precio"""
+    da, db = normalizar_direccion(a.get('direccion')), normalizar_direccion(b.get('direccion'))
+    altura = abs(da[1] - db[1]) if da and db else TOLERANCIA_ALTURA + 1
+    precio = _relativa(a['precio'], b['precio']) if a.get('precio') and b.get('precio') else 0.0
+    return altura, precio
+
+
+def _en_tandas(valores, tamano=500):
+    valores = list(valores)
+    for i in range(0, len(valores), tamano):
+        yield valores[i:i + tamano]
+
+
+def _leer(conn, columna, valores):
+    """{id: fila} de las propiedades con `columna` en valores"""
+    filas = {}
+    for tanda in _en_tandas(valores):
+        consulta = select(*(c for c in _propiedades.c if c.name != 'url')).where(columna.in_(tanda))
+        ids = []
+        for fila in conn.execute(consulta).mappings():
+            filas[fila['id']] = dict(fila, hashes=[])
+            ids.append(fila['id'])
+        # Hashes perceptuales de las fotos, si ImagenesPipeline los calculó
+        for id_, h in conn.execute(
+            select(imagen_hash.c.propiedad_id, imagen_hash.c.hash).where(imagen_hash.c.propiedad_id.in_(ids))
+        ):
+            filas[id_]['hashes'].append(desde_columna(h))
+    return filas
+
+
+def _fuentes_grupos(conn, etiquetas, lote):
+    """{etiqueta: {fuente}} de los miembros actuales de esos grupos, sin las filas del lote"""
+    fuentes = {}
+    for tanda in _en_tandas(etiquetas):
+        for grupo, id_, fuente in conn.execute(
+            select(func.coalesce(_propiedades.c.grupo_id, _propiedades.c.id), _propiedades.c.id, _propiedades.c.fuente)
+            .where((_propiedades.c.grupo_id.in_(tanda)) | (_propiedades.c.grupo_id.is_(None) & _propiedades.c.id.in_(tanda)))
+        ):
+            if id_ not in lote:
+                fuentes.setdefault(grupo, set()).add(fuente)
+    return fuentes
+
+
+def agrupar(conn, urls):
+    """
+    Actualiza el índice de bloqueo y los grupos de las propiedades con esas
+    URLs. Retorna cuántas quedaron agrupadas con otra.
+
+    Los grupos solo se unen; una propiedad que dejó de coincidir con su grupo
+    vuelve a uno propio.
+    """
+    lote = _leer(conn, _propiedades.c.url, urls)
+    if not lote:
+        return 0
+
+    # Reemplazar las claves de las filas del lote
+    claves = {id_: claves_bloqueo(fila) for id_, fila in lote.items()}
+    for tanda in _en_tandas(lote):
+        conn.execute(delete(propiedades_bloques).where(propiedades_bloques.c.propiedad_id.in_(tanda)))
+    nuevas = [{'clave': clave, 'propiedad_id': id_} for id_, (propias, _) in claves.items() for clave in propias]
+    if nuevas:
+        conn.execute(propiedades_bloques.insert(), nuevas)
+
+    # Miembros de cada clave buscada, salvo las que superan MAX_BLOQUE (se
+    # descartan en la base, contando sobre la clave primaria, sin traerlas)
+    buscadas = set().union(*(buscar for _, buscar in claves.values()))
+    miembros = {}
+    bloques = propiedades_bloques.c
+    for tanda in _en_tandas(buscadas):
+        chicas = (
+            select(bloques.clave).where(bloques.clave.in_(tanda))
+            .group_by(bloques.clave).having(func.count() <= MAX_BLOQUE)
+        )
+        for clave, id_ in conn.execute(select(bloques.clave, bloques.propiedad_id).where(bloques.clave.in_(chicas))):
+            miembros.setdefault(clave, []).append(id_)
+
+    pares = {}
+    for id_, (_, buscar) in claves.items():
+        pares[id_] = {otro for clave in buscar for otro in miembros.get(clave, ()) if otro != id_}
+    candidatos = _leer(conn, _propiedades.c.id, set().union(*pares.values()) - set(lote))
+    candidatos.update(lote)
+
+    # Union-find sobre etiquetas de grupo (grupo_id actual, o el id si no tiene)
+    padre = {}
+
+    def raiz(x):
+        while padre.setdefault(x, x) != x:
+            padre[x] = padre[padre[x]]
+            x = padre[x]
+        return x
+
+    def etiqueta(fila):
+        return fila['grupo_id'] if fila['grupo_id'] is not None else fila['id']
+
+    coincidencias = {
+        id_: [candidatos[otro] for otro in sorted(pares[id_]) if otro in candidatos and coinciden(fila, candidatos[otro])]
+        for id_, fila in lote.items()
+    }
+    nodos = {}
+    for id_, fila in lote.items():
+        # Sigue en su grupo si es la cabeza o coincide con algún miembro; si no, arma uno propio
+        actual = etiqueta(fila)
+        nodos[id_] = actual if actual == id_ or any(etiqueta(c) == actual for c in coincidencias[id_]) else id_
+
+    def grupo(fila):
+        return nodos.get(fila['id'], etiqueta(fila))
+
+    # Fuentes de cada grupo: dos grupos que ya tienen la misma fuente no se
+    # unen, así un aviso que coincide con varios vecinos de un mismo portal no
+    # los encadena en un solo grupo
+    fuentes = _fuentes_grupos(conn, set(nodos.values()) | {grupo(c) for cs in coincidencias.values() for c in cs}, lote)
+    for id_, nodo in nodos.items():
+        fuentes.setdefault(nodo, set()).add(lote[id_]['fuente'])
+
+    # Los pares más parecidos primero: entre varias unidades del mismo portal
+    # que coinciden con un aviso, se une a la de su altura y precio
+    uniones = sorted(
+        (_distancia_aviso(lote[id_], otra), id_, otra['id'], nodo, grupo(otra))
+        for id_, nodo in nodos.items() for otra in coincidencias[id_]
+    )
+    for _, _, _, nodo, otro_grupo in uniones:
+        a, b = raiz(nodo), raiz(otro_grupo)
+        if a == b or fuentes.get(a, set()) & fuentes.get(b, set()):
+            continue
+        padre[max(a, b)] = min(a, b)
+        fuentes[min(a, b)] = fuentes.get(min(a, b), set()) | fuentes.pop(max(a, b), set())
+    agrupadas = sum(any(raiz(grupo(c)) == raiz(nodo) for c in coincidencias[id_]) for id_, nodo in nodos.items())
+
+    # Filas del lote y grupos absorbidos, en un executemany cada uno
+    cambios = [{'fila': id_, 'nuevo': raiz(nodo)} for id_, nodo in nodos.items()
+               if lote[id_]['grupo_id'] != raiz(nodo)]
+    if cambios:
+        conn.execute(
+            update(_propiedades).where(_propiedades.c.id == bindparam('fila')).values(grupo_id=bindparam('nuevo')),
+            cambios,
+        )
+    absorbidos = [{'viejo': vieja, 'nuevo': raiz(vieja)} for vieja in padre if raiz(vieja) != vieja]
+    if absorbidos:
+        conn.execute(
+            update(_propiedades).where(_propiedades.c.grupo_id == bindparam('viejo')).values(grupo_id=bindparam('nuevo')),
+            absorbidos,
+        )
+        # Cabezas que todavía no tenían grupo_id (filas anteriores a la deduplicación)
+        conn.execute(
+            update(_propiedades)
+            .where(_propiedades.c.id == bindparam('viejo'), _propiedades.c.grupo_id.is_(None))
+            .values(grupo_id=bindparam('nuevo')),
+            absorbidos,
+        )
+    return agrupadas
+
+
+def crear_indice_duplicados(engine):
+    """
+    Crea el índice de bloqueo si no existe (idempotente; la columna grupo_id
+    la agregan las migraciones). La primera vez agrupa las propiedades que
+    ya había.
+
+    Retorna True si la deduplicación quedó disponible.
+    """
+    try:
+        with engine.begin() as conn:
+            imagen_hash.create(conn, checkfirst=True)
+            existia = inspect(conn).has_table('propiedades_bloques')
+            propiedades_bloques.create(conn, checkfirst=True)
+            if not existia:
+                urls = [url for url, in conn.exec_driver_sql("SELECT url FROM propiedades ORDER BY id")]
+                for tanda in _en_tandas(urls, 2000):
+                    agrupar(conn, tanda)
+    except Exception:
+        return False
+    return True
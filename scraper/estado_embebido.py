@@ -0,0 +1,541 @@
+"""
+Datos embebidos como JSON en el HTML, antes de recurrir a selectores CSS o
+a renderizar con Selenium.
+
+Muchos sitios mandan el estado de la página ya armado en el HTML del
+servidor:
+- Next.js: <script id="__NEXT_DATA__" type="application/json">
+- schema.org: <script type="application/ld+json">
+- Estado inicial de la app: window.__INITIAL_STATE__ = {...},
+  window.__PRELOADED_STATE__ = {...}, etc.
+
+`EstadoEmbebido` los parsea (una sola vez, a demanda) y los mapeadores por
+fuente los convierten en campos de PropiedadItem. Si el estado alcanza, la
+página se procesa con un GET común: sin navegador.
+"""
+import json
+import re
+from datetime import datetime
+
+from lxml import etree
+
+from scraper.extraccion import Pagina, extraer_barrio
+from scraper.items import PropiedadItem
+
+
+_NEXT_DATA = etree.XPath('//script[@id="__NEXT_DATA__"]/text()', smart_strings=False)
+_LD_JSON = etree.XPath('//script[@type="application/ld+json"]/text()', smart_strings=False)
+_SCRIPTS_INLINE = etree.XPath(
+    '//script[not(@src) and not(@type="application/ld+json") and not(@id="__NEXT_DATA__")]/text()',
+    smart_strings=False,
+)
+_ASIGNACION_VENTANA = re.compile(r'window\.(__[A-Za-z0-9_]+__)\s*=\s*')
+_DECODIFICADOR = json.JSONDecoder()
+
+
+class EstadoEmbebido:
+    """
+    JSON embebido en una página: __NEXT_DATA__, ld+json y window.__X__.
+
+    Acepta lo mismo que `Pagina` (Response, Selector o str), o una `Pagina`.
+    """
+
+    def __init__(self, origen):
+        pagina = origen if isinstance(origen, Pagina) else Pagina(origen)
+        self.raiz = pagina.selector.root
+        self._next_data = self._ld_json = self._ventana = None
+
+    @property
+    def next_data(self):
+        """JSON de __NEXT_DATA__ (dict vacío si no hay)"""
+        if self._next_data is None:
+            self._next_data = {}
+            for texto in _NEXT_DATA(self.raiz):
+                valor = _cargar(texto)
+                if isinstance(valor, dict):
+                    self._next_data = valor
+                    break
+        return self._next_data
+
+    @property
+    def ld_json(self):
+        """Objetos de todos los bloques ld+json, con listas y @graph aplanados"""
+        if self._ld_json is None:
+            self._ld_json = []
+            for texto in _LD_JSON(self.raiz):
+                pendientes = [_cargar(texto)]
+                while pendientes:
+                    valor = pendientes.pop(0)
+                    if isinstance(valor, list):
+                        pendientes[:0] = valor
+                    elif isinstance(valor, dict):
+                        if isinstance(valor.get('@graph'), list):
+                            pendientes[:0] = valor['@graph']
+                        else:
+                            self._ld_json.append(valor)
+        return self._ld_json
+
+    @property
+    def ventana(self):
+        """Objetos asignados a window.__X__ en scripts inline, por nombre"""
+        if self._ventana is None:
+            self._ventana = {}
+            for texto in _SCRIPTS_INLINE(self.raiz):
+                if 'window.__' not in texto:
+                    continue
+                for match in _ASIGNACION_VENTANA.finditer(texto):
+                    try:
+                        valor, _ = _DECODIFICADOR.raw_decode(texto, match.end())
+                    except ValueError:
+                        continue  # Literal de JS que no es JSON válido
+                    self._ventana.setdefault(match.group(1), valor)
+        return self._ventana
+
+    @property
+    def page_props(self):
+        props = self.next_data.get('props') or {}
+        return props.get('pageProps') or {}
+
+
+def _cargar(texto):
+    try:
+        return json.loads(texto)
+    except ValueError:
+        return None
+
+
+def buscar_clave(dato, clave):
+    """Primer valor de `clave` en la estructura anidada (en profundidad), o None"""
+    pendientes = [dato]
+    while pendientes:
+        actual = pendientes.pop()
+        if isinstance(actual, dict):
+            if clave in actual:
+                return actual[clave]
+            pendientes.extend(reversed(list(actual.values())))
+        elif isinstance(actual, list):
+            pendientes.extend(reversed(actual))
+    return None
+
+
+def _primero(objeto, claves):
+    for clave in claves:
+        valor = objeto.get(clave)
+        if valor not in (None, '', [], {}):
+            return valor
+    return None
+
+
+def _numero(valor):
+    if isinstance(valor, dict):
+        valor = _primero(valor, ('value', 'amount', 'valor'))
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return valor
+    if isinstance(valor, str):
+        return valor  # Lo normaliza NormalizacionPipeline
+    return None
+
+
+def _urls(valor):
+    if isinstance(valor, (str, dict)):
+        valor = [valor]
+    if not isinstance(valor, list):
+        return []
+    urls = []
+    for imagen in valor:
+        if isinstance(imagen, dict):
+            imagen = _primero(imagen, ('url', 'src', 'contentUrl', 'image2x'))
+        if isinstance(imagen, str) and imagen:
+            urls.append(imagen)
+    return urls
+
+
+def _con_imagenes(datos, imagenes):
+    if imagenes:
+        datos['imagenes'] = imagenes
+        datos['imagen_principal'] = imagenes[0]
+    return datos
+
+
+# --- schema.org (ld+json) ---
+
+# Preferidos primero: un RealEstateListing o un inmueble antes que un Product
+TIPOS_LD = ('RealEstateListing', 'Apartment', 'House', 'SingleFamilyResidence', 'Residence',
+            'Accommodation', 'Room', 'Product')
+TIPO_INMUEBLE_LD = {'Apartment': 'Departamento', 'House': 'Casa', 'SingleFamilyResidence': 'Casa'}
+
+
+def _tipos(objeto):
+    tipo = objeto.get('@type')
+    return set(tipo) if isinstance(tipo, list) else {tipo}
+
+
+def propiedad_ld_json(objetos):
+    """Campos de PropiedadItem desde los objetos ld+json de una página, o None"""
+    elegido = None
+    for tipo in TIPOS_LD:
+        elegido = next((objeto for objeto in objetos if tipo in _tipos(objeto)), None)
+        if elegido:
+            break
+    if elegido is None:
+        return None
+
+    # RealEstateListing describe el aviso; el inmueble va en about/mainEntity
+    inmueble = _primero(elegido, ('about', 'mainEntity', 'itemOffered'))
+    if isinstance(inmueble, list):
+        inmueble = inmueble[0] if inmueble else None
+    fuentes = [elegido, inmueble] if isinstance(inmueble, dict) else [elegido]
+
+    def valor(*claves):
+        for objeto in fuentes:
+            encontrado = _primero(objeto, claves)
+            if encontrado is not None:
+                return encontrado
+        return None
+
+    datos = {}
+    datos['titulo'] = valor('name', 'headline')
+    datos['descripcion'] = valor('description')
+
+    oferta = valor('offers')
+    if isinstance(oferta, list):
+        oferta = oferta[0] if oferta else None
+    if isinstance(oferta, dict):
+        especificacion = oferta.get('priceSpecification')
+        if isinstance(especificacion, list):
+            especificacion = especificacion[0] if especificacion else None
+        precio = _primero(oferta, ('price', 'lowPrice'))
+        if precio is None and isinstance(especificacion, dict):
+            precio = especificacion.get('price')
+        datos['precio'] = _numero(precio)
+        moneda = oferta.get('priceCurrency') or (especificacion or {}).get('priceCurrency')
+        if moneda:
+            datos['moneda'] = 'USD' if moneda in ('USD', 'U$S') else 'ARS'
+
+    direccion = valor('address')
+    if isinstance(direccion, dict):
+        datos['direccion'] = direccion.get('streetAddress')
+        datos['ciudad'] = direccion.get('addressLocality')
+        datos['provincia'] = direccion.get('addressRegion')
+    elif isinstance(direccion, str):
+        datos['direccion'] = direccion
+    datos['barrio'] = extraer_barrio(' '.join(filter(None, (datos.get('direccion'), datos.get('titulo')))))
+
+    geo = valor('geo')
+    if isinstance(geo, dict):
+        try:
+            datos['latitud'] = float(geo['latitude'])
+            datos['longitud'] = float(geo['longitude'])
+        except (KeyError, TypeError, ValueError):
+            pass
+
+    datos['superficie_total'] = _numero(valor('floorSize'))
+    datos['ambientes'] = _numero(valor('numberOfRooms'))
+    datos['dormitorios'] = _numero(valor('numberOfBedrooms'))
+    datos['banos'] = _numero(valor('numberOfBathroomsTotal', 'numberOfFullBathrooms'))
+    mascotas = valor('petsAllowed')
+    if mascotas is not None:
+        datos['mascotas'] = mascotas
+    tipo = next((TIPO_INMUEBLE_LD[t] for objeto in fuentes for t in _tipos(objeto) if t in TIPO_INMUEBLE_LD), None)
+    if tipo:
+        datos['tipo'] = tipo
+
+    _con_imagenes(datos, _urls(valor('image', 'photo')))
+    datos = {campo: v for campo, v in datos.items() if v is not None}
+    return datos if datos.get('titulo') or datos.get('precio') else None
+
+
+# --- Rentola (Next.js) ---
+
+# Campo de PropiedadItem -> claves posibles en el objeto del aviso
+CLAVES_RENTOLA = {
+    'titulo': ('title', 'name', 'titulo'),
+    'descripcion': ('description', 'descripcion'),
+    'precio': ('rent', 'price', 'monthly_rent', 'monthlyRent', 'precio'),
+    'moneda': ('currency', 'currency_code', 'currencyCode'),
+    'superficie_total': ('area', 'size', 'surface', 'square_meters', 'squareMeters', 'sqm'),
+    'ambientes': ('rooms', 'room_count', 'roomCount'),
+    'dormitorios': ('bedrooms', 'bedroom_count', 'bedroomCount'),
+    'banos': ('bathrooms', 'bathroom_count', 'bathroomCount'),
+    'barrio': ('neighborhood', 'neighbourhood', 'district'),
+    'mascotas': ('pets_allowed', 'petsAllowed'),
+}
+_AVISO_RENTOLA = ('listing', 'property', 'propiedad', 'rental', 'ad', 'initialListing')
+
+
+def _aviso_rentola(page_props):
+    """Objeto del aviso dentro de pageProps (no listas: ahí van los relacionados)"""
+    for clave in _AVISO_RENTOLA:
+        if isinstance(page_props.get(clave), dict):
+            return page_props[clave]
+    candidatos = [page_props] + [v for v in page_props.values() if isinstance(v, dict)]
+    for candidato in candidatos:
+        if _primero(candidato, CLAVES_RENTOLA['titulo']) and _primero(candidato, CLAVES_RENTOLA['precio']):
+            return candidato
+    return None
+
+
+def propiedad_rentola(estado):
+    """Campos de PropiedadItem desde __NEXT_DATA__ de una página de Rentola, o None"""
+    aviso = _aviso_rentola(estado.page_props)
+    if aviso is None:
+        return None
+
+    datos = {}
+    for campo, claves in CLAVES_RENTOLA.items():
+        valor = _primero(aviso, claves)
+        if valor is None:
+            continue
+        if campo in ('precio', 'superficie_total', 'ambientes', 'dormitorios', 'banos'):
+            if campo == 'precio' and isinstance(valor, dict) and 'moneda' not in datos:
+                moneda = _primero(valor, CLAVES_RENTOLA['moneda'])
+                if moneda:
+                    datos['moneda'] = moneda
+            valor = _numero(valor)
+        datos[campo] = valor
+    if 'moneda' in datos:
+        datos['moneda'] = 'USD' if str(datos['moneda']).upper() in ('USD', 'U$S') else 'ARS'
+
+    direccion = _primero(aviso, ('address', 'street', 'location'))
+    if isinstance(direccion, dict):
+        direccion = _primero(direccion, ('full', 'formatted', 'street', 'name'))
+    if isinstance(direccion, str):
+        datos['direccion'] = direccion
+
+    coordenadas = _primero(aviso, ('coordinates', 'geo', 'location')) or aviso
+    if isinstance(coordenadas, dict):
+        lat = _primero(coordenadas, ('lat', 'latitude'))
+        lng = _primero(coordenadas, ('lng', 'lon', 'longitude'))
+        try:
+            datos['latitud'], datos['longitud'] = float(lat), float(lng)
+        except (TypeError, ValueError):
+            pass
+
+    if not datos.get('barrio'):
+        datos['barrio'] = extraer_barrio(' '.join(filter(None, (datos.get('direccion'), datos.get('titulo')))))
+    _con_imagenes(datos, _urls(_primero(aviso, ('photos', 'images', 'pictures'))))
+    datos = {campo: v for campo, v in datos.items() if v is not None}
+    return datos if datos.get('titulo') or datos.get('precio') else None
+
+
+def propiedad_embebida(estado, mapeador=None):
+    """
+    Campos de PropiedadItem desde el estado embebido: primero el mapeador de
+    la fuente (si hay), después ld+json. None si ninguno alcanza.
+    """
+    if mapeador:
+        datos = mapeador(estado)
+        if datos:
+            return datos
+    return propiedad_ld_json(estado.ld_json)
+
+
+# --- Zonaprop (listPostings de la API y de window.__PRELOADED_STATE__) ---
+
+# Mapeo de características según la documentación
+CARACTERISTICAS_ZONAPROP = {
+    "CFT101": "superficie_cubierta",
+    "CFT1": "ambientes",
+    "CFT2": "dormitorios",
+    "CFT3": "banos",
+    "CFT7": "cocheras",
+    # CFT100 es superficie_lote (no está en PropiedadItem)
+    # CFT5 es antiguedad (no está en PropiedadItem)
+}
+
+
+def postings_zonaprop(estado):
+    """Postings del estado inicial de un listado de Zonaprop (lista vacía si no hay)"""
+    postings = buscar_clave(estado.ventana, 'listPostings')
+    return postings if isinstance(postings, list) else []
+
+
+def propiedad_zonaprop(posting, logger=None):
+    """Convierte un posting de Zonaprop (API o estado embebido) a PropiedadItem. None si no es de Rosario."""
+    item = PropiedadItem()
+
+    item['fuente'] = 'zonaprop'
+    item['id_externo'] = str(posting.get('postingId', ''))
+
+    # URL
+    url = posting.get('url', '')
+    if url and not url.startswith('http'):
+        url = 'https://www.zonaprop.com.ar' + url
+    item['url'] = url
+
+    # Información básica
+    item['titulo'] = posting.get('title', 'Propiedad en Zonaprop')
+    item['descripcion'] = posting.get('descriptionNormalized', '') or posting.get('description', '')
+
+    # Precio
+    price_operations = posting.get('priceOperationTypes', [])
+    if price_operations:
+        first_price = price_operations[0].get('prices', [{}])[0]
+        item['precio'] = first_price.get('amount')
+        currency = first_price.get('currency', '')
+        item['moneda'] = 'USD' if currency == 'USD' else 'ARS'
+
+    # Expensas
+    expenses = posting.get('expenses', {})
+    if expenses:
+        item['expensas'] = expenses.get('amount')
+
+    # Ubicación (estructura correcta: postingLocation)
+    posting_location = posting.get('postingLocation', {})
+    if not posting_location:
+        posting_location = {}
+
+    location = posting_location.get('location', {})
+    if not location:
+        location = {}
+
+    address = posting_location.get('address', {})
+    if not address:
+        address = {}
+
+    # Buscar ciudad en la jerarquía de parent (label: "CIUDAD")
+    ciudad = ''
+    provincia = 'Santa Fe'
+    current = location
+    while current:
+        label = current.get('label', '')
+        if label == 'CIUDAD':
+            ciudad = current.get('name', '')
+        elif label == 'PROVINCIA':
+            provincia = current.get('name', 'Santa Fe')
+        current = current.get('parent')
+
+    item['ciudad'] = ciudad
+    item['provincia'] = provincia
+
+    # Dirección y barrio
+    item['direccion'] = address.get('name', '')
+    item['barrio'] = ''  # Zonaprop no parece tener barrio en este nivel
+
+    # Filtrar solo Rosario (excluir Rafaela y otras ciudades)
+    ciudad_lower = ciudad.lower()
+    if ciudad_lower != 'rosario':
+        if logger:
+            logger.info(f"❌ Descartado (ciudad={ciudad}): {item['titulo']}")
+        return None
+
+    # Características principales (mainFeatures es un dict de feature_id -> feature_data)
+    main_features = posting.get('mainFeatures', {})
+    if isinstance(main_features, dict):
+        for feat_id, feat_data in main_features.items():
+            if not isinstance(feat_data, dict):
+                continue
+
+            # Extraer valor
+            value_str = feat_data.get('value')
+            if not value_str:
+                continue
+
+            # Intentar convertir a número
+            try:
+                value = int(value_str)
+            except (ValueError, TypeError):
+                continue
+
+            # Mapear por feature ID (más confiable que por label)
+            if feat_id in CARACTERISTICAS_ZONAPROP:
+                field = CARACTERISTICAS_ZONAPROP[feat_id]
+                item[field] = value
+            else:
+                # Fallback: mapear por label si no está en el mapa
+                label = feat_data.get('label', '').lower()
+                if 'ambiente' in label:
+                    item['ambientes'] = value
+                elif 'dormitorio' in label:
+                    item['dormitorios'] = value
+                elif 'baño' in label:
+                    item['banos'] = value
+                elif 'cochera' in label or 'garage' in label:
+                    item['cocheras'] = value
+                elif 'superficie total' in label:
+                    item['superficie_total'] = value
+                elif 'superficie cubierta' in label:
+                    item['superficie_cubierta'] = value
+
+    # Características adicionales (features)
+    features = posting.get('features', {})
+    if features and isinstance(features, dict):
+        for feat_id, feat_value in features.items():
+            if feat_id in CARACTERISTICAS_ZONAPROP:
+                field = CARACTERISTICAS_ZONAPROP[feat_id]
+                if field not in item or not item[field]:
+                    item[field] = feat_value
+
+    # Tipo de propiedad (estructura correcta: realEstateType)
+    real_estate_type = posting.get('realEstateType', {})
+    tipo = real_estate_type.get('name', 'Casa')  # Default Casa en vez de Departamento
+    # Normalizar plural a singular
+    if tipo == 'Casas':
+        tipo = 'Casa'
+    elif tipo == 'Departamentos':
+        tipo = 'Departamento'
+    elif tipo == 'PHs':
+        tipo = 'PH'
+    item['tipo'] = tipo
+    item['operacion'] = 'Alquiler'
+
+    # Amenities y extras
+    amenities = posting.get('tags', [])
+    amenities_text = ' '.join(amenities).lower()
+    titulo_desc = (item.get('titulo', '') + ' ' + item.get('descripcion', '')).lower()
+
+    # Mascotas: detectar si acepta, pero descartar si dice "no" o "sin"
+    mascotas_text = amenities_text + ' ' + titulo_desc
+    tiene_mascota_positivo = any(word in mascotas_text for word in ['acepta mascota', 'permite mascota', 'admite mascota', 'pet friendly', 'pets allowed'])
+    tiene_mascota_negativo = any(word in mascotas_text for word in ['no mascota', 'sin mascota', 'no acepta mascota', 'no se acepta mascota', 'no permite mascota', 'no admite mascota', 'not pet', 'no pet'])
+
+    # Solo marcar True si hay mención positiva Y no hay mención negativa
+    item['mascotas'] = tiene_mascota_positivo and not tiene_mascota_negativo
+
+    item['patio'] = any(word in amenities_text for word in ['patio', 'jardín', 'jardin', 'terraza']) or \
+                   any(word in titulo_desc for word in ['patio', 'jardín', 'jardin', 'terraza', 'quincho'])
+
+    # Imágenes
+    pictures = posting.get('pictures', [])
+    if logger:
+        logger.debug(f"Pictures encontradas: {len(pictures)} para {posting.get('id')}")
+    if pictures:
+        imagenes = []
+        for pic in pictures:
+            url_img = pic.get('url') or pic.get('image2x', '')
+            if url_img:
+                imagenes.append(url_img)
+
+        if imagenes:
+            item['imagenes'] = imagenes
+            item['imagen_principal'] = imagenes[0]
+            if logger:
+                logger.debug(f"✓ {len(imagenes)} imágenes agregadas para {item['titulo'][:50]}")
+
+    # Metadata
+    item['fecha_scraping'] = datetime.now().isoformat()
+
+    return item
+
+
+def reintento_con_navegador(response, **meta):
+    """
+    El mismo request pero renderizado con Selenium, para cuando el HTML del
+    GET común no trae ni estado embebido ni lo que buscan los selectores.
+    None si la respuesta ya venía del navegador.
+    """
+    if response.meta.get('selenium'):
+        return None
+    return response.request.replace(
+        meta={**response.request.meta, 'selenium': True, **meta},
+        dont_filter=True,
+    )
+
+
+def item_desde_estado(datos, fuente, url, **defaults):
+    """PropiedadItem con los campos del estado embebido (pisan a `defaults`)"""
+    item = PropiedadItem(fuente=fuente, url=url, **defaults)
+    for campo, valor in datos.items():
+        item[campo] = valor
+    item['fecha_scraping'] = datetime.now().isoformat()
+    return item
@@ -0,0 +1,167 @@
+"""
+Extracción compartida por los spiders, sobre lxml/parsel.
+
+- XPath y regex se compilan una sola vez al importar el módulo.
+- Los regex corren sobre el texto visible de la página o tarjeta (nodos de
+  texto fuera de <script>, <style>, <noscript> y <template>), no sobre el
+  HTML crudo: es mucho menos texto y no hay falsos positivos en el JS o el
+  JSON embebido.
+
+Lo usan rentola_async y roomix (páginas de detalle) y los spiders *_simple
+(tarjetas del listado).
+"""
+import re
+
+from lxml import etree
+from parsel import Selector
+
+
+_TEXTO_VISIBLE = etree.XPath(
+    './/text()[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]',
+    smart_strings=False,
+)
+_H1 = etree.XPath('normalize-space((//h1)[1])')
+
+# Tarjetas del listado (*_simple): valores como texto, los normaliza el pipeline
+PATRONES_TARJETA = {
+    'ambientes': re.compile(r'(\d+)\s*amb', re.IGNORECASE),
+    'superficie_total': re.compile(r'(\d+)\s*m[²2]', re.IGNORECASE),
+    'dormitorios': re.compile(r'(\d+)\s*dorm', re.IGNORECASE),
+    'banos': re.compile(r'(\d+)\s*ba[ñn]o', re.IGNORECASE),
+    'cocheras': re.compile(r'(\d+)\s*coch', re.IGNORECASE),
+}
+_PATIO = re.compile(r'\bpatio\b', re.IGNORECASE)
+_MASCOTAS = re.compile(r'mascota|pet', re.IGNORECASE)
+
+# Páginas de detalle
+SUPERFICIE = re.compile(r'(\d+(?:[.,]\d+)?)\s*m[²2]', re.IGNORECASE)
+DORMITORIOS = re.compile(r'(\d+)\s*(?:dormitorio|habitación|habitacion)', re.IGNORECASE)
+BANOS = re.compile(r'(\d+)\s*baño', re.IGNORECASE)
+AMBIENTES = re.compile(r'(\d+)\s*ambiente', re.IGNORECASE)
+PRECIOS = [
+    re.compile(r'\$\s*([\d.,]+)'),
+    re.compile(r'ARS\s*([\d.,]+)'),
+    re.compile(r'(\d{6,})\s*ARS'),
+]
+
+PALABRAS_PATIO = ('patio', 'jardín', 'jardin', 'quincho', 'parrilla', 'terraza', 'balcón', 'balcon')
+PALABRAS_MASCOTAS = ('mascota', 'pet', 'perro', 'gato', 'acepta mascota', 'permite mascota')
+
+BARRIOS_ROSARIO = [
+    'Centro', 'Distrito Centro', 'Abasto', 'Alberdi', 'Fisherton',
+    'Echesortu', 'Pichincha', 'Luis Agote', 'República de la Sexta',
+    'Martín', 'Puerto Norte', 'Distrito Norte', 'Distrito Sur',
+    'Distrito Noroeste', 'Refinería', 'La Florida', 'Godoy',
+    'Lisandro de la Torre', 'Triángulo Moderno', 'Sarmiento',
+    'Bella Vista', 'Parque Casado', 'Barrio Industrial',
+    'Ludueña', 'Triángulo',
+]
+_BARRIOS_MINUSCULA = [(barrio.lower(), barrio) for barrio in BARRIOS_ROSARIO]
+
+
+class Pagina:
+    """
+    Página o fragmento HTML con el texto visible calculado una sola vez.
+
+    Acepta un Response de Scrapy, un Selector de parsel (por ejemplo una
+    tarjeta del listado) o el HTML como str.
+    """
+
+    def __init__(self, origen):
+        if isinstance(origen, str):
+            self.selector = Selector(text=origen)
+        else:
+            self.selector = getattr(origen, 'selector', origen)
+        self._texto = None
+        self._minuscula = None
+
+    @property
+    def texto(self):
+        if self._texto is None:
+            self._texto = ' '.join(_TEXTO_VISIBLE(self.selector.root))
+        return self._texto
+
+    @property
+    def minuscula(self):
+        if self._minuscula is None:
+            self._minuscula = self.texto.lower()
+        return self._minuscula
+
+    def css(self, consulta):
+        return self.selector.css(consulta)
+
+    def primero(self, *consultas):
+        """Primer resultado no vacío (sin espacios) entre varias consultas CSS"""
+        for consulta in consultas:
+            valor = self.selector.css(consulta).get()
+            if valor and valor.strip():
+                return valor.strip()
+        return None
+
+    def buscar(self, patron):
+        """Primer grupo del regex compilado sobre el texto visible"""
+        match = patron.search(self.texto)
+        return match.group(1) if match else None
+
+    def contiene(self, palabras):
+        return any(palabra in self.minuscula for palabra in palabras)
+
+    def titulo(self):
+        """Texto del primer <h1>, o og:title si no hay"""
+        return _H1(self.selector.root) or self.selector.css('meta[property="og:title"]::attr(content)').get()
+
+
+def caracteristicas_tarjeta(pagina):
+    """
+    Ambientes, superficie, dormitorios, baños y cocheras que aparecen en el
+    texto de una tarjeta, más patio/mascotas cuando se mencionan.
+    """
+    datos = {}
+    for campo, patron in PATRONES_TARJETA.items():
+        valor = pagina.buscar(patron)
+        if valor:
+            datos[campo] = valor
+    if _PATIO.search(pagina.texto):
+        datos['patio'] = True
+    if _MASCOTAS.search(pagina.texto):
+        datos['mascotas'] = True
+    return datos
+
+
+def titulo_tarjeta(pagina, datos, ubicacion=None):
+    """Título armado con lo visible en la tarjeta: 'Departamento 2 amb 45m² en Centro'"""
+    partes = []
+    if 'departamento' in pagina.minuscula:
+        partes.append('Departamento')
+    elif 'casa' in pagina.minuscula:
+        partes.append('Casa')
+    if datos.get('ambientes'):
+        partes.append(f"{datos['ambientes']} amb")
+    if datos.get('superficie_total'):
+        partes.append(f"{datos['superficie_total']}m²")
+    if ubicacion:
+        partes.append(f"en {ubicacion}")
+    return ' '.join(partes) if partes else None
+
+
+def precio_en_texto(pagina):
+    """Primer precio ARS que aparece en el texto visible, como float"""
+    for patron in PRECIOS:
+        valor = pagina.buscar(patron)
+        if valor:
+            try:
+                return float(valor.replace('.', '').replace(',', '.'))
+            except ValueError:
+                continue
+    return None
+
+
+def extraer_barrio(texto):
+    """Primer barrio conocido de Rosario mencionado en el texto"""
+    if not texto:
+        return None
+    texto = texto.lower()
+    for minuscula, barrio in _BARRIOS_MINUSCULA:
+        if minuscula in texto:
+            return barrio
+    return None
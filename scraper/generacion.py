@@ -0,0 +1,47 @@
+"""
+Contador de generación de los datos.
+
+El DatabasePipeline lo incrementa en la misma transacción de cada escritura;
+la API lo lee (una búsqueda por clave primaria) para saber si sus cachés
+siguen vigentes sin recalcular nada. Vive en la base porque scraper y API
+corren en procesos distintos.
+
+Cada fila de `propiedades` guarda la generación que la escribió por última
+vez (`propiedades.generacion`), así lo que cambió desde una generación se
+consulta por índice sin depender de relojes.
+"""
+from sqlalchemy import MetaData, Table, Column, Integer, select, update, insert
+
+
+generacion_datos = Table(
+    'generacion_datos', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('valor', Integer, nullable=False, default=0),
+)
+
+
+def crear_tabla_generacion(engine):
+    """Crea la tabla con su única fila si no existe"""
+    generacion_datos.create(engine, checkfirst=True)
+    with engine.begin() as conn:
+        if conn.execute(select(generacion_datos.c.id)).first() is None:
+            conn.execute(insert(generacion_datos).values(id=1, valor=0))
+
+
+def incrementar_generacion(conn):
+    """
+    Invalida las cachés de la API; llamar dentro de la transacción que escribe.
+    Retorna la nueva generación, que se guarda en las filas escritas.
+    """
+    conn.execute(
+        update(generacion_datos)
+        .where(generacion_datos.c.id == 1)
+        .values(valor=generacion_datos.c.valor + 1)
+    )
+    return leer_generacion(conn)
+
+
+def leer_generacion(conn):
+    return conn.execute(
+        select(generacion_datos.c.valor).where(generacion_datos.c.id == 1)
+    ).scalar() or 0
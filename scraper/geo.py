@@ -0,0 +1,148 @@
+"""
+Índice espacial sobre latitud/longitud.
+
+- SQLite: tabla R*Tree `propiedades_geo` mantenida por triggers sobre
+  `propiedades`, igual que el índice de texto de busqueda.py.
+- PostgreSQL: columna generada `geo` (geography, PostGIS) con índice GiST.
+
+Las consultas por radio usan una aproximación equirectangular, exacta de
+sobra a escala de una ciudad y calculable con aritmética pura en SQLite.
+"""
+import math
+
+from sqlalchemy import MetaData, Table, Column, Integer, Float, select, and_, func, literal_column
+
+
+METROS_POR_GRADO = 111320.0
+
+propiedades_geo = Table(
+    'propiedades_geo', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('min_lat', Float),
+    Column('max_lat', Float),
+    Column('min_lng', Float),
+    Column('max_lng', Float),
+)
+
+_SQLITE_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS propiedades_geo USING rtree(
+        id, min_lat, max_lat, min_lng, max_lng
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS propiedades_geo_ai AFTER INSERT ON propiedades
+    WHEN new.latitud IS NOT NULL AND new.longitud IS NOT NULL BEGIN
+        INSERT INTO propiedades_geo VALUES (new.id, new.latitud, new.latitud, new.longitud, new.longitud);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS propiedades_geo_ad AFTER DELETE ON propiedades BEGIN
+        DELETE FROM propiedades_geo WHERE id = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS propiedades_geo_au AFTER UPDATE OF latitud, longitud ON propiedades BEGIN
+        DELETE FROM propiedades_geo WHERE id = old.id;
+        INSERT INTO propiedades_geo
+        SELECT new.id, new.latitud, new.latitud, new.longitud, new.longitud
+        WHERE new.latitud IS NOT NULL AND new.longitud IS NOT NULL;
+    END
+    """,
+]
+
+_POSTGRES_DDL = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    """
+    ALTER TABLE propiedades ADD COLUMN IF NOT EXISTS geo geography(Point, 4326)
+    GENERATED ALWAYS AS (
+        CASE WHEN latitud IS NOT NULL AND longitud IS NOT NULL
+             THEN ST_SetSRID(ST_MakePoint(longitud, latitud), 4326)::geography END
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_propiedades_geo ON propiedades USING GIST (geo)",
+]
+
+
+def crear_indice_geo(engine):
+    """
+    Crea el índice espacial si no existe (idempotente).
+
+    Retorna True si quedó disponible; False si el motor no lo soporta
+    (SQLite sin R*Tree, PostgreSQL sin PostGIS).
+    """
+    dialecto = engine.dialect.name
+    try:
+        with engine.begin() as conn:
+            if dialecto == 'sqlite':
+                existia = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'propiedades_geo'"
+                ).first()
+                for ddl in _SQLITE_DDL:
+                    conn.exec_driver_sql(ddl)
+                if not existia:
+                    conn.exec_driver_sql("""
+                        INSERT INTO propiedades_geo
+                        SELECT id, latitud, latitud, longitud, longitud FROM propiedades
+                        WHERE latitud IS NOT NULL AND longitud IS NOT NULL
+                    """)
+            elif dialecto == 'postgresql':
+                for ddl in _POSTGRES_DDL:
+                    conn.exec_driver_sql(ddl)
+            else:
+                return False
+    except Exception:
+        return False
+    return True
+
+
+def caja_de_radio(lat, lng, radio_m):
+    """(min_lng, min_lat, max_lng, max_lat) que contiene el círculo"""
+    d_lat = radio_m / METROS_POR_GRADO
+    d_lng = radio_m / (METROS_POR_GRADO * max(math.cos(math.radians(lat)), 1e-6))
+    return lng - d_lng, lat - d_lat, lng + d_lng, lat + d_lat
+
+
+def condicion_bbox(latitud, longitud, id_col, bbox, dialecto):
+    """
+    Condición SQL: el punto (latitud, longitud) cae dentro de bbox.
+
+    `dialecto` es el motor con índice espacial disponible, o None si no hay.
+    """
+    min_lng, min_lat, max_lng, max_lat = bbox
+    exacta = and_(
+        latitud.between(min_lat, max_lat),
+        longitud.between(min_lng, max_lng),
+    )
+    if dialecto == 'postgresql':
+        envolvente = func.ST_MakeEnvelope(min_lng, min_lat, max_lng, max_lat, 4326)
+        return and_(
+            literal_column('geo').op('&&')(func.geography(envolvente)),
+            exacta,
+        )
+    if dialecto == 'sqlite':
+        # El R*Tree guarda floats de 32 bits: lo usamos para descartar y
+        # la comparación exacta sobre las columnas decide los bordes
+        g = propiedades_geo.c
+        candidatos = select(g.id).where(
+            g.max_lat >= min_lat, g.min_lat <= max_lat,
+            g.max_lng >= min_lng, g.min_lng <= max_lng,
+        )
+        return and_(id_col.in_(candidatos), exacta)
+    # Sin índice espacial: solo la comparación sobre las columnas
+    return exacta
+
+
+def condicion_radio(latitud, longitud, id_col, lat, lng, radio_m, dialecto):
+    """Condición SQL: el punto está a menos de radio_m metros de (lat, lng)"""
+    if dialecto == 'postgresql':
+        centro = func.geography(func.ST_SetSRID(func.ST_MakePoint(lng, lat), 4326))
+        return func.ST_DWithin(literal_column('geo'), centro, radio_m)
+    escala_lng = math.cos(math.radians(lat))
+    d_lat = latitud - lat
+    d_lng = (longitud - lng) * escala_lng
+    limite = (radio_m / METROS_POR_GRADO) ** 2
+    return and_(
+        condicion_bbox(latitud, longitud, id_col, caja_de_radio(lat, lng, radio_m), dialecto),
+        d_lat * d_lat + d_lng * d_lng <= limite,
+    )
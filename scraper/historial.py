@@ -0,0 +1,289 @@
+"""
+Historial de cambios de las propiedades.
+
+`propiedad_historial` es append-only: una fila (propiedad_id, campo, fecha,
+valor) cuando una propiedad aparece por primera vez y otra cada vez que
+cambia uno de los CAMPOS_HISTORIAL. La escriben triggers de la base sobre
+`propiedades` (como el índice de texto de busqueda.py), así que queda en la
+misma transacción del upsert por lotes del DatabasePipeline y también
+registra las desactivaciones del cierre. Un upsert que no cambia nada no
+escribe historial.
+
+Para que ocupe poco con millones de observaciones:
+- el campo es un código SMALLINT y la fecha segundos epoch (INTEGER);
+- moneda y activa se guardan codificadas como número, todo cabe en `valor`;
+- en SQLite la tabla es WITHOUT ROWID (la clave primaria es la tabla) y los
+  REAL sin decimales se guardan en disco como enteros.
+"""
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+
+# Campo -> código guardado en propiedad_historial.campo
+CAMPOS_HISTORIAL = {
+    'precio': 1,
+    'moneda': 2,
+    'expensas': 3,
+    'superficie_total': 4,
+    'ambientes': 5,
+    'dormitorios': 6,
+    'banos': 7,
+    'activa': 8,
+}
+_NOMBRES = {codigo: campo for campo, codigo in CAMPOS_HISTORIAL.items()}
+
+MONEDAS = {'ARS': 0, 'USD': 1}
+_MONEDAS_CODIGO = {codigo: moneda for moneda, codigo in MONEDAS.items()}
+
+_ENTEROS = frozenset(['ambientes', 'dormitorios', 'banos'])
+
+# Agrupación de /tendencias/precios: formato del período por motor, en UTC.
+# Semanas ISO (lunes a domingo, año de la semana) en los dos motores: SQLite
+# anterior a 3.46 no tiene %G/%V, así que se calculan desde el jueves de la
+# semana, que siempre cae en el año ISO
+_JUEVES = "(h.fecha + 86400 * (3 - (CAST(strftime('%w', h.fecha, 'unixepoch') AS INTEGER) + 6) % 7))"
+PERIODOS = {
+    'mes': {'sqlite': "strftime('%Y-%m', h.fecha, 'unixepoch')",
+            'postgresql': "to_char(to_timestamp(h.fecha) AT TIME ZONE 'UTC', 'YYYY-MM')"},
+    'semana': {'sqlite': f"strftime('%Y', {_JUEVES}, 'unixepoch') || '-W' || "
+                         f"printf('%02d', (CAST(strftime('%j', {_JUEVES}, 'unixepoch') AS INTEGER) - 1) / 7 + 1)",
+               'postgresql': "to_char(to_timestamp(h.fecha) AT TIME ZONE 'UTC', 'IYYY-\"W\"IW')"},
+}
+
+
+def _valor(campo, fila, dialecto):
+    """Expresión SQL del valor numérico de `campo` en new/old"""
+    if campo == 'moneda':
+        casos = ' '.join(f"WHEN '{moneda}' THEN {codigo}" for moneda, codigo in MONEDAS.items())
+        return f"CASE {fila}.moneda {casos} END"
+    if campo == 'activa' and dialecto == 'postgresql':
+        return f"{fila}.activa::int"
+    if dialecto == 'postgresql':
+        return f"{fila}.{campo}::float8"
+    return f"{fila}.{campo}"
+
+
+def _sqlite_ddl():
+    ahora = "CAST(strftime('%s', 'now') AS INTEGER)"
+    altas = ' UNION ALL '.join(
+        f"SELECT {codigo} AS campo, {_valor(campo, 'new', 'sqlite')} AS valor"
+        for campo, codigo in CAMPOS_HISTORIAL.items()
+    )
+    cambios = ' UNION ALL '.join(
+        f"SELECT {codigo} AS campo, {_valor(campo, 'new', 'sqlite')} AS nuevo, "
+        f"{_valor(campo, 'old', 'sqlite')} AS anterior"
+        for campo, codigo in CAMPOS_HISTORIAL.items()
+    )
+    return [
+        """
+        CREATE TABLE IF NOT EXISTS propiedad_historial (
+            propiedad_id INTEGER NOT NULL,
+            campo SMALLINT NOT NULL,
+            fecha INTEGER NOT NULL,
+            valor REAL,
+            PRIMARY KEY (propiedad_id, campo, fecha)
+        ) WITHOUT ROWID
+        """,
+        # Dos cambios del mismo campo en el mismo segundo: queda el último. Con
+        # ON CONFLICT DO UPDATE y no INSERT OR REPLACE, que dentro del upsert del
+        # pipeline queda anulado por el manejo de conflictos del statement externo
+        "DROP TRIGGER IF EXISTS propiedades_historial_ai",
+        f"""
+        CREATE TRIGGER propiedades_historial_ai AFTER INSERT ON propiedades BEGIN
+            INSERT INTO propiedad_historial (propiedad_id, campo, fecha, valor)
+            SELECT new.id, campo, {ahora}, valor FROM ({altas}) WHERE valor IS NOT NULL
+            ON CONFLICT (propiedad_id, campo, fecha) DO UPDATE SET valor = excluded.valor;
+        END
+        """,
+        "DROP TRIGGER IF EXISTS propiedades_historial_au",
+        f"""
+        CREATE TRIGGER propiedades_historial_au
+        AFTER UPDATE OF {', '.join(CAMPOS_HISTORIAL)} ON propiedades BEGIN
+            INSERT INTO propiedad_historial (propiedad_id, campo, fecha, valor)
+            SELECT new.id, campo, {ahora}, nuevo FROM ({cambios}) WHERE nuevo IS NOT anterior
+            ON CONFLICT (propiedad_id, campo, fecha) DO UPDATE SET valor = excluded.valor;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS propiedades_historial_ad AFTER DELETE ON propiedades BEGIN
+            DELETE FROM propiedad_historial WHERE propiedad_id = old.id;
+        END
+        """,
+    ]
+
+
+def _postgres_ddl():
+    valores = ', '.join(
+        f"({codigo}, {_valor(campo, 'NEW', 'postgresql')}, {_valor(campo, 'OLD', 'postgresql')})"
+        for campo, codigo in CAMPOS_HISTORIAL.items()
+    )
+    return [
+        """
+        CREATE TABLE IF NOT EXISTS propiedad_historial (
+            propiedad_id INTEGER NOT NULL,
+            campo SMALLINT NOT NULL,
+            fecha BIGINT NOT NULL,
+            valor DOUBLE PRECISION,
+            PRIMARY KEY (propiedad_id, campo, fecha)
+        )
+        """,
+        # En un INSERT, OLD es NULL: se registran los valores no nulos
+        f"""
+        CREATE OR REPLACE FUNCTION propiedades_historial() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                DELETE FROM propiedad_historial WHERE propiedad_id = OLD.id;
+                RETURN NULL;
+            END IF;
+            INSERT INTO propiedad_historial (propiedad_id, campo, fecha, valor)
+            SELECT NEW.id, c.campo, extract(epoch FROM now())::bigint, c.nuevo
+            FROM (VALUES {valores}) AS c(campo, nuevo, anterior)
+            WHERE CASE WHEN TG_OP = 'INSERT' THEN c.nuevo IS NOT NULL
+                       ELSE c.nuevo IS DISTINCT FROM c.anterior END
+            ON CONFLICT (propiedad_id, campo, fecha) DO UPDATE SET valor = EXCLUDED.valor;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS propiedades_historial_trg ON propiedades",
+        f"""
+        CREATE TRIGGER propiedades_historial_trg
+        AFTER INSERT OR DELETE OR UPDATE OF {', '.join(CAMPOS_HISTORIAL)} ON propiedades
+        FOR EACH ROW EXECUTE FUNCTION propiedades_historial()
+        """,
+    ]
+
+
+def _carga_inicial(dialecto):
+    """Estado actual de las propiedades existentes como primera observación"""
+    if dialecto == 'postgresql':
+        fecha = "extract(epoch FROM coalesce(p.fecha_scraping, now()))::bigint"
+    else:
+        fecha = "coalesce(CAST(strftime('%s', p.fecha_scraping) AS INTEGER), CAST(strftime('%s', 'now') AS INTEGER))"
+    return '\n'.join(
+        ('' if i == 0 else 'UNION ALL\n') +
+        f"SELECT p.id, {codigo}, {fecha}, {_valor(campo, 'p', dialecto)} FROM propiedades p "
+        f"WHERE {_valor(campo, 'p', dialecto)} IS NOT NULL"
+        for i, (campo, codigo) in enumerate(CAMPOS_HISTORIAL.items())
+    )
+
+
+def crear_historial(engine):
+    """
+    Crea la tabla y los triggers si no existen (idempotente). La primera vez
+    carga el estado actual de las propiedades que ya había.
+
+    Retorna True si el historial quedó activo; False si el motor no lo soporta.
+    """
+    dialecto = engine.dialect.name
+    if dialecto == 'sqlite':
+        ddl = _sqlite_ddl()
+    elif dialecto == 'postgresql':
+        ddl = _postgres_ddl()
+    else:
+        return False
+    try:
+        with engine.begin() as conn:
+            if dialecto == 'sqlite':
+                existia = conn.exec_driver_sql(
+                    "SELECT 1 FROM sqlite_master WHERE name = 'propiedad_historial'"
+                ).first()
+            else:
+                existia = conn.exec_driver_sql("SELECT to_regclass('propiedad_historial')").scalar()
+            for sentencia in ddl:
+                conn.exec_driver_sql(sentencia)
+            if not existia:
+                conn.exec_driver_sql(
+                    "INSERT INTO propiedad_historial (propiedad_id, campo, fecha, valor)\n"
+                    + _carga_inicial(dialecto)
+                )
+    except Exception:
+        return False
+    return True
+
+
+def _decodificar(campo, valor):
+    if valor is None:
+        return None
+    if campo == 'moneda':
+        return _MONEDAS_CODIGO.get(int(valor))
+    if campo == 'activa':
+        return bool(valor)
+    if campo in _ENTEROS:
+        return int(valor)
+    return valor
+
+
+def _iso(segundos):
+    return datetime.fromtimestamp(segundos, timezone.utc).isoformat()
+
+
+def serie_propiedad(conn, propiedad_id, campos=None):
+    """{campo: [{fecha, valor}, ...]} en orden cronológico, solo campos con observaciones"""
+    codigos = [CAMPOS_HISTORIAL[c] for c in campos] if campos else list(_NOMBRES)
+    filas = conn.execute(text(
+        "SELECT campo, fecha, valor FROM propiedad_historial "
+        "WHERE propiedad_id = :id AND campo IN ({}) ORDER BY campo, fecha".format(
+            ', '.join(str(c) for c in codigos))
+    ), {'id': propiedad_id})
+    series = {}
+    for codigo, fecha, valor in filas:
+        campo = _NOMBRES[codigo]
+        series.setdefault(campo, []).append({'fecha': _iso(fecha), 'valor': _decodificar(campo, valor)})
+    return series
+
+
+def tendencias_precio(conn, periodo='mes', barrio=None, moneda=None, desde=None):
+    """
+    Precio por barrio, período y moneda: cantidad de observaciones (altas y
+    cambios de precio), propiedades distintas, promedio, mínimo y máximo.
+
+    Cada observación cuenta en la moneda que tenía la propiedad en ese
+    momento (la última observación de moneda hasta esa fecha), así un
+    cambio de ARS a USD no mezcla precios. `moneda` filtra por esa misma
+    moneda; `desde` es un datetime (las observaciones anteriores no cuentan).
+    """
+    dialecto = conn.dialect.name
+    condiciones = ["h.campo = :campo", "h.valor IS NOT NULL", "p.barrio IS NOT NULL"]
+    parametros = {'campo': CAMPOS_HISTORIAL['precio'], 'campo_moneda': CAMPOS_HISTORIAL['moneda']}
+    if barrio:
+        condiciones.append("lower(p.barrio) LIKE lower(:barrio)")
+        parametros['barrio'] = f"%{barrio}%"
+    if desde:
+        condiciones.append("h.fecha >= :desde")
+        parametros['desde'] = int(desde.replace(tzinfo=desde.tzinfo or timezone.utc).timestamp())
+    filtro_moneda = ''
+    if moneda:
+        filtro_moneda = "WHERE o.moneda = :moneda"
+        parametros['moneda'] = MONEDAS.get(moneda, -1)
+    expresion = PERIODOS[periodo]['postgresql' if dialecto == 'postgresql' else 'sqlite']
+    # La moneda vigente sale de la clave primaria (propiedad_id, campo, fecha)
+    filas = conn.execute(text(f"""
+        SELECT o.barrio, o.periodo, o.moneda, count(*), count(DISTINCT o.propiedad_id),
+               avg(o.valor), min(o.valor), max(o.valor)
+        FROM (
+            SELECT p.barrio, {expresion} AS periodo, h.propiedad_id, h.valor,
+                   (SELECT m.valor FROM propiedad_historial m
+                    WHERE m.propiedad_id = h.propiedad_id AND m.campo = :campo_moneda AND m.fecha <= h.fecha
+                    ORDER BY m.fecha DESC LIMIT 1) AS moneda
+            FROM propiedad_historial h JOIN propiedades p ON p.id = h.propiedad_id
+            WHERE {' AND '.join(condiciones)}
+        ) o
+        {filtro_moneda}
+        GROUP BY o.barrio, o.periodo, o.moneda
+        ORDER BY o.barrio, o.periodo, o.moneda
+    """), parametros)
+    return [
+        {
+            'barrio': barrio_,
+            'periodo': periodo_,
+            'moneda': _decodificar('moneda', moneda_),
+            'observaciones': observaciones,
+            'propiedades': propiedades,
+            'precio_promedio': round(promedio, 2) if promedio is not None else None,
+            'precio_min': minimo,
+            'precio_max': maximo,
+        }
+        for barrio_, periodo_, moneda_, observaciones, propiedades, promedio, minimo, maximo in filas
+    ]
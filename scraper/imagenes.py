@@ -0,0 +1,470 @@
+"""
+Fotos de las propiedades: la lista de cada una y sus hashes perceptuales.
+
+- `propiedad_imagen` (scraper/modelos.py) guarda las fotos de cada
+  propiedad, una fila por posición (url y tamaño si se conoce).
+  DatabasePipeline la escribe en el mismo lote que la propiedad comparando
+  con lo que había (`guardar_imagenes`): una propiedad con las mismas fotos
+  no escribe nada.
+- ImagenesPipeline (opcional, IMAGENES_ENABLED) baja las primeras
+  IMAGENES_POR_PROPIEDAD fotos de cada item con un único httpx.AsyncClient y
+  un semáforo (IMAGENES_CONCURRENCIA), calcula un dHash de 64 bits y deja
+  item['hashes_imagen'] = {url: hash} e item['tamanos_imagen'] = {url: (ancho, alto)}.
+- Caché en disco: por cada URL se guarda la miniatura de 32x32 en grises
+  (~1 KB, con el tamaño original como texto del PNG); la próxima corrida la
+  lee de ahí sin ir a la red.
+- DatabasePipeline guarda los hashes en `imagen_hash` en el mismo lote que
+  la propiedad (`guardar_hashes`).
+- IndiceHashes (multi-index hashing) busca hashes a distancia de Hamming
+  acotada sin recorrer todos: la API lo usa para "propiedades con las mismas
+  fotos". La deduplicación usa los mismos trozos como claves de bloqueo.
+
+Las fotos se bajan solo por http(s) y hasta IMAGENES_MAX_BYTES. Las URLs
+file:// y las rutas locales se leen únicamente dentro de IMAGENES_DIR_FIXTURES
+(si está configurado), para probar offline con benchmarks/fixtures/imagenes.
+Requiere Pillow.
+"""
+import asyncio
+import hashlib
+import io
+import os
+from functools import lru_cache
+from itertools import combinations
+from urllib.parse import urlsplit, unquote
+
+import httpx
+from scrapy.exceptions import NotConfigured
+from sqlalchemy import MetaData, Table, Column, Integer, BigInteger, String, Index, select, delete, update, bindparam
+
+try:
+    from PIL import Image, PngImagePlugin
+except ImportError:  # Pillow es opcional: sin él la etapa no se activa
+    Image = None
+
+from scraper.modelos import PropiedadImagen
+
+
+LADO_MINIATURA = 32
+BITS = 64
+TROZOS, BITS_TROZO = 4, 16
+
+# Fotos de cada propiedad en orden (modelo compartido, scraper/modelos.py)
+propiedad_imagen = PropiedadImagen.__table__
+
+imagen_hash = Table(
+    'imagen_hash', MetaData(),
+    # Creciente (AUTOINCREMENT): la API carga solo las filas nuevas
+    Column('id', Integer, primary_key=True),
+    Column('propiedad_id', Integer, nullable=False),
+    Column('url', String(1000), nullable=False),
+    Column('hash', BigInteger, nullable=False),
+    Index('ux_imagen_hash_propiedad_url', 'propiedad_id', 'url', unique=True),
+    Index('ix_imagen_hash_hash', 'hash'),
+    sqlite_autoincrement=True,
+)
+
+
+def crear_tabla_hashes(engine):
+    imagen_hash.create(engine, checkfirst=True)
+
+
+def a_columna(h):
+    """El hash sin signo de 64 bits como entero con signo (INTEGER de SQLite, BIGINT)"""
+    return h - (1 << BITS) if h >= 1 << (BITS - 1) else h
+
+
+def desde_columna(valor):
+    return valor + (1 << BITS) if valor < 0 else valor
+
+
+def distancia(a, b):
+    """Bits distintos entre dos hashes"""
+    return (a ^ b).bit_count()
+
+
+def miniatura(contenido):
+    """
+    Imagen (bytes en cualquier formato de Pillow) -> miniatura 32x32 en grises,
+    como PNG con el tamaño original en el texto 'tamano' ("ancho x alto")
+    """
+    imagen = Image.open(io.BytesIO(contenido))
+    ancho, alto = imagen.size
+    # JPEG: decodificar directo a escala reducida, mucho más rápido que abrirla entera
+    imagen.draft('L', (LADO_MINIATURA * 2, LADO_MINIATURA * 2))
+    imagen = imagen.convert('L').resize((LADO_MINIATURA, LADO_MINIATURA), Image.Resampling.LANCZOS)
+    texto = PngImagePlugin.PngInfo()
+    texto.add_text('tamano', f'{ancho}x{alto}')
+    salida = io.BytesIO()
+    imagen.save(salida, format='PNG', optimize=True, pnginfo=texto)
+    return salida.getvalue()
+
+
+def tamano_original(contenido_miniatura):
+    """(ancho, alto) de la foto de la que salió la miniatura, o None si no lo tiene"""
+    texto = Image.open(io.BytesIO(contenido_miniatura)).text.get('tamano', '')
+    ancho, _, alto = texto.partition('x')
+    return (int(ancho), int(alto)) if ancho.isdigit() and alto.isdigit() else None
+
+
+def dhash(contenido_miniatura):
+    """
+    dHash de 64 bits: la miniatura a 9x8 y un bit por cada par de píxeles
+    vecinos (¿el de la izquierda es más claro?). Resiste cambios de tamaño,
+    recompresión y brillo.
+    """
+    imagen = Image.open(io.BytesIO(contenido_miniatura)).convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixeles = imagen.tobytes()
+    h = 0
+    for fila in range(8):
+        base = fila * 9
+        for columna in range(8):
+            h = (h << 1) | (pixeles[base + columna] > pixeles[base + columna + 1])
+    return h
+
+
+def lista_imagenes(imagenes):
+    """URLs de imagen (lista o string separado por comas) sin vacías ni repetidas, en orden"""
+    if not imagenes:
+        return []
+    if isinstance(imagenes, str):
+        imagenes = imagenes.split(',')
+    vistas = {}
+    for url in imagenes:
+        url = url.strip() if url else ''
+        if url:
+            vistas.setdefault(url, None)
+    return list(vistas)
+
+
+def _analizar(contenido_miniatura):
+    return dhash(contenido_miniatura), tamano_original(contenido_miniatura)
+
+
+def urls_imagenes(item, maximo):
+    """Primeras `maximo` URLs de imagen del item"""
+    return lista_imagenes(item.get('imagenes') or item.get('imagen_principal'))[:maximo]
+
+
+class ImagenRechazada(ValueError):
+    """URL que no se descarga: esquema no permitido, ruta fuera del directorio o muy grande"""
+
+
+def url_absoluta(url):
+    """Las URLs relativas al protocolo (//cdn.ejemplo/foto.jpg) se piden por https"""
+    return 'https:' + url if url.startswith('//') else url
+
+
+def ruta_local(url, directorio):
+    """
+    Ruta en disco para file:// o rutas locales dentro de `directorio`
+    (IMAGENES_DIR_FIXTURES); None si es una URL http(s). Las URLs salen de
+    páginas scrapeadas: cualquier otra cosa se rechaza.
+    """
+    partes = urlsplit(url_absoluta(url))
+    if partes.scheme in ('http', 'https'):
+        return None
+    if partes.scheme == 'file':
+        ruta = unquote(partes.path)
+    elif not partes.scheme:
+        ruta = url
+    else:
+        raise ImagenRechazada(f"esquema no permitido: {partes.scheme}")
+    if not directorio:
+        raise ImagenRechazada("rutas locales deshabilitadas (IMAGENES_DIR_FIXTURES)")
+    base = os.path.realpath(directorio)
+    ruta = os.path.realpath(os.path.join(base, ruta))
+    if os.path.commonpath([base, ruta]) != base or not os.path.isfile(ruta):
+        raise ImagenRechazada(f"ruta fuera de {directorio}")
+    return ruta
+
+
+def _leer_archivo(ruta, maximo):
+    with open(ruta, 'rb') as f:
+        contenido = f.read(maximo + 1)
+    if len(contenido) > maximo:
+        raise ImagenRechazada(f"más de {maximo} bytes")
+    return contenido
+
+
+# Todo lo que toca el disco corre en un thread (asyncio.to_thread), junto con
+# la decodificación, fuera del event loop del reactor
+
+def _desde_cache(ruta, maximo):
+    """Análisis de la miniatura cacheada, o None si no está"""
+    if not os.path.isfile(ruta):
+        return None
+    return _analizar(_leer_archivo(ruta, maximo))
+
+
+def _leer_local(url, directorio, maximo):
+    """Contenido de la foto si es una ruta local permitida; None si hay que bajarla"""
+    ruta = ruta_local(url, directorio)
+    return None if ruta is None else _leer_archivo(ruta, maximo)
+
+
+def _cachear(original, ruta):
+    """Miniatura de la foto, guardada en la caché, y su análisis"""
+    chica = miniatura(original)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, 'wb') as f:
+        f.write(chica)
+    return _analizar(chica)
+
+
+@lru_cache(maxsize=None)
+def _mascaras(bits_distintos):
+    """Todas las máscaras de BITS_TROZO bits con hasta `bits_distintos` bits en 1"""
+    return tuple(
+        sum(1 << b for b in posiciones)
+        for k in range(bits_distintos + 1)
+        for posiciones in combinations(range(BITS_TROZO), k)
+    )
+
+
+class IndiceHashes:
+    """
+    Multi-index hashing sobre la distancia de Hamming.
+
+    Cada hash se parte en TROZOS de BITS_TROZO bits y se guarda en una tabla
+    por trozo. Si dos hashes están a distancia <= r, por el principio del
+    palomar algún trozo difiere en <= r // TROZOS bits: alcanza con mirar, en
+    cada tabla, los baldes a esa distancia del trozo buscado y verificar
+    solo esos candidatos. Con radio 6 son 17 baldes por tabla, no todos los
+    hashes. Guarda hashes distintos: agregar uno repetido no hace nada.
+    """
+
+    def __init__(self):
+        self.tablas = [{} for _ in range(TROZOS)]
+        self.hashes = set()
+
+    @staticmethod
+    def _trozo(h, i):
+        return (h >> (BITS_TROZO * i)) & ((1 << BITS_TROZO) - 1)
+
+    def agregar(self, h):
+        if h in self.hashes:
+            return
+        self.hashes.add(h)
+        for i, tabla in enumerate(self.tablas):
+            tabla.setdefault(self._trozo(h, i), []).append(h)
+
+    def buscar(self, h, radio):
+        """[(distancia, hash)] a distancia <= radio, de la más cercana a la más lejana"""
+        mascaras = _mascaras(min(radio // TROZOS, BITS_TROZO))
+        candidatos = set()
+        for i, tabla in enumerate(self.tablas):
+            trozo = self._trozo(h, i)
+            for mascara in mascaras:
+                balde = tabla.get(trozo ^ mascara)
+                if balde:
+                    candidatos.update(balde)
+        return sorted((d, otro) for otro in candidatos if (d := distancia(h, otro)) <= radio)
+
+    def __len__(self):
+        return len(self.hashes)
+
+
+def _por_id(conn, tabla_propiedades, por_url):
+    """{url de la propiedad: valor} -> {id: valor}, para las URLs que ya están en la tabla"""
+    ids = dict(conn.execute(
+        select(tabla_propiedades.c.url, tabla_propiedades.c.id)
+        .where(tabla_propiedades.c.url.in_(list(por_url)))
+    ).all())
+    return {ids[url]: valor for url, valor in por_url.items() if url in ids}
+
+
+def guardar_imagenes(conn, tabla_propiedades, imagenes_por_url):
+    """
+    Reemplaza las fotos de las propiedades del lote. `imagenes_por_url` mapea
+    url de la propiedad -> [(url de la imagen, ancho, alto)] en orden.
+
+    Compara posición por posición con lo que hay y escribe solo la diferencia
+    en un executemany por tipo de cambio. Un tamaño desconocido (None) no
+    borra el que ya estaba guardado para la misma URL.
+    """
+    if not imagenes_por_url:
+        return
+    nuevas = _por_id(conn, tabla_propiedades, imagenes_por_url)
+    if not nuevas:
+        return
+    existentes = {}
+    for propiedad_id, posicion, url, ancho, alto in conn.execute(
+        select(propiedad_imagen.c.propiedad_id, propiedad_imagen.c.posicion, propiedad_imagen.c.url,
+               propiedad_imagen.c.ancho, propiedad_imagen.c.alto)
+        .where(propiedad_imagen.c.propiedad_id.in_(list(nuevas)))
+    ):
+        existentes[propiedad_id, posicion] = (url, ancho, alto)
+
+    insertar, actualizar = [], []
+    for propiedad_id, imagenes in nuevas.items():
+        for posicion, (url, ancho, alto) in enumerate(imagenes):
+            anterior = existentes.pop((propiedad_id, posicion), None)
+            if anterior is not None and anterior[0] == url and ancho is None:
+                ancho, alto = anterior[1], anterior[2]
+            if anterior == (url, ancho, alto):
+                continue
+            fila = {'p': propiedad_id, 'pos': posicion, 'url_': url, 'ancho_': ancho, 'alto_': alto}
+            (insertar if anterior is None else actualizar).append(fila)
+    # Lo que queda en `existentes` son posiciones que ya no están
+    if existentes:
+        conn.execute(
+            delete(propiedad_imagen).where(propiedad_imagen.c.propiedad_id == bindparam('p'),
+                                           propiedad_imagen.c.posicion == bindparam('pos')),
+            [{'p': propiedad_id, 'pos': posicion} for propiedad_id, posicion in existentes],
+        )
+    if actualizar:
+        conn.execute(
+            update(propiedad_imagen)
+            .where(propiedad_imagen.c.propiedad_id == bindparam('p'), propiedad_imagen.c.posicion == bindparam('pos'))
+            .values(url=bindparam('url_'), ancho=bindparam('ancho_'), alto=bindparam('alto_')),
+            actualizar,
+        )
+    if insertar:
+        conn.execute(
+            propiedad_imagen.insert().values(propiedad_id=bindparam('p'), posicion=bindparam('pos'),
+                                             url=bindparam('url_'), ancho=bindparam('ancho_'), alto=bindparam('alto_')),
+            insertar,
+        )
+
+
+def guardar_hashes(conn, tabla_propiedades, hashes_por_url):
+    """
+    Reemplaza los hashes de las propiedades del lote. `hashes_por_url` mapea
+    url de la propiedad -> {url de la imagen: hash}. Solo escribe lo que cambió,
+    así las filas que siguen iguales conservan su id.
+    """
+    if not hashes_por_url:
+        return
+    nuevos = {id_: {img: a_columna(h) for img, h in hashes.items()}
+              for id_, hashes in _por_id(conn, tabla_propiedades, hashes_por_url).items()}
+    if not nuevos:
+        return
+    existentes = {}
+    for propiedad_id, img, h in conn.execute(
+        select(imagen_hash.c.propiedad_id, imagen_hash.c.url, imagen_hash.c.hash)
+        .where(imagen_hash.c.propiedad_id.in_(list(nuevos)))
+    ):
+        existentes.setdefault(propiedad_id, {})[img] = h
+
+    borrar, insertar = [], []
+    for propiedad_id, hashes in nuevos.items():
+        anteriores = existentes.get(propiedad_id, {})
+        borrar.extend((propiedad_id, img) for img, h in anteriores.items() if hashes.get(img) != h)
+        insertar.extend({'propiedad_id': propiedad_id, 'url': img, 'hash': h}
+                        for img, h in hashes.items() if anteriores.get(img) != h)
+    for propiedad_id, img in borrar:
+        conn.execute(delete(imagen_hash).where(imagen_hash.c.propiedad_id == propiedad_id, imagen_hash.c.url == img))
+    if insertar:
+        conn.execute(imagen_hash.insert(), insertar)
+
+
+class ImagenesPipeline:
+    """
+    Hashes perceptuales de las fotos de cada item (opcional).
+
+    Corre entre la normalización y la base. Las descargas de todos los items
+    comparten un cliente y un semáforo: nunca hay más de IMAGENES_CONCURRENCIA
+    en vuelo. Una foto que no se puede bajar o decodificar se saltea.
+    """
+
+    def __init__(self, cache_dir, concurrencia=8, por_propiedad=3, timeout=15.0, stats=None,
+                 max_bytes=10 * 1024 * 1024, dir_fixtures=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.dir_fixtures = dir_fixtures
+        self.concurrencia = concurrencia
+        self.por_propiedad = por_propiedad
+        self.timeout = timeout
+        self.stats = stats
+        self.client = None
+        self.semaforo = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool('IMAGENES_ENABLED'):
+            raise NotConfigured
+        if Image is None:
+            raise NotConfigured("IMAGENES_ENABLED requiere Pillow (pip install pillow)")
+        from scrapy.utils.project import data_path
+        return cls(
+            cache_dir=data_path(crawler.settings.get('IMAGENES_CACHE_DIR', 'imagenes'), createdir=True),
+            concurrencia=crawler.settings.getint('IMAGENES_CONCURRENCIA', 8),
+            por_propiedad=crawler.settings.getint('IMAGENES_POR_PROPIEDAD', 3),
+            timeout=crawler.settings.getfloat('IMAGENES_TIMEOUT', 15.0),
+            stats=crawler.stats,
+            max_bytes=crawler.settings.getint('IMAGENES_MAX_BYTES', 10 * 1024 * 1024),
+            dir_fixtures=crawler.settings.get('IMAGENES_DIR_FIXTURES'),
+        )
+
+    def open_spider(self, spider):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.client = httpx.AsyncClient(
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.concurrencia, max_keepalive_connections=self.concurrencia),
+        )
+        self.semaforo = asyncio.Semaphore(self.concurrencia)
+
+    async def close_spider(self, spider):
+        if self.client is not None:
+            await self.client.aclose()
+
+    async def process_item(self, item, spider):
+        urls = urls_imagenes(item, self.por_propiedad)
+        if not urls:
+            return item
+        resultados = await asyncio.gather(*(self.analizar_imagen(url, spider) for url in urls))
+        analizadas = {url: r for url, r in zip(urls, resultados) if r is not None}
+        item['hashes_imagen'] = {url: h for url, (h, _) in analizadas.items()}
+        item['tamanos_imagen'] = {url: tamano for url, (_, tamano) in analizadas.items() if tamano}
+        return item
+
+    async def _descargar(self, url):
+        """Cuerpo de la respuesta, cortando la descarga si pasa de max_bytes"""
+        async with self.client.stream('GET', url) as respuesta:
+            respuesta.raise_for_status()
+            largo = respuesta.headers.get('content-length')
+            if largo and largo.isdigit() and int(largo) > self.max_bytes:
+                raise ImagenRechazada(f"Content-Length {largo} mayor a {self.max_bytes}")
+            partes, total = [], 0
+            async for parte in respuesta.aiter_bytes():
+                total += len(parte)
+                if total > self.max_bytes:
+                    raise ImagenRechazada(f"más de {self.max_bytes} bytes")
+                partes.append(parte)
+        return b''.join(partes)
+
+    def _ruta_cache(self, url):
+        nombre = hashlib.sha1(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, nombre[:2], nombre[2:] + '.png')
+
+    def _contar(self, clave, cantidad=1):
+        if self.stats is not None:
+            self.stats.inc_value(f'imagenes/{clave}', cantidad)
+
+    async def analizar_imagen(self, url, spider=None):
+        """
+        (dHash, (ancho, alto) o None) de la foto, desde la caché, el disco o
+        la red; None si falló
+        """
+        url = url_absoluta(url)
+        ruta = self._ruta_cache(url)
+        try:
+            resultado = await asyncio.to_thread(_desde_cache, ruta, self.max_bytes)
+            if resultado is not None:
+                self._contar('cache')
+                return resultado
+
+            original = await asyncio.to_thread(_leer_local, url, self.dir_fixtures, self.max_bytes)
+            if original is None:
+                async with self.semaforo:
+                    original = await self._descargar(url)
+                self._contar('descargadas')
+                self._contar('bytes', len(original))
+
+            return await asyncio.to_thread(_cachear, original, ruta)
+        except Exception as e:
+            self._contar('errores')
+            if spider is not None:
+                spider.logger.debug(f"Imagen {url}: {e}")
+            return None
@@ -0,0 +1,110 @@
+"""
+Crawl incremental: huella del contenido de cada URL.
+
+DatabasePipeline guarda en cada fila `huella`, un hash del item normalizado
+(sin los campos que cambian en cada corrida), y los validadores HTTP del
+detalle (`http_etag`, `http_last_modified`) cuando el spider los trae.
+
+En cada corrida `RegistroIncremental` carga lo conocido de la fuente y
+clasifica cada URL como nueva, cambiada o sin cambios; las que no aparecen
+se desactivan (removidas). Con INCREMENTAL = True:
+- una URL sin cambios no se vuelve a escribir (solo sus validadores HTTP,
+  si el servidor los cambió);
+- los spiders que bajan páginas de detalle mandan If-None-Match /
+  If-Modified-Since (ver `validadores`) y con un 304 la marcan sin cambios
+  sin descargar ni parsear nada.
+"""
+import hashlib
+import json
+
+
+# No forman parte del contenido: cambian en cada corrida o son metadata
+CAMPOS_VOLATILES = frozenset(['fecha_scraping', 'activa', 'huella', 'http_etag', 'http_last_modified'])
+
+ESTADOS = ('nuevas', 'cambiadas', 'sin_cambios', 'removidas')
+
+
+def huella(fila):
+    """Hash (hex, 32 caracteres) del contenido de una fila ya normalizada"""
+    contenido = sorted((k, v) for k, v in fila.items() if k not in CAMPOS_VOLATILES and v is not None)
+    texto = json.dumps(contenido, ensure_ascii=False, separators=(',', ':'), default=str)
+    return hashlib.blake2b(texto.encode('utf-8'), digest_size=16).hexdigest()
+
+
+class RegistroIncremental:
+    """
+    Lo conocido de una fuente y la clasificación de las URLs de esta corrida.
+
+    `conocidas` mapea url -> (huella, activa, etag, last_modified). `vistas`
+    son las URLs que aparecieron (con item ya guardado o con 304): el resto
+    se desactiva al cerrar.
+    """
+
+    def __init__(self, activo=False):
+        self.activo = activo
+        self.conocidas = {}
+        self.vistas = set()
+        self.conteos = dict.fromkeys(ESTADOS, 0)
+
+    def cargar(self, conn, tabla, fuente):
+        """Huellas y validadores de las filas de `fuente` (mismo criterio que la desactivación)"""
+        filas = conn.execute(
+            tabla.select()
+            .with_only_columns(tabla.c.url, tabla.c.huella, tabla.c.activa,
+                               tabla.c.http_etag, tabla.c.http_last_modified)
+            .where(tabla.c.fuente.ilike(f"%{fuente}%"))
+        )
+        self.conocidas = {url: (h, activa, etag, modificado) for url, h, activa, etag, modificado in filas}
+
+    def clasificar(self, url, huella_item):
+        """'nuevas', 'cambiadas' o 'sin_cambios' (una reactivada cuenta como nueva)"""
+        conocida = self.conocidas.get(url)
+        if conocida is None or not conocida[1]:
+            return 'nuevas'
+        if conocida[0] != huella_item:
+            return 'cambiadas'
+        return 'sin_cambios'
+
+    def marcar_vista(self, url, estado):
+        """
+        La URL apareció y quedó en la base: no se desactiva al cerrar. Solo la
+        primera vez en la corrida suma al conteo de `estado`.
+        """
+        if url not in self.vistas:
+            self.vistas.add(url)
+            self.conteos[estado] += 1
+
+    def validadores_cambiados(self, url, fila):
+        """
+        {'http_etag', 'http_last_modified'} de `fila` si difieren de los
+        guardados, o None. Un item sin cambios no se reescribe, pero el
+        servidor puede haber rotado los validadores: sin actualizarlos, el
+        próximo GET condicional nunca da 304.
+        """
+        conocida = self.conocidas.get(url)
+        if conocida is None or not ('http_etag' in fila or 'http_last_modified' in fila):
+            return None
+        nuevos = (fila.get('http_etag', conocida[2]), fila.get('http_last_modified', conocida[3]))
+        if nuevos == tuple(conocida[2:]):
+            return None
+        self.conocidas[url] = (*conocida[:2], *nuevos)
+        return {'http_etag': nuevos[0], 'http_last_modified': nuevos[1]}
+
+    def validadores(self, url):
+        """Headers para un GET condicional del detalle (vacío fuera del modo incremental)"""
+        conocida = self.conocidas.get(url) if self.activo else None
+        if conocida is None or not conocida[1] or conocida[0] is None:
+            return {}
+        headers = {}
+        if conocida[2]:
+            headers['If-None-Match'] = conocida[2]
+        if conocida[3]:
+            headers['If-Modified-Since'] = conocida[3]
+        return headers
+
+    def sin_cambios_http(self, url):
+        """El servidor respondió 304: la URL sigue publicada y no cambió"""
+        self.marcar_vista(url, 'sin_cambios')
+
+    def resumen(self):
+        return ', '.join(f"{estado.replace('_', ' ')}: {self.conteos[estado]}" for estado in ESTADOS)
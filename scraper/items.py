@@ -21,6 +21,9 @@ class PropiedadItem(scrapy.Item):
     ciudad = scrapy.Field()
     barrio = scrapy.Field()
     direccion = scrapy.Field()
+    latitud = scrapy.Field()  # float
+    longitud = scrapy.Field()  # float
+    mapa_url = scrapy.Field()
     
     # Características
     precio = scrapy.Field()  # float normalizado
@@ -43,7 +46,11 @@ class PropiedadItem(scrapy.Item):
     # Imagenes
     imagenes = scrapy.Field()  # list de URLs
     imagen_principal = scrapy.Field()
+    hashes_imagen = scrapy.Field()  # {url: dHash}, lo completa ImagenesPipeline
+    tamanos_imagen = scrapy.Field()  # {url: (ancho, alto)}, ídem
     
     # Metadata
     fecha_scraping = scrapy.Field()
     fecha_publicacion = scrapy.Field()
+    http_etag = scrapy.Field()  # validadores del detalle, para el crawl incremental
+    http_last_modified = scrapy.Field()
@@ -1,13 +1,145 @@
 from scrapy import signals
 from scrapy.http import HtmlResponse
+from scrapy.utils.defer import maybe_deferred_to_future
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from twisted.internet import reactor
+from twisted.internet.defer import DeferredQueue
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
 from webdriver_manager.chrome import ChromeDriverManager
+import json
 import logging
+import time
+
+
+# Esperas de renderizado: se sale apenas la página está lista; los segundos
+# de meta['wait_time'] (y estos) son solo el tope
+INTERVALO_SONDEO = 0.1
+QUIETUD_PAGINA = 0.5     # segundos sin cambios en el DOM ni en la red
+ESPERA_SCROLL = 2        # tope para que aparezcan elementos nuevos tras un scroll
+MAX_SCROLLS = 10         # scrolls como máximo con scroll_multiple
+
+# readyState, nodos del DOM, recursos de red terminados y alto del documento
+_ESTADO_PAGINA = (
+    "return [document.readyState, document.getElementsByTagName('*').length,"
+    " performance.getEntriesByType('resource').length,"
+    " document.body ? document.body.scrollHeight : 0];"
+)
+_CONTAR = "return document.querySelectorAll(arguments[0]).length;"
+_ALTO = "return document.body ? document.body.scrollHeight : 0;"
+
+# Tipos de recurso que se pueden bloquear (SELENIUM_BLOQUEAR_TIPOS), como
+# patrones de URL de Network.setBlockedURLs
+EXTENSIONES_POR_TIPO = {
+    'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico'),
+    'media': ('mp4', 'webm', 'm3u8', 'mp3', 'ogg'),
+    'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+    'stylesheet': ('css',),
+}
+
+
+def _cubre(dominio, otro):
+    """True si `otro` es `dominio` o un subdominio suyo"""
+    return otro == dominio or otro.endswith('.' + dominio)
+
+
+def patrones_bloqueados(tipos, dominios, permitidos=()):
+    """
+    Patrones de URL a bloquear en cada navegador.
+    
+    `dominios` bloquea también sus subdominios. Los de `permitidos` (y sus
+    subdominios) se sacan de la lista de dominios bloqueados; los tipos se
+    bloquean en todos los hosts.
+    """
+    patrones = []
+    for tipo in tipos:
+        extensiones = EXTENSIONES_POR_TIPO.get(tipo)
+        if extensiones is None:
+            logging.getLogger(__name__).warning(f"⚠️  Tipo de recurso desconocido en SELENIUM_BLOQUEAR_TIPOS: {tipo}")
+            continue
+        for extension in extensiones:
+            patrones += [f'*.{extension}', f'*.{extension}?*']
+    for dominio in dominios:
+        if any(_cubre(permitido, dominio) for permitido in permitidos):
+            continue
+        patrones += [f'*://{dominio}/*', f'*://*.{dominio}/*']
+    return patrones
+
+
+def _trafico(driver):
+    """
+    Bytes descargados y recursos bloqueados desde la última lectura, según el
+    log de performance de Chrome (eventos de red del protocolo DevTools).
+    Leer el log lo vacía.
+    """
+    total = bloqueados = 0
+    for entrada in driver.get_log('performance'):
+        mensaje = json.loads(entrada['message'])['message']
+        metodo = mensaje.get('method')
+        if metodo == 'Network.loadingFinished':
+            total += mensaje['params'].get('encodedDataLength', 0)
+        elif metodo == 'Network.loadingFailed' and mensaje['params'].get('blockedReason'):
+            bloqueados += 1
+    return int(total), bloqueados
+
+
+class _PaginaEstable:
+    """
+    Condición de WebDriverWait: documento cargado y sin cambios en el DOM ni
+    en la red (cantidad de recursos terminados) durante `quietud` segundos.
+    """
+    
+    def __init__(self, quietud=QUIETUD_PAGINA):
+        self.quietud = quietud
+        self.ultimo = None
+        self.desde = None
+    
+    def __call__(self, driver):
+        estado = driver.execute_script(_ESTADO_PAGINA)
+        ahora = time.monotonic()
+        if estado != self.ultimo or estado[0] != 'complete':
+            self.ultimo = estado
+            self.desde = ahora
+            return False
+        return ahora - self.desde >= self.quietud
+
+
+def _esperar(driver, condicion, tope):
+    """True si la condición se cumple antes de `tope` segundos"""
+    try:
+        WebDriverWait(driver, tope, poll_frequency=INTERVALO_SONDEO).until(condicion)
+        return True
+    except TimeoutException:
+        return False
+
+
+class _Navegador:
+    """Un Chrome del pool, con su propio estado de sesión"""
+    
+    def __init__(self, numero, driver):
+        self.numero = numero
+        self.driver = driver
+        self.cookies_aceptadas = False
+    
+    def vivo(self):
+        """True si el proceso de Chrome sigue respondiendo"""
+        try:
+            self.driver.current_url
+            return True
+        except Exception:
+            return False
+    
+    def cerrar(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
 
 
 class SeleniumMiddleware:
@@ -22,89 +154,170 @@ class SeleniumMiddleware:
         },
         'SELENIUM_ENABLED': True,
     }
+    
+    Recursos que no hacen falta para el HTML (imágenes, fuentes, analytics,
+    publicidad...) se bloquean con SELENIUM_BLOQUEAR_TIPOS,
+    SELENIUM_BLOQUEAR_DOMINIOS y SELENIUM_PERMITIR_DOMINIOS, que cada spider
+    puede pisar en custom_settings. Los bytes y el tiempo de cada render
+    quedan en las stats del spider (selenium/*).
+    
+    Mantiene un pool de SELENIUM_POOL_SIZE navegadores, cada uno manejado
+    desde un thread propio (Selenium es bloqueante). Los requests esperan un
+    navegador libre en una DeferredQueue, se renderizan fuera del thread del
+    reactor y el navegador vuelve a la cola al terminar. Si un Chrome se cae
+    se reemplaza por uno nuevo.
     """
     
-    def __init__(self):
-        self.driver = None
+    def __init__(self, tamano_pool=1, stats=None):
+        self.tamano_pool = max(1, tamano_pool)
+        self.stats = stats
         self.logger = logging.getLogger(__name__)
-        self._lock = __import__('threading').Lock()  # Lock para sincronizar requests de Selenium
+        self.bloqueados = []
+        self.navegadores = []
+        self.libres = None
+        self.threadpool = None
+        self._iniciando = 0
     
     @classmethod
     def from_crawler(cls, crawler):
-        middleware = cls()
+        middleware = cls(crawler.settings.getint('SELENIUM_POOL_SIZE', 1), crawler.stats)
         crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
         crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
         return middleware
     
     def spider_opened(self, spider):
-        """Inicializar Selenium solo si el spider lo necesita"""
+        """Inicializar el pool solo si el spider lo necesita"""
         selenium_enabled = spider.settings.getbool('SELENIUM_ENABLED', False)
         
         if selenium_enabled:
-            self.logger.info("🚀 Inicializando Selenium para spider: %s", spider.name)
+            self.logger.info("🚀 Inicializando %d navegador(es) Selenium para spider: %s", self.tamano_pool, spider.name)
             
-            chrome_options = Options()
-            
-            # Opciones para modo headless (sin ventana)
-            chrome_options.add_argument('--headless=new')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+            self.bloqueados = patrones_bloqueados(
+                spider.settings.getlist('SELENIUM_BLOQUEAR_TIPOS'),
+                spider.settings.getlist('SELENIUM_BLOQUEAR_DOMINIOS'),
+                spider.settings.getlist('SELENIUM_PERMITIR_DOMINIOS'),
+            )
             
-            # User agent realista
-            chrome_options.add_argument('user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+            self.threadpool = ThreadPool(minthreads=self.tamano_pool, maxthreads=self.tamano_pool, name='selenium')
+            self.threadpool.start()
+            self.libres = DeferredQueue()
             
-            # Deshabilitar imágenes para más velocidad
-            prefs = {
-                'profile.default_content_setting_values': {
-                    'images': 2,  # 2 = no cargar imágenes
-                }
+            # Los Chrome arrancan en paralelo; los requests esperan en la cola
+            # hasta que haya alguno listo
+            for numero in range(self.tamano_pool):
+                self._iniciando += 1
+                d = deferToThreadPool(reactor, self.threadpool, self._crear_navegador, numero)
+                d.addBoth(self._navegador_iniciado)
+    
+    def _navegador_iniciado(self, navegador):
+        self._iniciando -= 1
+        if isinstance(navegador, _Navegador):
+            self.navegadores.append(navegador)
+            self.libres.put(navegador)
+        self._verificar_pool()
+    
+    def _verificar_pool(self):
+        """Sin navegadores vivos ni arrancando: los requests siguen por HTTP normal"""
+        if self.libres is None or self.navegadores or self._iniciando:
+            return
+        self.logger.error("❌ No quedan navegadores Selenium disponibles")
+        self.logger.error("💡 Instala chromedriver: sudo apt install chromium-chromedriver")
+        libres, self.libres = self.libres, None
+        for espera in libres.waiting[:]:
+            espera.callback(None)
+    
+    def _opciones_chrome(self):
+        chrome_options = Options()
+        
+        # Opciones para modo headless (sin ventana)
+        chrome_options.add_argument('--headless=new')
+        chrome_options.add_argument('--no-sandbox')
+        chrome_options.add_argument('--disable-dev-shm-usage')
+        chrome_options.add_argument('--disable-gpu')
+        chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+        
+        # User agent realista
+        chrome_options.add_argument('user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
+        
+        # Deshabilitar imágenes para más velocidad
+        prefs = {
+            'profile.default_content_setting_values': {
+                'images': 2,  # 2 = no cargar imágenes
             }
-            chrome_options.add_experimental_option('prefs', prefs)
-            
-            # Evitar detección de automatización
-            chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-            
+        }
+        chrome_options.add_experimental_option('prefs', prefs)
+        
+        # Evitar detección de automatización
+        chrome_options.add_experimental_option('excludeSwitches', ['enable-automation'])
+        chrome_options.add_experimental_option('useAutomationExtension', False)
+        
+        # Configurar chromium
+        chrome_options.binary_location = '/usr/bin/chromium'
+        
+        # Eventos de red en el log de performance, para medir bytes por página
+        chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        return chrome_options
+    
+    def _crear_navegador(self, numero):
+        """Arranca un Chrome (corre en un thread del pool). Retorna None si falla."""
+        chrome_options = self._opciones_chrome()
+        
+        try:
+            # Intentar diferentes métodos para obtener chromedriver
             try:
-                # Configurar chromium
-                chrome_options.binary_location = '/usr/bin/chromium'
-                
-                # Intentar diferentes métodos para obtener chromedriver
-                try:
-                    # Método 1: Chromedriver del sistema
-                    import shutil
-                    chromedriver_path = shutil.which('chromedriver')
-                    if chromedriver_path:
-                        self.logger.info(f"🔧 Usando chromedriver del sistema: {chromedriver_path}")
-                        service = Service(chromedriver_path)
-                    else:
-                        # Método 2: webdriver-manager
-                        self.logger.info("📥 Descargando chromedriver compatible...")
-                        service = Service(ChromeDriverManager(driver_version="143.0.7499.40").install())
-                    
-                    self.driver = webdriver.Chrome(service=service, options=chrome_options)
-                except Exception as e1:
-                    self.logger.warning(f"⚠️  Intento 1 falló: {e1}")
-                    # Método 3: Sin service (último recurso)
-                    self.logger.info("🔄 Intentando sin service específico...")
-                    self.driver = webdriver.Chrome(options=chrome_options)
+                # Método 1: Chromedriver del sistema
+                import shutil
+                chromedriver_path = shutil.which('chromedriver')
+                if chromedriver_path:
+                    self.logger.info(f"🔧 Usando chromedriver del sistema: {chromedriver_path}")
+                    service = Service(chromedriver_path)
+                else:
+                    # Método 2: webdriver-manager
+                    self.logger.info("📥 Descargando chromedriver compatible...")
+                    service = Service(ChromeDriverManager(driver_version="143.0.7499.40").install())
                 
-                self.driver.set_page_load_timeout(30)
-                self.logger.info("✅ Selenium iniciado correctamente")
-            except Exception as e:
-                self.logger.error(f"❌ Error iniciando Selenium: {e}")
-                self.logger.error("💡 Instala chromedriver: sudo apt install chromium-chromedriver")
-                self.driver = None
+                driver = webdriver.Chrome(service=service, options=chrome_options)
+            except Exception as e1:
+                self.logger.warning(f"⚠️  Intento 1 falló: {e1}")
+                # Método 3: Sin service (último recurso)
+                self.logger.info("🔄 Intentando sin service específico...")
+                driver = webdriver.Chrome(options=chrome_options)
+            
+            driver.set_page_load_timeout(30)
+            
+            # Bloqueo de recursos vía protocolo DevTools
+            if self.bloqueados:
+                driver.execute_cdp_cmd('Network.enable', {})
+                driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': self.bloqueados})
+            self.logger.info(f"✅ Selenium #{numero} iniciado correctamente")
+            return _Navegador(numero, driver)
+        except Exception as e:
+            self.logger.error(f"❌ Error iniciando Selenium #{numero}: {e}")
+            return None
     
     def spider_closed(self, spider):
-        """Cerrar Selenium al terminar el spider"""
-        if self.driver:
-            self.logger.info("🛑 Cerrando Selenium")
-            self.driver.quit()
+        """Cerrar los navegadores al terminar el spider"""
+        paginas = self.stats.get_value('selenium/paginas') if self.stats else None
+        if paginas:
+            self.stats.set_value('selenium/bytes_por_pagina', self.stats.get_value('selenium/bytes') // paginas)
+            self.stats.set_value('selenium/render_ms_por_pagina', self.stats.get_value('selenium/render_ms') // paginas)
+            self.logger.info(
+                "📊 Selenium: %d páginas, %.0f KB y %d ms por página",
+                paginas, self.stats.get_value('selenium/bytes_por_pagina') / 1024,
+                self.stats.get_value('selenium/render_ms_por_pagina'),
+            )
+        
+        if self.navegadores:
+            self.logger.info("🛑 Cerrando %d navegador(es) Selenium", len(self.navegadores))
+        for navegador in self.navegadores:
+            navegador.cerrar()
+        self.navegadores = []
+        self.libres = None
+        if self.threadpool:
+            self.threadpool.stop()
+            self.threadpool = None
     
-    def process_request(self, request, spider):
+    async def process_request(self, request, spider):
         """
         Procesar request con Selenium si tiene el meta 'selenium'
         
@@ -115,80 +328,172 @@ class SeleniumMiddleware:
                 meta={'selenium': True, 'wait_for': '.listing-card'}
             )
         """
-        if not self.driver:
+        # Solo usar Selenium si el request lo solicita
+        if self.libres is None or not request.meta.get('selenium'):
             return None
         
-        # Solo usar Selenium si el request lo solicita
-        if request.meta.get('selenium'):
-            # Usar lock para garantizar que solo un request use Selenium a la vez
-            with self._lock:
-                self.logger.info(f"🌐 Usando Selenium para: {request.url}")
-                
+        return await maybe_deferred_to_future(self._procesar_en_pool(request))
+    
+    def _procesar_en_pool(self, request):
+        """Deferred con la respuesta renderizada por el primer navegador libre"""
+        d = self.libres.get()
+        d.addCallback(self._despachar, request)
+        return d
+    
+    def _despachar(self, navegador, request):
+        if navegador is None:
+            return None  # El pool se quedó sin navegadores
+        
+        d = deferToThreadPool(reactor, self.threadpool, self._renderizar, navegador, request)
+        
+        def devolver(resultado):
+            body, navegador_final, medicion = resultado
+            if navegador_final is not navegador:
+                self._reemplazar(navegador, navegador_final)
+            self._liberar(navegador_final)
+            if medicion:
+                self._registrar(*medicion)
+            if body is None:
+                return None
+            # Crear respuesta de Scrapy con el HTML de Selenium
+            # Usar request.url en vez de current_url para evitar problemas con redirects
+            return HtmlResponse(
+                url=request.url,
+                body=body,
+                encoding='utf-8',
+                request=request
+            )
+        
+        d.addCallback(devolver)
+        return d
+    
+    def _registrar(self, bytes_pagina, segundos, bloqueados):
+        """Stats del render (corre en el thread del reactor)"""
+        if self.stats is None:
+            return
+        milisegundos = int(segundos * 1000)
+        self.stats.inc_value('selenium/paginas')
+        self.stats.inc_value('selenium/bytes', bytes_pagina)
+        self.stats.inc_value('selenium/render_ms', milisegundos)
+        self.stats.inc_value('selenium/recursos_bloqueados', bloqueados)
+        self.stats.max_value('selenium/bytes_max', bytes_pagina)
+        self.stats.max_value('selenium/render_ms_max', milisegundos)
+    
+    def _reemplazar(self, caido, nuevo):
+        """
+        Cambia en la lista un Chrome caído por el que lo reemplazó (o por
+        nada). Corre en el thread del reactor, como todo lo que toca
+        self.navegadores.
+        """
+        self.navegadores = [n for n in self.navegadores if n is not caido]
+        if nuevo is not None and self.libres is not None:
+            self.navegadores.append(nuevo)
+    
+    def _liberar(self, navegador):
+        if navegador is None:
+            # No se pudo reemplazar un navegador caído: el pool queda más chico
+            self._verificar_pool()
+        elif self.libres is not None:
+            self.libres.put(navegador)
+        else:
+            navegador.cerrar()  # El spider ya cerró
+    
+    def _scrollear(self, driver, wait_for, maximo):
+        """
+        Baja hasta el final de la página hasta `maximo` veces. Después de cada
+        scroll espera a que aparezcan elementos `wait_for` nuevos (o a que la
+        página crezca, si no hay selector) y corta en cuanto no aparecen.
+        """
+        if wait_for:
+            def medir(d):
+                return d.execute_script(_CONTAR, wait_for)
+        else:
+            def medir(d):
+                return d.execute_script(_ALTO)
+        
+        anterior = medir(driver)
+        for _ in range(maximo):
+            driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+            if not _esperar(driver, lambda d: medir(d) > anterior, ESPERA_SCROLL):
+                break
+            anterior = medir(driver)
+            _esperar(driver, _PaginaEstable(), ESPERA_SCROLL)
+    
+    def _renderizar(self, navegador, request):
+        """
+        Renderiza la página en un thread del pool.
+        
+        Retorna (body o None, navegador para devolver a la cola, medición).
+        La medición es (bytes, segundos, recursos bloqueados) o None. Si el
+        Chrome murió, lo reemplaza por uno nuevo (o None si no pudo arrancarlo);
+        la lista de navegadores la actualiza `devolver` en el reactor.
+        """
+        driver = navegador.driver
+        self.logger.info(f"🌐 Usando Selenium #{navegador.numero} para: {request.url}")
+        
+        try:
+            # Sin pausa previa: el espaciado entre requests lo dan
+            # DOWNLOAD_DELAY y RANDOMIZE_DOWNLOAD_DELAY
+            
+            # Si es el primer request a clasificado/, aceptar cookies primero
+            if '/clasificado/' in request.url and not navegador.cookies_aceptadas:
+                # Ir a la página principal primero para establecer cookies
+                driver.get('https://www.zonaprop.com.ar/')
+                # Intentar aceptar cookies si aparece el botón
                 try:
-                    # Agregar delay aleatorio antes de navegar (parecer más humano)
-                    import time, random
-                    time.sleep(random.uniform(1, 2))
-                    
-                    # Si es el primer request a clasificado/, aceptar cookies primero
-                    if '/clasificado/' in request.url and not hasattr(self, '_cookies_accepted'):
-                        # Ir a la página principal primero para establecer cookies
-                        self.driver.get('https://www.zonaprop.com.ar/')
-                        time.sleep(2)
-                        # Intentar aceptar cookies si existe el botón
-                        try:
-                            accept_button = self.driver.find_element(By.CSS_SELECTOR, 'button[id*="accept"], button[class*="cookie"]')
-                            accept_button.click()
-                            time.sleep(1)
-                        except:
-                            pass
-                        self._cookies_accepted = True
-                    
-                    self.driver.get(request.url)
-                    
-                    # Esperar a que cargue un elemento específico
-                    wait_for = request.meta.get('wait_for')
-                    if wait_for:
-                        WebDriverWait(self.driver, 10).until(
-                            EC.presence_of_element_located((By.CSS_SELECTOR, wait_for))
-                        )
-                    
-                    # Espera adicional si se especifica
-                    wait_time = request.meta.get('wait_time', 3)  # Aumentado a 3 segundos por defecto
-                    time.sleep(wait_time + random.uniform(0, 1))
-                    
-                    # Scroll para cargar lazy loading (opcional)
-                    if request.meta.get('scroll', False):
-                        # Scroll múltiple para sitios con lazy loading pesado
-                        if request.meta.get('scroll_multiple', False):
-                            for i in range(3):
-                                self.driver.execute_script(f"window.scrollTo(0, document.body.scrollHeight * {(i+1)/3});")
-                                time.sleep(2)
-                        else:
-                            self.driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                            time.sleep(1)
-                    
-                    # Obtener HTML renderizado
-                    body = self.driver.page_source.encode('utf-8')
-                    
-                    # DEBUG: Log what we're actually getting
-                    from scrapy.selector import Selector
-                    sel = Selector(text=body.decode('utf-8'))
-                    h1_texts = sel.css('h1::text').getall()
-                    self.logger.debug(f"📄 Selenium requested: {request.url[:80]}")
-                    self.logger.debug(f"📄 Selenium current URL: {self.driver.current_url[:80]}")
-                    self.logger.debug(f"📄 Selenium response H1s: {h1_texts[:3]}")  # First 3 h1s
-                    
-                    # Crear respuesta de Scrapy con el HTML de Selenium
-                    # Usar request.url en vez de current_url para evitar problemas con redirects
-                    return HtmlResponse(
-                        url=request.url,  # ← Cambiado!
-                        body=body,
-                        encoding='utf-8',
-                        request=request
+                    accept_button = WebDriverWait(driver, 2, poll_frequency=INTERVALO_SONDEO).until(
+                        EC.element_to_be_clickable((By.CSS_SELECTOR, 'button[id*="accept"], button[class*="cookie"]'))
                     )
-                    
-                except Exception as e:
-                    self.logger.error(f"❌ Error en Selenium para {request.url}: {e}")
-                    return None
-        
-        return None
+                    accept_button.click()
+                    _esperar(driver, _PaginaEstable(), 1)
+                except Exception:
+                    pass
+                navegador.cookies_aceptadas = True
+            
+            # Descartar el tráfico anterior (otra página, cookies)
+            self._medir_trafico(driver)
+            inicio = time.monotonic()
+            driver.get(request.url)
+            
+            # Esperar a que cargue un elemento específico
+            wait_for = request.meta.get('wait_for')
+            if wait_for:
+                WebDriverWait(driver, 10).until(
+                    EC.presence_of_element_located((By.CSS_SELECTOR, wait_for))
+                )
+            
+            # Esperar a que el DOM y la red se aquieten (wait_time es el tope)
+            wait_time = request.meta.get('wait_time', 3)
+            if not _esperar(driver, _PaginaEstable(), wait_time):
+                self.logger.debug(f"⏱️  {request.url[:80]} siguió cambiando durante {wait_time}s")
+            
+            # Scroll para cargar lazy loading (opcional)
+            if request.meta.get('scroll', False):
+                # Scroll múltiple para sitios con lazy loading pesado
+                maximo = request.meta.get('max_scrolls', MAX_SCROLLS) if request.meta.get('scroll_multiple', False) else 1
+                self._scrollear(driver, wait_for, maximo)
+            
+            # Obtener HTML renderizado
+            body = driver.page_source.encode('utf-8')
+            segundos = time.monotonic() - inicio
+            bytes_pagina, bloqueados = self._medir_trafico(driver)
+            self.logger.debug(f"📄 Selenium #{navegador.numero} requested: {request.url[:80]}")
+            self.logger.debug(f"📄 Selenium #{navegador.numero} current URL: {driver.current_url[:80]}")
+            return body, navegador, (bytes_pagina, segundos, bloqueados)
+            
+        except Exception as e:
+            self.logger.error(f"❌ Error en Selenium #{navegador.numero} para {request.url}: {e}")
+            if navegador.vivo():
+                return None, navegador, None
+            
+            # Chrome caído: reemplazarlo en este mismo thread
+            self.logger.warning(f"♻️  Selenium #{navegador.numero} no responde, reiniciándolo")
+            navegador.cerrar()
+            return None, self._crear_navegador(navegador.numero), None
+    
+    def _medir_trafico(self, driver):
+        try:
+            return _trafico(driver)
+        except Exception as e:
+            self.logger.debug(f"Sin log de performance: {e}")
+            return 0, 0
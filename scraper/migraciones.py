@@ -0,0 +1,138 @@
+"""
+Migraciones versionadas del esquema (scraper/modelos.py).
+
+`esquema_version` guarda la última migración aplicada. `migrar(engine)` corre
+las pendientes en orden, cada una en su transacción junto con el cambio de
+versión; el scraper y la API la llaman al arrancar, antes de crear los índices
+que mantiene la base (búsqueda, geo, historial, duplicados).
+
+Para cambiar el esquema: modificar el modelo y agregar al final de
+MIGRACIONES una función que lleve las bases existentes al mismo estado. Una
+base nueva también corre todas, así que las migraciones tienen que tolerar
+que el cambio ya esté (los helpers de acá lo hacen).
+"""
+import sqlite3
+
+from sqlalchemy import MetaData, Table, Column, Integer, inspect, select, update, insert
+
+from scraper.imagenes import lista_imagenes
+from scraper.modelos import Base, Propiedad, PropiedadImagen
+
+
+esquema_version = Table(
+    'esquema_version', MetaData(),
+    Column('id', Integer, primary_key=True),
+    Column('version', Integer, nullable=False),
+)
+
+
+def agregar_columnas(conn, tabla, nombres=None):
+    """ALTER TABLE ADD COLUMN de las columnas del modelo (o solo `nombres`) que falten"""
+    existentes = {c['name'] for c in inspect(conn).get_columns(tabla.name)}
+    for columna in tabla.columns:
+        if columna.name in existentes or (nombres and columna.name not in nombres):
+            continue
+        tipo = columna.type.compile(dialect=conn.dialect)
+        conn.exec_driver_sql(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}")
+
+
+def crear_indices(conn, tabla, nombres=None):
+    """Los índices del modelo (o solo `nombres`) que falten"""
+    for indice in tabla.indexes:
+        if not nombres or indice.name in nombres:
+            indice.create(conn, checkfirst=True)
+
+
+def _columnas(conn, tabla):
+    return {c['name'] for c in inspect(conn).get_columns(tabla)}
+
+
+def _v1_modelo(conn):
+    """
+    Tablas del modelo y las columnas e índices que les faltan a las bases
+    creadas por versiones anteriores (que solo corrían create_all)
+    """
+    existia = inspect(conn).has_table(PropiedadImagen.__tablename__)
+    Base.metadata.create_all(conn)
+    agregar_columnas(conn, Propiedad.__table__)
+    crear_indices(conn, Propiedad.__table__)
+    # Las fotos estaban en la columna `imagenes`, URLs separadas por coma
+    if not existia and 'imagenes' in _columnas(conn, 'propiedades'):
+        filas = []
+        for id_, imagenes in conn.exec_driver_sql(
+            "SELECT id, imagenes FROM propiedades WHERE imagenes IS NOT NULL AND imagenes != ''"
+        ):
+            filas.extend({'propiedad_id': id_, 'posicion': posicion, 'url': url}
+                         for posicion, url in enumerate(lista_imagenes(imagenes)))
+            if len(filas) >= 10000:
+                conn.execute(insert(PropiedadImagen), filas)
+                filas = []
+        if filas:
+            conn.execute(insert(PropiedadImagen), filas)
+
+
+def _v2_sin_columna_imagenes(conn):
+    """La columna `imagenes` quedó sin uso desde propiedad_imagen"""
+    if 'imagenes' not in _columnas(conn, 'propiedades'):
+        return
+    # SQLite borra columnas desde 3.35; antes queda sin uso
+    if conn.dialect.name == 'sqlite' and sqlite3.sqlite_version_info < (3, 35):
+        return
+    conn.exec_driver_sql("ALTER TABLE propiedades DROP COLUMN imagenes")
+
+
+def _v3_indices_activas(conn):
+    """Índices parciales sobre activa para los agregados de /barrios, /fuentes y /stats"""
+    crear_indices(conn, Propiedad.__table__, {'ix_propiedades_activas_barrio', 'ix_propiedades_activas_fuente_precio'})
+
+
+def _v4_generacion_filas(conn):
+    """Generación de la última escritura de cada fila (NULL en las anteriores)"""
+    agregar_columnas(conn, Propiedad.__table__, {'generacion'})
+    crear_indices(conn, Propiedad.__table__, {'ix_propiedades_generacion'})
+
+
+# (versión, descripción, función): en orden, sin huecos, nunca modificar una ya publicada
+MIGRACIONES = [
+    (1, 'tablas del modelo, columnas e índices faltantes, fotos a propiedad_imagen', _v1_modelo),
+    (2, 'borrar la columna propiedades.imagenes', _v2_sin_columna_imagenes),
+    (3, 'índices parciales sobre propiedades activas', _v3_indices_activas),
+    (4, 'columna propiedades.generacion', _v4_generacion_filas),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def leer_version(conn):
+    return conn.execute(select(esquema_version.c.version).where(esquema_version.c.id == 1)).scalar() or 0
+
+
+def migrar(engine, logger=None):
+    """
+    Aplica las migraciones pendientes y retorna la versión final.
+
+    Cada una toma el lock de escritura antes de leer la versión (UPDATE de la
+    fila de esquema_version), así el scraper y la API arrancando a la vez no
+    aplican la misma migración dos veces.
+    """
+    with engine.begin() as conn:
+        esquema_version.create(conn, checkfirst=True)
+        version = leer_version(conn)
+        if conn.execute(select(esquema_version.c.id)).first() is None:
+            conn.execute(insert(esquema_version).values(id=1, version=0))
+    if version >= VERSION_ACTUAL:
+        return version
+
+    for numero, descripcion, funcion in MIGRACIONES:
+        with engine.begin() as conn:
+            conn.execute(update(esquema_version).where(esquema_version.c.id == 1)
+                         .values(version=esquema_version.c.version))
+            version = leer_version(conn)
+            if numero <= version:
+                continue
+            if logger:
+                logger.info(f"🗄️ Migración {numero}: {descripcion}")
+            funcion(conn)
+            conn.execute(update(esquema_version).where(esquema_version.c.id == 1).values(version=numero))
+            version = numero
+    return version
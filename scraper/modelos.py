@@ -0,0 +1,116 @@
+"""
+Modelo de la base, compartido por el scraper y la API.
+
+Es la única definición de `propiedades` y `propiedad_imagen`: el
+DatabasePipeline y los endpoints importan estas clases (api/models.py las
+re-exporta junto a los schemas de respuesta). Los cambios de esquema llegan
+a las bases existentes con una migración en scraper/migraciones.py.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, SmallInteger, String, Float, Boolean, DateTime, Text, Index, text
+from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.orm import relationship, foreign
+
+Base = declarative_base()
+
+
+def _solo_activas(nombre, *columnas):
+    """Índice parcial sobre las propiedades activas (las únicas que consulta la API)"""
+    return Index(nombre, *columnas, sqlite_where=text('activa = 1'), postgresql_where=text('activa'))
+
+
+class PropiedadImagen(Base):
+    """Foto de una propiedad, una fila por posición (0 es la principal)"""
+    __tablename__ = 'propiedad_imagen'
+
+    propiedad_id = Column(Integer, primary_key=True)
+    posicion = Column(SmallInteger, primary_key=True)
+    url = Column(String(1000), nullable=False)
+    ancho = Column(Integer)
+    alto = Column(Integer)
+
+    __table_args__ = {'sqlite_with_rowid': False}
+
+
+class Propiedad(Base):
+    """Modelo de base de datos para propiedades"""
+    __tablename__ = 'propiedades'
+
+    id = Column(Integer, primary_key=True)
+
+    # Identificación
+    fuente = Column(String(50), nullable=False, index=True)
+    url = Column(String(500), unique=True, nullable=False)
+    id_externo = Column(String(100))
+
+    # Básicos
+    titulo = Column(String(500))
+    descripcion = Column(Text)
+    tipo = Column(String(50))
+    operacion = Column(String(50))
+
+    # Ubicación
+    provincia = Column(String(100))
+    ciudad = Column(String(100), index=True)
+    barrio = Column(String(100), index=True)
+    direccion = Column(String(500))
+    latitud = Column(Float)
+    longitud = Column(Float)
+    mapa_url = Column(String(1000))
+
+    # Características
+    precio = Column(Float, index=True)
+    moneda = Column(String(10))
+    expensas = Column(Float)
+
+    ambientes = Column(Integer, index=True)
+    dormitorios = Column(Integer)
+    banos = Column(Integer)
+    cocheras = Column(Integer)
+
+    superficie_total = Column(Float, index=True)
+    superficie_cubierta = Column(Float)
+
+    # Extras
+    mascotas = Column(Boolean, default=False, index=True)
+    amoblado = Column(Boolean, default=False)
+    patio = Column(Boolean, default=False, index=True)
+
+    # Imagenes: la principal para los listados; todas, en orden, para el detalle.
+    # lazy='raise': cargarlas siempre explícitamente (selectinload)
+    imagen_principal = Column(String(500))
+    imagenes = relationship(
+        PropiedadImagen,
+        primaryjoin=lambda: Propiedad.id == foreign(PropiedadImagen.propiedad_id),
+        order_by=PropiedadImagen.posicion,
+        lazy='raise',
+        viewonly=True,
+    )
+
+    # Metadata
+    fecha_scraping = Column(DateTime, default=datetime.utcnow)
+    fecha_publicacion = Column(DateTime)
+    activa = Column(Boolean, default=True)
+
+    # Crawl incremental: hash del contenido y validadores HTTP del detalle
+    huella = Column(String(32))
+    http_etag = Column(String(200))
+    http_last_modified = Column(String(100))
+
+    # Generación de la última escritura (scraper/generacion.py): la grilla del
+    # mapa relee solo lo escrito después de la generación que ya tiene
+    generacion = Column(Integer, index=True)
+
+    # Deduplicación entre fuentes: el menor id de las publicaciones de la misma propiedad
+    grupo_id = Column(Integer, index=True)
+
+    __table_args__ = (
+        # Paginación keyset: uno por cada opción de `ordenar`
+        Index('ix_propiedades_activa_precio_id', 'activa', 'precio', 'id'),
+        Index('ix_propiedades_activa_superficie_id', 'activa', 'superficie_total', 'id'),
+        Index('ix_propiedades_activa_fecha_id', 'activa', 'fecha_scraping', 'id'),
+        # /barrios, /fuentes, /stats y facetas: cubren el GROUP BY sin leer la tabla
+        _solo_activas('ix_propiedades_activas_barrio', 'barrio'),
+        _solo_activas('ix_propiedades_activas_fuente_precio', 'fuente', 'precio'),
+    )
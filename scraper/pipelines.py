@@ -1,246 +1,448 @@
 import re
+import time
+import logging
+from collections.abc import MutableMapping
 from datetime import datetime
 from itemadapter import ItemAdapter
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import MetaData, Table, Column, String, select, update, bindparam
 
-Base = declarative_base()
+from scraper.busqueda import crear_indice_busqueda
+from scraper.conexion import crear_engine
+from scraper.duplicados import crear_indice_duplicados, agrupar
+from scraper.generacion import crear_tabla_generacion, incrementar_generacion
+from scraper.geo import crear_indice_geo
+from scraper.historial import crear_historial
+from scraper.imagenes import crear_tabla_hashes, guardar_hashes, guardar_imagenes, lista_imagenes
+from scraper.incremental import RegistroIncremental, huella
+from scraper.migraciones import migrar
+from scraper.modelos import Propiedad
 
 
-class Propiedad(Base):
-    """Modelo de base de datos para propiedades"""
-    __tablename__ = 'propiedades'
-    
-    id = Column(Integer, primary_key=True)
-    
-    # Identificación
-    fuente = Column(String(50), nullable=False, index=True)
-    url = Column(String(500), unique=True, nullable=False)
-    id_externo = Column(String(100))
-    
-    # Básicos
-    titulo = Column(String(500))
-    descripcion = Column(Text)
-    tipo = Column(String(50))
-    operacion = Column(String(50))
-    
-    # Ubicación
-    provincia = Column(String(100))
-    ciudad = Column(String(100), index=True)
-    barrio = Column(String(100), index=True)
-    direccion = Column(String(500))
-    
-    # Características
-    precio = Column(Float, index=True)
-    moneda = Column(String(10))
-    expensas = Column(Float)
-    
-    ambientes = Column(Integer, index=True)
-    dormitorios = Column(Integer)
-    banos = Column(Integer)
-    cocheras = Column(Integer)
-    
-    superficie_total = Column(Float, index=True)
-    superficie_cubierta = Column(Float)
-    
-    # Extras
-    mascotas = Column(Boolean, default=False, index=True)
-    amoblado = Column(Boolean, default=False)
-    patio = Column(Boolean, default=False, index=True)
-    
-    # Imagenes
-    imagenes = Column(Text)  # JSON array as string
-    imagen_principal = Column(String(500))
-    
-    # Metadata
-    fecha_scraping = Column(DateTime, default=datetime.utcnow)
-    fecha_publicacion = Column(DateTime)
-    activa = Column(Boolean, default=True)
+COLUMNAS_PROPIEDAD = {c.name for c in Propiedad.__table__.columns} - {'id'}
+
+
+# Normalización declarativa: campo -> tipo. Se compila una sola vez en
+# NormalizacionPipeline; agregar un campo es agregar una línea acá.
+CAMPOS_NORMALIZACION = {
+    'precio': 'precio',
+    'superficie_total': 'superficie',
+    'superficie_cubierta': 'superficie',
+    'ambientes': 'entero',
+    'dormitorios': 'entero',
+    'banos': 'entero',
+    'cocheras': 'entero',
+    'mascotas': 'bool',
+    'amoblado': 'bool',
+    'patio': 'bool',
+    'titulo': 'texto',
+    'descripcion': 'texto',
+    'barrio': 'texto',
+    'direccion': 'texto',
+}
+
+DEFAULTS_NORMALIZACION = {
+    'provincia': 'Santa Fe',
+    'ciudad': 'Rosario',
+    'moneda': 'ARS',
+    'operacion': 'Alquiler',
+    'tipo': 'Departamento',
+}
+
+_NO_NUMERICO = re.compile(r'[^\d,.]')
+_DECIMAL = re.compile(r'\d+(?:[.,]\d+)?')
+_ENTERO = re.compile(r'\d+')
+# Formato argentino: '.' separa miles y ',' decimales
+_SEPARADORES = str.maketrans({'.': None, ',': '.'})
+_VERDADEROS = frozenset(['true', 'si', 'sí', '1', 'yes', 'permitido', 'acepta'])
+
+
+def _normalizar_precio(precio):
+    """Extrae el número del precio"""
+    if isinstance(precio, (int, float)):
+        return float(precio)
+    try:
+        return float(_NO_NUMERICO.sub('', str(precio)).translate(_SEPARADORES))
+    except ValueError:
+        return None
+
+
+def _normalizar_superficie(superficie):
+    """Extrae m² como float"""
+    if isinstance(superficie, (int, float)):
+        return float(superficie)
+    match = _DECIMAL.search(str(superficie))
+    return float(match.group().replace(',', '.')) if match else None
+
+
+def _normalizar_entero(valor):
+    """Extrae entero"""
+    if isinstance(valor, int):
+        return valor
+    match = _ENTERO.search(str(valor))
+    return int(match.group()) if match else None
+
+
+def _normalizar_bool(valor):
+    """Normaliza a booleano"""
+    if isinstance(valor, bool):
+        return valor
+    return str(valor).lower() in _VERDADEROS
+
+
+def _limpiar_texto(texto):
+    """Limpia espacios y caracteres extraños"""
+    if not texto:
+        return None
+    return ' '.join(str(texto).split()) or None
+
+
+# tipo -> (función, aplicar aunque el valor sea vacío)
+# Los booleanos se normalizan siempre que el campo esté: None pasa a False
+_NORMALIZADORES = {
+    'precio': (_normalizar_precio, False),
+    'superficie': (_normalizar_superficie, False),
+    'entero': (_normalizar_entero, False),
+    'bool': (_normalizar_bool, True),
+    'texto': (_limpiar_texto, False),
+}
+
+
+def _como_mapping(item):
+    """dict y scrapy.Item ya son mappings: ItemAdapter solo para dataclasses/attrs"""
+    return item if isinstance(item, MutableMapping) else ItemAdapter(item)
 
 
 class NormalizacionPipeline:
-    """Pipeline para normalizar datos"""
+    """
+    Pipeline para normalizar datos.
     
-    def process_item(self, item, spider):
-        adapter = ItemAdapter(item)
-        
-        # Normalizar precio
-        if adapter.get('precio'):
-            adapter['precio'] = self._normalizar_precio(adapter['precio'])
-        
-        # Normalizar superficie
-        for campo in ['superficie_total', 'superficie_cubierta']:
-            if adapter.get(campo):
-                adapter[campo] = self._normalizar_superficie(adapter[campo])
-        
-        # Normalizar números enteros
-        for campo in ['ambientes', 'dormitorios', 'banos', 'cocheras']:
-            if adapter.get(campo):
-                adapter[campo] = self._normalizar_entero(adapter[campo])
-        
-        # Normalizar booleanos
-        for campo in ['mascotas', 'amoblado', 'patio']:
-            if campo in adapter:
-                adapter[campo] = self._normalizar_bool(adapter[campo])
-        
-        # Limpiar texto
-        for campo in ['titulo', 'descripcion', 'barrio', 'direccion']:
-            if adapter.get(campo):
-                adapter[campo] = self._limpiar_texto(adapter[campo])
-        
-        # Fecha de scraping
-        adapter['fecha_scraping'] = datetime.now()
-        
-        # Defaults
-        adapter.setdefault('provincia', 'Santa Fe')
-        adapter.setdefault('ciudad', 'Rosario')
-        adapter.setdefault('moneda', 'ARS')
-        adapter.setdefault('operacion', 'Alquiler')
-        adapter.setdefault('tipo', 'Departamento')
-        
-        return item
+    Las reglas salen de CAMPOS_NORMALIZACION y DEFAULTS_NORMALIZACION,
+    compiladas una vez a una lista de (campo, función) con los regex ya
+    compilados.
+    """
     
-    def _normalizar_precio(self, precio):
-        """Extrae el número del precio"""
-        if isinstance(precio, (int, float)):
-            return float(precio)
-        
-        # Remover símbolos y texto
-        precio_str = str(precio).replace('$', '').replace('U$S', '').replace('USD', '')
-        precio_str = re.sub(r'[^\d,.]', '', precio_str)
-        precio_str = precio_str.replace('.', '').replace(',', '.')
-        
-        try:
-            return float(precio_str)
-        except (ValueError, AttributeError):
-            return None
-    
-    def _normalizar_superficie(self, superficie):
-        """Extrae m² como float"""
-        if isinstance(superficie, (int, float)):
-            return float(superficie)
-        
-        match = re.search(r'(\d+(?:[.,]\d+)?)', str(superficie))
-        if match:
-            return float(match.group(1).replace(',', '.'))
-        return None
+    def __init__(self, campos=None, defaults=None):
+        campos = CAMPOS_NORMALIZACION if campos is None else campos
+        self.reglas = [(campo,) + _NORMALIZADORES[tipo] for campo, tipo in campos.items()]
+        self.defaults = list((DEFAULTS_NORMALIZACION if defaults is None else defaults).items())
     
-    def _normalizar_entero(self, valor):
-        """Extrae entero"""
-        if isinstance(valor, int):
-            return valor
-        
-        match = re.search(r'(\d+)', str(valor))
-        if match:
-            return int(match.group(1))
-        return None
+    def process_item(self, item, spider):
+        self._normalizar(_como_mapping(item), datetime.now())
+        return item
     
-    def _normalizar_bool(self, valor):
-        """Normaliza a booleano"""
-        if isinstance(valor, bool):
-            return valor
+    def _normalizar(self, adapter, fecha_scraping):
+        for campo, funcion, siempre in self.reglas:
+            if siempre:
+                if campo in adapter:
+                    adapter[campo] = funcion(adapter[campo])
+            else:
+                valor = adapter.get(campo)
+                if valor:
+                    adapter[campo] = funcion(valor)
         
-        valor_str = str(valor).lower()
-        return valor_str in ['true', 'si', 'sí', '1', 'yes', 'permitido', 'acepta']
-    
-    def _limpiar_texto(self, texto):
-        """Limpia espacios y caracteres extraños"""
-        if not texto:
-            return None
+        adapter['fecha_scraping'] = fecha_scraping
         
-        texto = str(texto).strip()
-        texto = re.sub(r'\s+', ' ', texto)
-        return texto if texto else None
+        for campo, valor in self.defaults:
+            if campo not in adapter:
+                adapter[campo] = valor
 
 
 class DatabasePipeline:
-    """Pipeline para guardar en base de datos"""
+    """
+    Pipeline para guardar en base de datos.
+    
+    Los items se acumulan en un buffer y se escriben en lotes con un único
+    INSERT ... ON CONFLICT(url) DO UPDATE por transacción. El lote se vacía al
+    llegar a DATABASE_BATCH_SIZE items, cuando el más viejo supera
+    DATABASE_BATCH_TIMEOUT_MS, y siempre en close_spider. Todo pasa por una
+    única conexión de escritura (scraper/conexion.py).
     
-    def __init__(self, database_url):
+    Cada fila guarda la huella de su contenido; al cerrar se informan las
+    nuevas / cambiadas / sin cambios / removidas de la corrida. Con
+    INCREMENTAL = True las que no cambiaron no se vuelven a escribir.
+    """
+    
+    def __init__(self, database_url, batch_size=200, batch_timeout_ms=1000, incremental=False, stats=None,
+                 cache_http=False, sqlite_pragmas=True):
         self.database_url = database_url
+        self.sqlite_pragmas = sqlite_pragmas
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout_ms / 1000.0
+        self.incremental = incremental
+        self.stats = stats
+        self.cache_http = cache_http
+        self.registro = None
         self.engine = None
-        self.Session: sessionmaker = None  # type: ignore
+        self.deduplicar = False
+        self.buffer = []
+        self.imagenes = {}  # url -> [(imagen, ancho, alto)] de los items en el buffer
+        self.hashes_imagen = {}  # url -> {imagen: hash} de los items en el buffer
+        self.validadores = {}  # url -> validadores HTTP nuevos de items sin cambios
+        self.estados = {}  # url -> estado incremental de los items en el buffer (se cuentan al guardarse)
+        self._buffer_desde = None
+        self._timer = None
+        self._spider = None
     
     @classmethod
     def from_crawler(cls, crawler):
         database_url = crawler.settings.get('DATABASE_URL', 'sqlite:///propiedades.db')
-        return cls(database_url)
+        return cls(
+            database_url,
+            batch_size=crawler.settings.getint('DATABASE_BATCH_SIZE', 200),
+            batch_timeout_ms=crawler.settings.getint('DATABASE_BATCH_TIMEOUT_MS', 1000),
+            incremental=crawler.settings.getbool('INCREMENTAL', False),
+            stats=crawler.stats,
+            cache_http=crawler.settings.getbool('HTTPCACHE_ENABLED'),
+            sqlite_pragmas=crawler.settings.getbool('SQLITE_PRAGMAS', True),
+        )
+    
+    @staticmethod
+    def _fuente(spider):
+        return spider.name.split('_')[0] # Obtener nombre base (ej: zonaprop)
     
     def open_spider(self, spider):
-        self.engine = create_engine(self.database_url)
-        Base.metadata.create_all(self.engine)
-        self.Session = sessionmaker(bind=self.engine)
-        self.items_vistos = [] # Guardaremos las URLs vistas en esta sesión
+        # Una sola conexión de escritura, con WAL y BEGIN IMMEDIATE en SQLite (scraper/conexion.py)
+        self.engine = crear_engine(self.database_url, escritor=True, pragmas=self.sqlite_pragmas)
+        # Tablas, columnas e índices del modelo compartido (scraper/modelos.py), por migraciones
+        migrar(self.engine, spider.logger)
+        # Índice de texto completo para /buscar (se mantiene solo vía triggers / columna generada)
+        if not crear_indice_busqueda(self.engine):
+            spider.logger.warning("⚠️ Motor sin soporte de búsqueda de texto completo (FTS5/tsvector)")
+        # Índice espacial (R*Tree / PostGIS), también mantenido por la base
+        if not crear_indice_geo(self.engine):
+            spider.logger.warning("⚠️ Motor sin soporte de índice espacial (R*Tree/PostGIS)")
+        crear_tabla_generacion(self.engine)
+        # Historial de precios y demás campos: lo escriben triggers dentro del mismo upsert
+        if not crear_historial(self.engine):
+            spider.logger.warning("⚠️ Motor sin soporte de historial de cambios (triggers)")
+        # Hashes perceptuales de las fotos (los calcula ImagenesPipeline si está activo)
+        crear_tabla_hashes(self.engine)
+        # Grupos de la misma propiedad publicada en varias fuentes, por lote
+        self.deduplicar = crear_indice_duplicados(self.engine)
+        if not self.deduplicar:
+            spider.logger.warning("⚠️ No se pudo crear el índice de duplicados: grupo_id queda sin actualizar")
+        
+        # Huellas de lo que ya hay de esta fuente; el spider lo usa para
+        # pedir los detalles con GET condicional (spider.incremental)
+        self.registro = RegistroIncremental(self.incremental)
+        with self.engine.connect() as conn:
+            self.registro.cargar(conn, Propiedad.__table__, self._fuente(spider))
+        spider.incremental = self.registro
+        if self.incremental and self.cache_http:
+            spider.logger.warning("⚠️ INCREMENTAL con HTTPCACHE_ENABLED: los listados pueden salir del caché (usar -s HTTPCACHE_ENABLED=0)")
+        self.items_vistos = self.registro.vistas # URLs vistas en esta sesión (sin repetidos)
+        self._spider = spider
+        
+        # Vaciar el buffer por tiempo aunque no lleguen más items
+        from twisted.internet import task
+        self._timer = task.LoopingCall(self._flush_si_vencido)
+        self._timer.start(self.batch_timeout, now=False)
     
     def close_spider(self, spider):
         if not self.engine:
             return
+        
+        if self._timer and self._timer.running:
+            self._timer.stop()
+        self.flush()
 
         # LOGICA DE DESACTIVACIÓN: 
         # Al terminar el spider, marcamos como inactivas las casas de ESTA FUENTE 
         # que no hayamos visto en este proceso.
-        session = self.Session()
         try:
-            fuente = spider.name.split('_')[0] # Obtener nombre base (ej: zonaprop)
+            fuente = self._fuente(spider)
             
             if self.items_vistos:
-                filas_afectadas = session.query(Propiedad).filter(
-                    Propiedad.fuente.ilike(f"%{fuente}%"),
-                    Propiedad.activa == True,
-                    ~Propiedad.url.in_(self.items_vistos)
-                ).update({"activa": False}, synchronize_session=False)
-                
-                session.commit()
+                with self.engine.begin() as conn:
+                    filas_afectadas = self._desactivar_no_vistas(conn, fuente, incrementar_generacion(conn))
+                self.registro.conteos['removidas'] = filas_afectadas
                 spider.logger.info(f"🔴 Se marcaron {filas_afectadas} propiedades de {fuente} como inactivas (alquiladas/borradas).")
         except Exception as e:
             spider.logger.error(f"Error desactivando items antiguos: {e}")
-            session.rollback()
         finally:
-            session.close()
             self.engine.dispose()
+        
+        spider.logger.info(f"📊 Corrida {'incremental' if self.incremental else 'completa'} de {self._fuente(spider)}: {self.registro.resumen()}")
+        if self.stats is not None:
+            for estado, cantidad in self.registro.conteos.items():
+                self.stats.set_value(f'incremental/{estado}', cantidad)
+    
+    def _desactivar_no_vistas(self, conn, fuente, generacion):
+        """
+        Marca inactivas (en `generacion`) las propiedades de `fuente` cuya URL
+        no está en items_vistos.
+        
+        Las URLs se cargan en una tabla temporal y la desactivación es un anti-join,
+        así no se arma un NOT IN gigante (que además choca con el límite de
+        variables de SQLite).
+        """
+        urls_vistas = Table(
+            'urls_vistas', MetaData(),
+            Column('url', String(500), primary_key=True),
+            prefixes=['TEMPORARY'],
+        )
+        # La tabla temporal vive en la conexión del pool: limpiar restos de un cierre fallido
+        urls_vistas.drop(conn, checkfirst=True)
+        urls_vistas.create(conn)
+        # Insertar ordenado evita reacomodar el índice de la clave primaria
+        urls = sorted(self.items_vistos)
+        # executemany directo al driver: el insert de Core procesa cada fila y es ~5x más lento
+        marcador = '?' if conn.dialect.paramstyle == 'qmark' else '%s'
+        for i in range(0, len(urls), 10000):
+            conn.exec_driver_sql(
+                f"INSERT INTO urls_vistas (url) VALUES ({marcador})",
+                [(u,) for u in urls[i:i + 10000]],
+            )
+        
+        vista = select(urls_vistas.c.url).where(urls_vistas.c.url == Propiedad.url).exists()
+        resultado = conn.execute(
+            update(Propiedad.__table__)
+            .where(
+                Propiedad.fuente.ilike(f"%{fuente}%"),
+                Propiedad.activa == True,
+                ~vista,
+            )
+            .values(activa=False, generacion=generacion)
+        )
+        urls_vistas.drop(conn)
+        return resultado.rowcount
     
     def process_item(self, item, spider):
-        session = self.Session()
+        adapter = ItemAdapter(item)
+        if not adapter.get('url'):
+            spider.logger.warning(f"⚠️ Item sin URL descartado: {adapter.get('titulo')!r}")
+            return item
+        
+        fila = {key: value for key, value in adapter.items() if key in COLUMNAS_PROPIEDAD}
+        # Asegurarnos de que vuelva a estar activa si reaparece
+        fila['activa'] = True
+        # Las fotos van a propiedad_imagen, pero cuentan para la huella
+        # (unidas por coma, como cuando se guardaban en la columna)
+        imagenes = lista_imagenes(adapter.get('imagenes')) if 'imagenes' in adapter else None
+        fila['huella'] = huella(dict(fila, imagenes=','.join(imagenes)) if imagenes else fila)
+        
+        # Nueva, cambiada o igual; cuenta como vista recién cuando se guarda
+        estado = self.registro.clasificar(fila['url'], fila['huella'])
+        if self.incremental and estado == 'sin_cambios':
+            # Ya está en la base: no se reescribe, salvo ETag/Last-Modified si el servidor los rotó
+            self.registro.marcar_vista(fila['url'], estado)
+            validadores = self.registro.validadores_cambiados(fila['url'], fila)
+            if validadores is None:
+                return item
+            self._al_buffer()
+            self.validadores[fila['url']] = validadores
+        else:
+            self._al_buffer()
+            self.buffer.append(fila)
+            self.estados.setdefault(fila['url'], estado)
+            if imagenes is not None:
+                tamanos = adapter.get('tamanos_imagen') or {}
+                self.imagenes[fila['url']] = [(url, *tamanos.get(url, (None, None))) for url in imagenes]
+            if adapter.get('hashes_imagen'):
+                self.hashes_imagen[fila['url']] = adapter['hashes_imagen']
+        
+        if len(self.buffer) + len(self.validadores) >= self.batch_size:
+            self.flush()
+        
+        return item
+    
+    def _al_buffer(self):
+        if not self.buffer and not self.validadores:
+            self._buffer_desde = time.monotonic()
+    
+    def _flush_si_vencido(self):
+        if (self.buffer or self.validadores) and time.monotonic() - self._buffer_desde >= self.batch_timeout:
+            self.flush()
+    
+    def flush(self):
+        """Escribe el buffer en una transacción; si falla, reintenta fila por fila (antes, los validadores pendientes)"""
+        if self.validadores:
+            self._guardar_validadores()
+        if not self.buffer:
+            return
+        
+        filas, self.buffer = self.buffer, []
+        estados, self.estados = self.estados, {}
+        imagenes, self.imagenes = self.imagenes, {}
+        hashes, self.hashes_imagen = self.hashes_imagen, {}
+        logger = self._spider.logger if self._spider else logging.getLogger(__name__)
         
         try:
-            adapter = ItemAdapter(item)
-            
-            # Buscar si existe
-            propiedad = session.query(Propiedad).filter_by(
-                url=adapter['url']
-            ).first()
-            
-            if propiedad:
-                # Actualizar
-                for key, value in adapter.items():
-                    if key == 'imagenes' and isinstance(value, list):
-                        value = ','.join(value)
-                    setattr(propiedad, key, value)
-                
-                # Asegurarnos de que vuelva a estar activa si reaparece
-                propiedad.activa = True
-                spider.logger.info(f"Actualizado: {adapter['url']}")
-            else:
-                # Crear nuevo
-                data = dict(adapter)
-                if isinstance(data.get('imagenes'), list):
-                    data['imagenes'] = ','.join(data['imagenes'])
-                
-                propiedad = Propiedad(**data)
-                session.add(propiedad)
-                spider.logger.info(f"Nuevo: {adapter['url']}")
-            
-            # Registrar URL vista
-            self.items_vistos.append(adapter['url'])
-            session.commit()
-            
+            with self.engine.begin() as conn:
+                self._upsert(conn, filas, incrementar_generacion(conn))
+                guardar_imagenes(conn, Propiedad.__table__, imagenes)
+                guardar_hashes(conn, Propiedad.__table__, hashes)
+                agrupadas = self._agrupar(conn, filas)
+            for url, estado in estados.items():
+                self.registro.marcar_vista(url, estado)
+            logger.info(f"💾 Lote guardado: {len(filas)} propiedades" + (f" ({agrupadas} duplicadas en otras fuentes)" if agrupadas else ""))
+        except Exception as e:
+            logger.warning(f"⚠️ Lote de {len(filas)} falló ({e}), reintentando fila por fila")
+            guardadas = 0
+            for fila in filas:
+                try:
+                    with self.engine.begin() as conn:
+                        self._upsert(conn, [fila], incrementar_generacion(conn))
+                        if fila['url'] in imagenes:
+                            guardar_imagenes(conn, Propiedad.__table__, {fila['url']: imagenes[fila['url']]})
+                        if fila['url'] in hashes:
+                            guardar_hashes(conn, Propiedad.__table__, {fila['url']: hashes[fila['url']]})
+                        self._agrupar(conn, [fila])
+                    self.registro.marcar_vista(fila['url'], estados[fila['url']])
+                    guardadas += 1
+                except Exception as e_fila:
+                    logger.error(f"Error guardando item {fila.get('url')}: {e_fila}")
+            logger.info(f"💾 Lote guardado: {guardadas}/{len(filas)} propiedades")
+    
+    def _guardar_validadores(self):
+        """UPDATE por lotes de http_etag/http_last_modified de las URLs sin cambios"""
+        validadores, self.validadores = self.validadores, {}
+        propiedades = Propiedad.__table__
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(
+                    update(propiedades).where(propiedades.c.url == bindparam('url_'))
+                    .values(http_etag=bindparam('etag'), http_last_modified=bindparam('modificado')),
+                    [{'url_': url, 'etag': v['http_etag'], 'modificado': v['http_last_modified']}
+                     for url, v in validadores.items()],
+                )
         except Exception as e:
-            session.rollback()
-            spider.logger.error(f"Error guardando item: {e}")
-            raise
+            logger = self._spider.logger if self._spider else logging.getLogger(__name__)
+            logger.error(f"Error actualizando validadores HTTP de {len(validadores)} propiedades: {e}")
+    
+    def _agrupar(self, conn, filas):
+        """Grupos de duplicados de las filas recién escritas (en la misma transacción)"""
+        if not self.deduplicar:
+            return 0
+        agrupadas = agrupar(conn, {fila['url'] for fila in filas})
+        if self.stats is not None and agrupadas:
+            self.stats.inc_value('duplicados/agrupadas', agrupadas)
+        return agrupadas
+    
+    def _upsert(self, conn, filas, generacion):
+        """
+        Un INSERT ... ON CONFLICT(url) DO UPDATE por cada conjunto de columnas
+        del lote; todas las filas quedan marcadas con `generacion`
+        """
+        if self.engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
         
-        finally:
-            session.close()
+        # Una URL repetida en el lote se escribe una sola vez (gana la última):
+        # PostgreSQL rechaza actualizar la misma fila dos veces en un statement
+        filas = list({fila['url']: dict(fila, generacion=generacion) for fila in filas}.values())
         
-        return item
+        # Un mismo executemany necesita las mismas claves en todas las filas;
+        # solo se actualizan las columnas que trajo el item (como antes con setattr)
+        grupos = {}
+        for fila in filas:
+            grupos.setdefault(tuple(sorted(fila)), []).append(fila)
+        
+        for columnas, grupo in grupos.items():
+            stmt = insert(Propiedad.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['url'],
+                set_={c: stmt.excluded[c] for c in columnas if c != 'url'},
+            )
+            conn.execute(stmt, grupo)
@@ -1,6 +1,6 @@
 import scrapy
 from scraper.items import PropiedadItem
-import re
+from scraper.extraccion import Pagina, caracteristicas_tarjeta, titulo_tarjeta
 
 
 class LaCapitalSimpleSpider(scrapy.Spider):
@@ -13,6 +13,8 @@ class LaCapitalSimpleSpider(scrapy.Spider):
     custom_settings = {
         'DOWNLOAD_DELAY': 2,
         'SELENIUM_ENABLED': True,
+        # El HTML no necesita CSS: solo se parsea el DOM
+        'SELENIUM_BLOQUEAR_TIPOS': ['image', 'media', 'font', 'stylesheet'],
         'DOWNLOADER_MIDDLEWARES': {
             'scraper.middlewares.SeleniumMiddleware': 800,
         },
@@ -50,29 +52,10 @@ class LaCapitalSimpleSpider(scrapy.Spider):
                     url = response.urljoin(url)
                 item['url'] = url
             
-            # Extraer todo el texto
-            all_text = ' '.join(prop.css('::text').getall())
-            
-            # Construir título
-            titulo_parts = []
-            
-            # Tipo
-            if 'departamento' in all_text.lower():
-                titulo_parts.append('Departamento')
-            elif 'casa' in all_text.lower():
-                titulo_parts.append('Casa')
-            
-            # Ambientes
-            amb_match = re.search(r'(\d+)\s*amb', all_text, re.IGNORECASE)
-            if amb_match:
-                titulo_parts.append(f"{amb_match.group(1)} amb")
-                item['ambientes'] = amb_match.group(1)
-            
-            # Superficie
-            sup_match = re.search(r'(\d+)\s*m[²2]', all_text, re.IGNORECASE)
-            if sup_match:
-                titulo_parts.append(f"{sup_match.group(1)}m²")
-                item['superficie_total'] = sup_match.group(1)
+            # Texto visible de la tarjeta y características (extractor compartido)
+            tarjeta = Pagina(prop)
+            datos = caracteristicas_tarjeta(tarjeta)
+            item.update(datos)
             
             # Ubicación
             ubicacion = (
@@ -82,7 +65,6 @@ class LaCapitalSimpleSpider(scrapy.Spider):
             
             if ubicacion:
                 ubicacion = ubicacion.strip()
-                titulo_parts.append(f"en {ubicacion}")
                 item['direccion'] = ubicacion
                 
                 partes = [p.strip() for p in ubicacion.split(',')]
@@ -93,8 +75,9 @@ class LaCapitalSimpleSpider(scrapy.Spider):
             else:
                 item['ciudad'] = 'Rosario'
             
-            if titulo_parts:
-                item['titulo'] = ' '.join(titulo_parts)
+            titulo = titulo_tarjeta(tarjeta, datos, ubicacion)
+            if titulo:
+                item['titulo'] = titulo
             
             # PRECIO
             precio_text = prop.css('[class*="precio"]::text, [class*="price"]::text, .valor::text').get()
@@ -105,25 +88,6 @@ class LaCapitalSimpleSpider(scrapy.Spider):
                 else:
                     item['moneda'] = 'ARS'
             
-            # Características
-            dorm_match = re.search(r'(\d+)\s*dorm', all_text, re.IGNORECASE)
-            if dorm_match:
-                item['dormitorios'] = dorm_match.group(1)
-            
-            bano_match = re.search(r'(\d+)\s*ba[ñn]o', all_text, re.IGNORECASE)
-            if bano_match:
-                item['banos'] = bano_match.group(1)
-            
-            coch_match = re.search(r'(\d+)\s*coch', all_text, re.IGNORECASE)
-            if coch_match:
-                item['cocheras'] = coch_match.group(1)
-            
-            if re.search(r'\bpatio\b', all_text, re.IGNORECASE):
-                item['patio'] = True
-            
-            if re.search(r'mascota|pet', all_text, re.IGNORECASE):
-                item['mascotas'] = True
-            
             if item.get('titulo') or item.get('direccion'):
                 self.logger.info(f"✅ Extraída: {item.get('titulo', 'Sin título')[:50]}")
                 yield item
@@ -1,15 +1,24 @@
 import scrapy
 import httpx
 import asyncio
-from bs4 import BeautifulSoup
 from datetime import datetime
 from scraper.items import PropiedadItem
-import re
+from scraper.extraccion import (
+    Pagina, SUPERFICIE, DORMITORIOS, BANOS, PALABRAS_PATIO,
+    precio_en_texto, extraer_barrio,
+)
+from scraper.estado_embebido import EstadoEmbebido, item_desde_estado, propiedad_embebida, propiedad_rentola
 
 
 class RentolaAsyncSpider(scrapy.Spider):
     """
     Spider asíncrono para Rentola.ar - mucho más rápido que con Selenium
+    
+    El listado lo baja Scrapy; los detalles, un único httpx.AsyncClient
+    (con pool de conexiones) que vive lo mismo que el spider y corre sobre el
+    event loop del AsyncioSelectorReactor. Un semáforo limita los detalles
+    en vuelo: apenas termina uno arranca el siguiente, y cada item se entrega
+    al pipeline en cuanto está listo.
     """
     name = 'rentola_async'
     allowed_domains = ['rentola.ar']
@@ -21,6 +30,33 @@ class RentolaAsyncSpider(scrapy.Spider):
         'USER_AGENT': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     }
     
+    # Páginas de detalle en vuelo a la vez, y pausa de cada una antes de
+    # liberar su lugar (para no sobrecargar el servidor)
+    concurrencia_detalle = 10
+    pausa_detalle = 0.5
+    
+    headers_detalle = {
+        'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    }
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client = httpx.AsyncClient(
+            timeout=30.0,
+            follow_redirects=True,
+            headers=self.headers_detalle,
+            limits=httpx.Limits(
+                max_connections=self.concurrencia_detalle,
+                max_keepalive_connections=self.concurrencia_detalle,
+            ),
+        )
+        self.semaforo = asyncio.Semaphore(self.concurrencia_detalle)
+        self.detalles_vistos = set()
+    
+    async def closed(self, reason):
+        await self.client.aclose()
+    
     def start_requests(self):
         # URL con filtros: casas y deptos, 2 ambientes, $400k-800k, con patio
         base_url = 'https://rentola.ar/alquiler?location=rosario&property_types=house&property_types=apartment&rent=400000-800000&rooms=2&facility=with_patio'
@@ -32,173 +68,121 @@ class RentolaAsyncSpider(scrapy.Spider):
             dont_filter=True
         )
     
-    def parse(self, response):
+    async def parse(self, response):
         """Parsea el listado y extrae links de propiedades"""
         self.logger.info(f"📄 Parseando listado: {response.url}")
         
-        # Extraer links de propiedades
-        property_links = response.css('a[href*="/listings/"]::attr(href)').getall()
-        property_links = list(set(property_links))  # Deduplicar
-        
-        self.logger.info(f"✅ Encontrados {len(property_links)} links (filtros: 2 amb, $400k-800k, con patio)")
-        
-        # Usar httpx asíncrono para scrapear todas las propiedades en paralelo
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        results = loop.run_until_complete(self.fetch_all_properties(property_links))
-        loop.close()
-        
-        # Yield los items extraídos
-        for item in results:
-            if item:
-                yield item
-        
-        # Paginación (si existe)
+        # Paginación primero: Scrapy baja la página siguiente mientras
+        # se descargan los detalles de esta
         next_page = response.css('a[rel="next"]::attr(href), a.pagination-next::attr(href)').get()
         if next_page:
             yield response.follow(next_page, callback=self.parse)
+        
+        # Extraer links de propiedades (sin repetir entre páginas)
+        property_links = []
+        for link in response.css('a[href*="/listings/"]::attr(href)').getall():
+            url = response.urljoin(link)
+            if url not in self.detalles_vistos:
+                self.detalles_vistos.add(url)
+                property_links.append(url)
+        
+        self.logger.info(f"✅ Encontrados {len(property_links)} links (filtros: 2 amb, $400k-800k, con patio)")
+        
+        # Todos los detalles compiten por el semáforo; los items salen en orden de llegada
+        tareas = [asyncio.ensure_future(self.fetch_property(url)) for url in property_links]
+        try:
+            for tarea in asyncio.as_completed(tareas):
+                item = await tarea
+                if item:
+                    yield item
+        finally:
+            for tarea in tareas:
+                tarea.cancel()
     
-    async def fetch_all_properties(self, property_links):
-        """Fetcha todas las propiedades en paralelo usando httpx asíncrono"""
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            tasks = [
-                self.fetch_property(client, f"https://rentola.ar{link}") 
-                for link in property_links
-            ]
-            # Procesar 10 propiedades a la vez para no sobrecargar el servidor
-            results = []
-            for i in range(0, len(tasks), 10):
-                batch = tasks[i:i+10]
-                batch_results = await asyncio.gather(*batch, return_exceptions=True)
-                results.extend(batch_results)
-                await asyncio.sleep(0.5)  # Pausa entre batches
-            
-            return [r for r in results if not isinstance(r, Exception) and r is not None]
-    
-    async def fetch_property(self, client: httpx.AsyncClient, url: str):
+    async def fetch_property(self, url: str):
         """Fetcha y parsea una propiedad individual"""
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            }
-            
-            response = await client.get(url, headers=headers, follow_redirects=True)
-            
-            if response.status_code != 200:
-                self.logger.warning(f"⚠️ Error {response.status_code} en {url}")
+        async with self.semaforo:
+            try:
+                # Crawl incremental: GET condicional con el ETag / Last-Modified guardados
+                registro = getattr(self, 'incremental', None)
+                headers = registro.validadores(url) if registro else {}
+                response = await self.client.get(url, headers=headers)
+                
+                if response.status_code == 304:
+                    registro.sin_cambios_http(url)
+                    return None
+                
+                if response.status_code != 200:
+                    self.logger.warning(f"⚠️ Error {response.status_code} en {url}")
+                    return None
+                
+                item = self.parsear_propiedad(response.text, url)
+                if response.headers.get('etag'):
+                    item['http_etag'] = response.headers['etag']
+                if response.headers.get('last-modified'):
+                    item['http_last_modified'] = response.headers['last-modified']
+                return item
+                
+            except Exception as e:
+                self.logger.warning(f"⚠️ Error procesando {url}: {e}")
                 return None
-            
-            # Parsear con BeautifulSoup
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Extraer datos
-            item = PropiedadItem()
-            
-            # Título
-            h1 = soup.find('h1')
-            titulo = h1.get_text(strip=True) if h1 else None
-            if not titulo:
-                meta_title = soup.find('meta', property='og:title')
-                titulo = meta_title['content'] if meta_title else None
-            
-            # Precio - buscar en el texto
-            precio = None
-            precio_patterns = [
-                r'\$\s*([\d.,]+)',
-                r'ARS\s*([\d.,]+)',
-                r'(\d{6,})\s*ARS',
-            ]
-            for pattern in precio_patterns:
-                match = re.search(pattern, response.text)
-                if match:
-                    try:
-                        precio_str = match.group(1).replace('.', '').replace(',', '.')
-                        precio = float(precio_str)
-                        break
-                    except:
-                        continue
-            
-            # Superficie
-            superficie = None
-            superficie_match = re.search(r'(\d+(?:[.,]\d+)?)\s*m[²2]', response.text, re.IGNORECASE)
-            if superficie_match:
-                try:
-                    superficie = float(superficie_match.group(1).replace(',', '.'))
-                except:
-                    pass
-            
-            # Dormitorios
-            dormitorios = None
-            dormitorios_match = re.search(r'(\d+)\s*(?:dormitorio|habitación|habitacion)', response.text, re.IGNORECASE)
-            if dormitorios_match:
-                try:
-                    dormitorios = int(dormitorios_match.group(1))
-                except:
-                    pass
-            
-            # Baños
-            banos = None
-            banos_match = re.search(r'(\d+)\s*baño', response.text, re.IGNORECASE)
-            if banos_match:
-                try:
-                    banos = int(banos_match.group(1))
-                except:
-                    pass
-            
-            # Dirección
-            direccion = "Rosario"
-            address_meta = soup.find('meta', property='og:locality')
-            if address_meta:
-                direccion = address_meta.get('content', 'Rosario')
-            
-            # Detectar patio
-            texto_completo = f"{titulo} {response.text}".lower()
-            patio = any(word in texto_completo for word in [
-                'patio', 'jardín', 'jardin', 'quincho', 
-                'parrilla', 'terraza', 'balcón', 'balcon'
-            ])
-            
-            # Extraer barrio
-            barrio = self._extraer_barrio(direccion)
-            
-            # Llenar item
-            item['titulo'] = titulo or 'Propiedad en alquiler'
-            item['direccion'] = direccion
-            item['precio'] = precio
-            item['moneda'] = 'ARS'
-            item['ambientes'] = dormitorios
-            item['dormitorios'] = dormitorios
-            item['banos'] = banos
-            item['superficie_total'] = superficie
-            item['ciudad'] = 'Rosario'
-            item['barrio'] = barrio
-            item['fuente'] = 'rentola'
-            item['url'] = url
-            item['patio'] = patio
-            item['fecha_scraping'] = datetime.now().isoformat()
-            
-            self.logger.info(f"✅ Extraída: {titulo}")
-            return item
-            
-        except Exception as e:
-            self.logger.warning(f"⚠️ Error procesando {url}: {e}")
-            return None
+            finally:
+                await asyncio.sleep(self.pausa_detalle)
     
-    def _extraer_barrio(self, texto):
-        """Extrae el barrio del texto"""
-        barrios_rosario = [
-            'Centro', 'Distrito Centro', 'Abasto', 'Alberdi', 'Fisherton',
-            'Echesortu', 'Pichincha', 'Luis Agote', 'República de la Sexta',
-            'Martín', 'Puerto Norte', 'Distrito Norte', 'Distrito Sur',
-            'Distrito Noroeste', 'Refinería', 'La Florida', 'Godoy',
-            'Lisandro de la Torre', 'Triángulo Moderno', 'Sarmiento',
-            'Bella Vista', 'Parque Casado', 'Barrio Industrial',
-        ]
-        
-        texto_lower = texto.lower()
-        for barrio in barrios_rosario:
-            if barrio.lower() in texto_lower:
-                return barrio
-        
-        return None
+    def parsear_propiedad(self, html, url):
+        """Extrae el item de la página de una propiedad (sin red: sirve para fixtures)"""
+        pagina = Pagina(html)
+        
+        # Primero el JSON que manda Next.js (o ld+json); si no alcanza, el texto visible
+        datos = propiedad_embebida(EstadoEmbebido(pagina), propiedad_rentola)
+        if datos:
+            item = item_desde_estado(datos, 'rentola', url, ciudad='Rosario', moneda='ARS')
+            item['patio'] = pagina.contiene(PALABRAS_PATIO)
+            self.logger.info(f"✅ Extraída (estado embebido): {item.get('titulo')}")
+            return item
+        
+        item = PropiedadItem()
+        
+        titulo = pagina.titulo()
+        
+        # Precio, superficie, dormitorios y baños: sobre el texto visible
+        precio = precio_en_texto(pagina)
+        
+        superficie = pagina.buscar(SUPERFICIE)
+        superficie = float(superficie.replace(',', '.')) if superficie else None
+        
+        dormitorios = pagina.buscar(DORMITORIOS)
+        dormitorios = int(dormitorios) if dormitorios else None
+        
+        banos = pagina.buscar(BANOS)
+        banos = int(banos) if banos else None
+        
+        # Dirección
+        direccion = pagina.css('meta[property="og:locality"]::attr(content)').get() or "Rosario"
+        
+        # Detectar patio
+        patio = pagina.contiene(PALABRAS_PATIO) or any(
+            palabra in (titulo or '').lower() for palabra in PALABRAS_PATIO
+        )
+        
+        # Extraer barrio
+        barrio = extraer_barrio(direccion)
+        
+        # Llenar item
+        item['titulo'] = titulo or 'Propiedad en alquiler'
+        item['direccion'] = direccion
+        item['precio'] = precio
+        item['moneda'] = 'ARS'
+        item['ambientes'] = dormitorios
+        item['dormitorios'] = dormitorios
+        item['banos'] = banos
+        item['superficie_total'] = superficie
+        item['ciudad'] = 'Rosario'
+        item['barrio'] = barrio
+        item['fuente'] = 'rentola'
+        item['url'] = url
+        item['patio'] = patio
+        item['fecha_scraping'] = datetime.now().isoformat()
+        
+        self.logger.info(f"✅ Extraída: {titulo}")
+        return item
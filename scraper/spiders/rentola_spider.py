@@ -2,6 +2,10 @@ import scrapy
 import re
 from datetime import datetime
 from scraper.items import PropiedadItem
+from scraper.extraccion import Pagina, PALABRAS_MASCOTAS, PALABRAS_PATIO
+from scraper.estado_embebido import (
+    EstadoEmbebido, item_desde_estado, propiedad_embebida, propiedad_rentola, reintento_con_navegador,
+)
 
 
 class RentolaSpider(scrapy.Spider):
@@ -55,17 +59,26 @@ class RentolaSpider(scrapy.Spider):
         property_links = list(set(property_links))
         self.logger.info(f"✅ Encontrados {len(property_links)} links de propiedades (con filtros aplicados: 2 amb, $400k-800k, con patio)")
         
-        # Seguir cada link para extraer los datos detallados
+        if not property_links:
+            # Sin links en el HTML del servidor: renderizar la página
+            reintento = reintento_con_navegador(
+                response, wait_for='a[href*="/listings/"]', wait_time=15, scroll=True, scroll_multiple=True,
+            )
+            if reintento:
+                yield reintento
+                return
+        
+        # Seguir cada link para extraer los datos detallados. Los detalles traen
+        # los datos en __NEXT_DATA__: GET común, Selenium solo si no alcanza
+        registro = getattr(self, 'incremental', None)
         for link in property_links:  # Procesar todos los links encontrados
             full_url = response.urljoin(link)
             yield scrapy.Request(
                 full_url,
                 callback=self.parse_property,
-                meta={
-                    'selenium': True,
-                    'wait_for': 'body',
-                    'wait_time': 10,
-                },
+                # Crawl incremental: GET condicional, 304 si no cambió
+                headers=registro.validadores(full_url) if registro else None,
+                meta={'selenium': False, 'handle_httpstatus_list': [304]},
                 dont_filter=True
             )
         
@@ -75,19 +88,38 @@ class RentolaSpider(scrapy.Spider):
             yield response.follow(
                 next_page, 
                 callback=self.parse_listing,
-                meta={
-                    'selenium': True,
-                    'wait_for': 'body',
-                    'wait_time': 15,
-                    'scroll': True,
-                    'scroll_multiple': True,
-                }
+                meta={'selenium': False},
             )
     
     def parse_property(self, response):
         """Parsea los datos de una propiedad individual"""
         self.logger.info(f"🏠 Parseando propiedad: {response.url}")
         
+        if response.status == 304:
+            self.incremental.sin_cambios_http(response.url)
+            return
+        
+        # Datos embebidos (__NEXT_DATA__ / ld+json): no hace falta renderizar
+        datos = propiedad_embebida(EstadoEmbebido(response), propiedad_rentola)
+        if datos:
+            pagina = Pagina(response)
+            item = item_desde_estado(datos, 'rentola', response.url, ciudad='Rosario', moneda='ARS')
+            item['patio'] = pagina.contiene(PALABRAS_PATIO)
+            item['mascotas'] = pagina.contiene(PALABRAS_MASCOTAS)
+            for campo, header in (('http_etag', b'ETag'), ('http_last_modified', b'Last-Modified')):
+                if response.headers.get(header):
+                    item[campo] = response.headers[header].decode('latin-1')
+            self.crawler.stats.inc_value('estado_embebido/items')
+            self.logger.info(f"✅ Extraída (estado embebido): {item.get('titulo')}")
+            yield item
+            return
+        
+        reintento = reintento_con_navegador(response, wait_for='body', wait_time=10)
+        if reintento:
+            self.crawler.stats.inc_value('estado_embebido/renders')
+            yield reintento
+            return
+        
         item = PropiedadItem()
         
         try:
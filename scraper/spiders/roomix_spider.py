@@ -2,6 +2,10 @@ import scrapy
 import re
 from datetime import datetime
 from scraper.items import PropiedadItem
+from scraper.extraccion import (
+    Pagina, PRECIOS, SUPERFICIE, DORMITORIOS, BANOS, AMBIENTES,
+    PALABRAS_PATIO, PALABRAS_MASCOTAS, extraer_barrio,
+)
 
 
 class RoomixSpider(scrapy.Spider):
@@ -55,21 +59,18 @@ class RoomixSpider(scrapy.Spider):
         item = PropiedadItem()
         
         try:
-            # Título - buscar en h1 o meta tags
-            titulo = response.css('h1::text').get()
-            if not titulo:
-                titulo = response.css('meta[property="og:title"]::attr(content)').get()
+            pagina = Pagina(response)
+            
+            # Título - h1 o meta tags
+            titulo = pagina.titulo()
             titulo = titulo.strip() if titulo else None
             
-            # Precio - buscar patrones de precio
+            # Precio - selector dedicado o primer "$ ..." del texto visible
             precio = None
-            precio_text = response.css('span.price::text, div.price::text, strong.price::text').get()
-            
-            if not precio_text:
-                # Buscar en el texto completo
-                precio_match = re.search(r'\$\s*([\d.,]+)', response.text)
-                if precio_match:
-                    precio_text = precio_match.group(1)
+            precio_text = (
+                response.css('span.price::text, div.price::text, strong.price::text').get() or
+                pagina.buscar(PRECIOS[0])
+            )
             
             if precio_text:
                 try:
@@ -85,41 +86,18 @@ class RoomixSpider(scrapy.Spider):
             else:
                 direccion = direccion.strip()
             
-            # Superficie
-            superficie = None
-            superficie_text = response.css('*:contains("m²")::text, *:contains("m2")::text').re_first(r'([\d.,]+)\s*m[²2]')
-            if superficie_text:
-                try:
-                    superficie = float(superficie_text.replace(',', '.'))
-                except:
-                    pass
+            # Superficie, dormitorios, baños y ambientes del texto visible
+            superficie = pagina.buscar(SUPERFICIE)
+            superficie = float(superficie.replace(',', '.')) if superficie else None
             
-            # Dormitorios
-            dormitorios = None
-            dormitorios_match = response.css('*:contains("dormitorio")::text, *:contains("habitación")::text').re_first(r'(\d+)\s*(?:dormitorio|habitación|habitacion)')
-            if dormitorios_match:
-                try:
-                    dormitorios = int(dormitorios_match)
-                except:
-                    pass
+            dormitorios = pagina.buscar(DORMITORIOS)
+            dormitorios = int(dormitorios) if dormitorios else None
             
-            # Baños
-            banos = None
-            banos_match = response.css('*:contains("baño")::text').re_first(r'(\d+)\s*baño')
-            if banos_match:
-                try:
-                    banos = int(banos_match)
-                except:
-                    pass
+            banos = pagina.buscar(BANOS)
+            banos = int(banos) if banos else None
             
-            # Ambientes
-            ambientes = None
-            ambientes_match = response.css('*:contains("ambiente")::text').re_first(r'(\d+)\s*ambiente')
-            if ambientes_match:
-                try:
-                    ambientes = int(ambientes_match)
-                except:
-                    pass
+            ambientes = pagina.buscar(AMBIENTES)
+            ambientes = int(ambientes) if ambientes else None
             
             # URL
             url = response.url
@@ -133,21 +111,12 @@ class RoomixSpider(scrapy.Spider):
             else:
                 tipo = 'casa'
             
-            # Detectar patio (ya está en el filtro, pero verificamos)
-            texto_completo = f"{titulo} {response.text}".lower()
-            patio = any(word in texto_completo for word in [
-                'patio', 'jardín', 'jardin', 'quincho', 
-                'parrilla', 'terraza', 'balcón', 'balcon'
-            ])
-            
-            # Detectar mascotas
-            mascotas = any(word in texto_completo for word in [
-                'mascota', 'pet', 'perro', 'gato', 
-                'acepta mascota', 'permite mascota'
-            ])
+            # Detectar patio (ya está en el filtro, pero verificamos) y mascotas
+            patio = pagina.contiene(PALABRAS_PATIO)
+            mascotas = pagina.contiene(PALABRAS_MASCOTAS)
             
             # Extraer barrio
-            barrio = self._extraer_barrio(direccion)
+            barrio = extraer_barrio(direccion)
             
             # Llenar item
             item['titulo'] = titulo or 'Casa en alquiler'
@@ -173,25 +142,3 @@ class RoomixSpider(scrapy.Spider):
         except Exception as e:
             self.logger.warning(f"⚠️ Error procesando propiedad: {e}")
             return
-    
-    def _extraer_barrio(self, texto):
-        """Extrae el barrio del texto"""
-        if not texto:
-            return None
-            
-        barrios_rosario = [
-            'Centro', 'Distrito Centro', 'Abasto', 'Alberdi', 'Fisherton',
-            'Echesortu', 'Pichincha', 'Luis Agote', 'República de la Sexta',
-            'Martín', 'Puerto Norte', 'Distrito Norte', 'Distrito Sur',
-            'Distrito Noroeste', 'Refinería', 'La Florida', 'Godoy',
-            'Lisandro de la Torre', 'Triángulo Moderno', 'Sarmiento',
-            'Bella Vista', 'Parque Casado', 'Barrio Industrial',
-            'Alberdi', 'Ludueña', 'Triángulo',
-        ]
-        
-        texto_lower = texto.lower()
-        for barrio in barrios_rosario:
-            if barrio.lower() in texto_lower:
-                return barrio
-        
-        return None
@@ -1,5 +1,9 @@
 import scrapy
 from scraper.items import PropiedadItem
+from scraper.estado_embebido import (
+    EstadoEmbebido, item_desde_estado, postings_zonaprop, propiedad_ld_json, propiedad_zonaprop,
+    reintento_con_navegador,
+)
 
 
 class ZonapropSpider(scrapy.Spider):
@@ -10,6 +14,8 @@ class ZonapropSpider(scrapy.Spider):
         'DOWNLOAD_DELAY': 2,
         'CONCURRENT_REQUESTS': 2,  # Limitar concurrencia con Selenium
         'SELENIUM_ENABLED': True,
+        # El HTML no necesita CSS: solo se parsea el DOM
+        'SELENIUM_BLOQUEAR_TIPOS': ['image', 'media', 'font', 'stylesheet'],
         'DOWNLOADER_MIDDLEWARES': {
             'scraper.middlewares.SeleniumMiddleware': 800,
         },
@@ -22,6 +28,14 @@ class ZonapropSpider(scrapy.Spider):
         },
     }
     
+    # Primero GET común (el listado trae los avisos en window.__PRELOADED_STATE__);
+    # si Cloudflare lo corta (403) o no hay datos, se renderiza con Selenium
+    META_GET = {'selenium': False, 'handle_httpstatus_list': [403]}
+    META_LISTADO_SELENIUM = {
+        'wait_for': 'div[data-posting-type="PROPERTY"]',
+        'wait_time': 10,
+    }
+    
     def start_requests(self):
         # URL de búsqueda de departamentos en alquiler en Rosario
         base_url = 'https://www.zonaprop.com.ar/departamentos-alquiler-rosario.html'
@@ -29,18 +43,32 @@ class ZonapropSpider(scrapy.Spider):
             base_url, 
             callback=self.parse_listing,
             errback=self.errback_httpbin,
-            meta={
-                'selenium': True,
-                'wait_for': 'div[data-posting-type="PROPERTY"]',
-                'wait_time': 10,
-            },
+            meta=self.META_GET,
             dont_filter=True
         )
     
     def parse_listing(self, response):
         """Parsea la página de listado"""
+        # Estado embebido: los mismos postings que devuelve la API, sin visitar cada detalle
+        postings = postings_zonaprop(EstadoEmbebido(response)) if response.status == 200 else []
+        if postings:
+            self.logger.info(f"✅ {len(postings)} propiedades en el estado embebido del listado")
+            self.crawler.stats.inc_value('estado_embebido/listados')
+            for posting in postings:
+                item = propiedad_zonaprop(posting, self.logger)
+                if item:
+                    yield item
+            yield from self._siguiente_pagina(response)
+            return
+        
         # Selectores para cada propiedad en el listado
         propiedades = response.css('div[data-posting-type="PROPERTY"]')
+        if not propiedades:
+            reintento = reintento_con_navegador(response, **self.META_LISTADO_SELENIUM)
+            if reintento:
+                self.crawler.stats.inc_value('estado_embebido/renders')
+                yield reintento
+                return
         
         self.logger.info(f"✅ Encontradas {len(propiedades)} propiedades en listado")
         
@@ -52,28 +80,39 @@ class ZonapropSpider(scrapy.Spider):
                 yield scrapy.Request(
                     url, 
                     callback=self.parse_propiedad,
-                    meta={
-                        'selenium': True,
-                        'wait_for': 'body',
-                        'wait_time': 8,
-                    }
+                    meta=self.META_GET,
                 )
         
+        yield from self._siguiente_pagina(response)
+    
+    def _siguiente_pagina(self, response):
         # Paginación
         next_page = response.css('a.pagination__next::attr(href)').get()
         if next_page:
             yield response.follow(
                 next_page, 
                 callback=self.parse_listing,
-                meta={
-                    'selenium': True,
-                    'wait_for': 'div[data-posting-type="PROPERTY"]',
-                    'wait_time': 10,
-                }
+                meta=self.META_GET,
             )
     
     def parse_propiedad(self, response):
         """Parsea el detalle de una propiedad"""
+        # Datos de schema.org (ld+json) del HTML del servidor
+        datos = propiedad_ld_json(EstadoEmbebido(response).ld_json) if response.status == 200 else None
+        if datos:
+            self.crawler.stats.inc_value('estado_embebido/items')
+            item = item_desde_estado(datos, 'zonaprop', response.url)
+            item['id_externo'] = response.url.split('-')[-1].replace('.html', '')
+            yield item
+            return
+        
+        if response.status != 200 or not response.css('h1.title-property'):
+            reintento = reintento_con_navegador(response, wait_for='body', wait_time=8)
+            if reintento:
+                self.crawler.stats.inc_value('estado_embebido/renders')
+                yield reintento
+                return
+        
         item = PropiedadItem()
         
         item['fuente'] = 'zonaprop'
@@ -2,6 +2,7 @@ import scrapy
 import re
 from datetime import datetime, timedelta
 from scraper.items import PropiedadItem
+from scraper.extraccion import Pagina, caracteristicas_tarjeta, titulo_tarjeta
 
 
 class ZonapropSimpleSpider(scrapy.Spider):
@@ -15,6 +16,8 @@ class ZonapropSimpleSpider(scrapy.Spider):
     custom_settings = {
         'DOWNLOAD_DELAY': 1.5,
         'SELENIUM_ENABLED': True,
+        # El HTML no necesita CSS: solo se parsea el DOM
+        'SELENIUM_BLOQUEAR_TIPOS': ['image', 'media', 'font', 'stylesheet'],
         'DOWNLOADER_MIDDLEWARES': {
             'scraper.middlewares.SeleniumMiddleware': 800,
         },
@@ -75,35 +78,14 @@ class ZonapropSimpleSpider(scrapy.Spider):
                 if 'html' in url:
                     item['id_externo'] = url.split('-')[-1].split('.')[0].split('?')[0]
             
-            # TÍTULO - Extraer de múltiples fuentes
-            import re
-            all_text = ' '.join(prop.css('::text').getall())
+            # Texto visible de la tarjeta y características (extractor compartido)
+            tarjeta = Pagina(prop)
+            datos = caracteristicas_tarjeta(tarjeta)
+            item.update(datos)
             
-            # Intentar construir título desde características visibles
-            titulo_parts = []
-            
-            # Tipo de propiedad
-            if 'departamento' in all_text.lower():
-                titulo_parts.append('Departamento')
-            elif 'casa' in all_text.lower():
-                titulo_parts.append('Casa')
-            
-            # Ambientes
-            amb_match = re.search(r'(\d+)\s*amb', all_text, re.IGNORECASE)
-            if amb_match:
-                titulo_parts.append(f"{amb_match.group(1)} amb")
-            
-            # Superficie
-            sup_match = re.search(r'(\d+)\s*m[²2]', all_text, re.IGNORECASE)
-            if sup_match:
-                titulo_parts.append(f"{sup_match.group(1)}m²")
-            
-            # Ubicación como parte del título
+            # TÍTULO - desde las características visibles y la ubicación
             ubicacion_elem = prop.css('[data-qa="POSTING_CARD_LOCATION"]::text').get()
-            if ubicacion_elem:
-                titulo_parts.append(f"en {ubicacion_elem.strip()}")
-            
-            titulo = ' '.join(titulo_parts) if titulo_parts else None
+            titulo = titulo_tarjeta(tarjeta, datos, ubicacion_elem.strip() if ubicacion_elem else None)
             if titulo:
                 item['titulo'] = titulo
             
@@ -139,42 +121,13 @@ class ZonapropSimpleSpider(scrapy.Spider):
                 else:
                     item['moneda'] = 'ARS'
             
-            # CARACTERÍSTICAS adicionales usando regex
-            # Ambientes
-            if amb_match:
-                item['ambientes'] = amb_match.group(1)
-            
-            # Superficie
-            if sup_match:
-                item['superficie_total'] = sup_match.group(1)
-            
-            # Dormitorios
-            dorm_match = re.search(r'(\d+)\s*dorm', all_text, re.IGNORECASE)
-            if dorm_match:
-                item['dormitorios'] = dorm_match.group(1)
-            
-            # Baños
-            bano_match = re.search(r'(\d+)\s*ba[ñn]o', all_text, re.IGNORECASE)
-            if bano_match:
-                item['banos'] = bano_match.group(1)
-            
-            # Cocheras
-            coch_match = re.search(r'(\d+)\s*coch', all_text, re.IGNORECASE)
-            if coch_match:
-                item['cocheras'] = coch_match.group(1)
-            
-            # Patio - buscar en el texto
-            if re.search(r'\bpatio\b', all_text, re.IGNORECASE):
-                item['patio'] = True
-            
             # Descripción
             descripcion = prop.css('div[data-qa="POSTING_CARD_DESCRIPTION"]::text').get()
             if descripcion:
                 item['descripcion'] = descripcion.strip()[:500]
             
             # Filtro de fecha - buscar indicadores de publicación reciente
-            fecha_texto = ' '.join(prop.css('::text').getall()).lower()
-            es_reciente = self._es_publicacion_reciente(fecha_texto)
+            es_reciente = self._es_publicacion_reciente(tarjeta.minuscula)
             
             if not es_reciente:
                 self.logger.debug(f"⏭️  Omitida (antigua): {item.get('titulo', 'Sin título')[:40]}")